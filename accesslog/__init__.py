@@ -0,0 +1,13 @@
+"""Streaming analyzer for Traefik's JSON access log.
+
+Traefik logs every client request on the public routers and every request
+Varnish sends to origin on the ``-internal`` routers, marked with
+``X-Varnish-Routed``. ``Analyzer`` reads plain or gzip-rotated logs line by
+line in constant memory and reports both per router, with latency
+histograms and the URLs origin served most.
+"""
+
+# Volto
+from accesslog.analyzer import Analyzer  # noqa: F401
+from accesslog.analyzer import TopUrls  # noqa: F401
+from accesslog.analyzer import open_log  # noqa: F401
@@ -0,0 +1,40 @@
+# Standard Library
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Volto
+from accesslog.analyzer import TOP
+from accesslog.analyzer import Analyzer
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m accesslog",
+        description="Split Traefik's JSON access log into edge and origin traffic.",
+    )
+    parser.add_argument(
+        "paths", nargs="*", default=["-"], help="Log files, gzipped or not (- stdin)"
+    )
+    parser.add_argument("--top", type=int, default=TOP, help="Uncached URLs to list")
+    parser.add_argument("--since", help="First StartUTC to count, e.g. 2024-05-01T13")
+    parser.add_argument("--until", help="StartUTC to stop counting at")
+    parser.add_argument("--output", type=Path, help="Write the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(args: argparse.Namespace) -> dict:
+    analyzer = Analyzer(top=args.top, since=args.since, until=args.until)
+    analyzer.read_files(args.paths)
+    return analyzer.report()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = main(args)
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(report, fp, indent=2)
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
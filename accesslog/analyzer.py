@@ -0,0 +1,249 @@
+# Standard Library
+import gzip
+import heapq
+import json
+import sys
+from collections import Counter
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+from typing import BinaryIO
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Union
+
+
+# Traefik keeps this request header in the log, Varnish sets it on every
+# request it sends to origin
+ORIGIN_HEADER = "request_X-Varnish-Routed"
+
+# Histogram buckets for request latency, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PERCENTILES = (50, 90, 95, 99)
+
+TOP = 20
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Read buffer for log files, large reads keep gzip and the parser busy
+READ_BUFFER = 1 << 20
+
+# json.loads() without its encoding detection, a third faster on bytes
+decode_json = json.JSONDecoder().decode
+
+
+def open_log(path: Union[str, Path]) -> BinaryIO:
+    """A log file, gunzipped when rotated, or stdin for ``-``."""
+    if str(path) == "-":
+        return sys.stdin.buffer
+    raw = open(path, "rb", buffering=READ_BUFFER)
+    if raw.peek(2)[:2] == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+    return raw
+
+
+@dataclass
+class Histogram:
+    """Fixed buckets, so percentiles are the upper bound of their bucket."""
+
+    count: int = 0
+    total: float = 0.0
+    maximum: float = 0.0
+    counts: List[int] = field(default_factory=lambda: [0] * (len(BUCKETS) + 1))
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+        index = 0
+        for bound in BUCKETS:
+            if seconds <= bound:
+                break
+            index += 1
+        self.counts[index] += 1
+
+    def percentile(self, point: float) -> float:
+        rank = point / 100 * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.maximum)
+        return self.maximum
+
+    def summary(self) -> dict:
+        if not self.count:
+            return {}
+        result = {
+            f"p{point}": round(self.percentile(point) * 1000, 3)
+            for point in PERCENTILES
+        }
+        result["mean"] = round(self.total / self.count * 1000, 3)
+        result["max"] = round(self.maximum * 1000, 3)
+        result["buckets"] = {
+            str(bound): count for bound, count in zip(BUCKETS, self.counts)
+        }
+        result["buckets"]["+Inf"] = self.counts[-1]
+        return result
+
+
+class TopUrls:
+    """The most requested URLs in bounded memory.
+
+    At most ``2 * capacity`` URLs are counted. Beyond that the least
+    requested are dropped down to ``capacity``, and a URL seen again
+    starts from the highest count dropped so far: ``error`` bounds how far
+    its count may be overestimated, as in the Space-Saving algorithm.
+    """
+
+    def __init__(self, size: int = TOP, capacity: Optional[int] = None):
+        self.size = size
+        self.capacity = max(capacity or size * 50, size)
+        self.counts: Dict[str, list] = {}
+        self.floor = 0
+
+    def add(self, url: str, seconds: float):
+        entry = self.counts.get(url)
+        if entry is None:
+            if len(self.counts) >= 2 * self.capacity:
+                self.prune()
+            # requests, error, seconds
+            entry = self.counts[url] = [self.floor, self.floor, 0.0]
+        entry[0] += 1
+        entry[2] += seconds
+
+    def prune(self):
+        ranked = sorted(self.counts.items(), key=lambda item: item[1][0], reverse=True)
+        self.floor = max(self.floor, ranked[self.capacity][1][0])
+        self.counts = dict(ranked[: self.capacity])
+
+    def top(self) -> List[dict]:
+        return [
+            {
+                "url": url,
+                "requests": requests,
+                "error": error,
+                "origin_seconds": round(seconds, 3),
+            }
+            for url, (requests, error, seconds) in heapq.nlargest(
+                self.size, self.counts.items(), key=lambda item: item[1][0]
+            )
+        ]
+
+
+@dataclass
+class RouterStats:
+    requests: int = 0
+    bytes: int = 0
+    statuses: Counter = field(default_factory=Counter)
+    latency: Histogram = field(default_factory=Histogram)
+
+    def summary(self) -> dict:
+        return {
+            "requests": self.requests,
+            "bytes": self.bytes,
+            "statuses": dict(sorted(self.statuses.items())),
+            "latency_ms": self.latency.summary(),
+            "seconds": round(self.latency.total, 3),
+        }
+
+
+class Analyzer:
+    """Split Traefik's JSON access log into edge and origin traffic.
+
+    Requests carrying ``X-Varnish-Routed`` were sent by Varnish: they are
+    origin traffic, the cost of what the cache did not answer. Everything
+    else came from clients through the public routers. Memory does not
+    grow with the log: per-router counters, fixed latency buckets and a
+    bounded table of the URLs origin served most.
+
+    ``since`` and ``until`` are ISO 8601 UTC prefixes compared with
+    ``StartUTC``, e.g. ``2024-05-01T13`` for an hourly run.
+    """
+
+    def __init__(
+        self,
+        top: int = TOP,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ):
+        self.since = since
+        self.until = until
+        self.routers: Dict[str, Dict[str, RouterStats]] = {"edge": {}, "origin": {}}
+        self.uncached = TopUrls(top)
+        self.lines = 0
+        self.invalid = 0
+        self.skipped = 0
+
+    def feed(self, line: bytes):
+        self.lines += 1
+        try:
+            entry = decode_json(line.decode("utf-8", "replace"))
+            router = entry["RouterName"]
+        except (ValueError, KeyError, TypeError):
+            self.invalid += 1
+            return
+        if self.since or self.until:
+            start = entry.get("StartUTC", "")
+            if (self.since and start < self.since) or (
+                self.until and start >= self.until
+            ):
+                self.skipped += 1
+                return
+        router = router.partition("@")[0]
+        origin = entry.get(ORIGIN_HEADER) == "1" or router.endswith("-internal")
+        group = self.routers["origin" if origin else "edge"]
+        stats = group.get(router)
+        if stats is None:
+            stats = group[router] = RouterStats()
+        status = entry.get("DownstreamStatus", 0)
+        seconds = entry.get("Duration", 0) / 1e9
+        stats.requests += 1
+        stats.bytes += entry.get("DownstreamContentSize", 0)
+        stats.statuses[f"{status // 100}xx"] += 1
+        stats.latency.observe(seconds)
+        if origin:
+            self.uncached.add(entry.get("RequestPath", ""), seconds)
+
+    def read(self, stream: Iterable[bytes]):
+        for line in stream:
+            if line.strip():
+                self.feed(line)
+
+    def read_files(self, paths: Iterable[Union[str, Path]]):
+        for path in paths:
+            stream = open_log(path)
+            try:
+                self.read(stream)
+            finally:
+                if stream is not sys.stdin.buffer:
+                    stream.close()
+
+    def report(self) -> dict:
+        result = {
+            "lines": self.lines,
+            "invalid": self.invalid,
+            "skipped": self.skipped,
+        }
+        for name, routers in self.routers.items():
+            result[name] = {
+                "requests": sum(stats.requests for stats in routers.values()),
+                "seconds": round(
+                    sum(stats.latency.total for stats in routers.values()), 3
+                ),
+                "routers": {
+                    router: stats.summary() for router, stats in sorted(routers.items())
+                },
+            }
+        edge = result["edge"]["requests"]
+        # Origin requests per client request, 1 - hit ratio when every
+        # miss makes one origin request
+        result["origin_ratio"] = (
+            round(result["origin"]["requests"] / edge, 4) if edge else None
+        )
+        result["top_uncached"] = self.uncached.top()
+        return result
@@ -0,0 +1,14 @@
+"""Load generation against the public entry point.
+
+``LoadGenerator`` runs concurrent HTTP/2 clients through scenarios built
+from tests/data/content.json (anonymous Volto pages, ``/++api++`` reads,
+``@@images`` scales and, with credentials, editors) and reports RPS,
+latency percentiles, hit ratio and error rate per ``x-varnish-reqtype``.
+"""
+
+# Volto
+from benchmarks.load import LoadGenerator  # noqa: F401
+from benchmarks.load import Scenario  # noqa: F401
+from benchmarks.load import build_scenarios  # noqa: F401
+from benchmarks.load import compare  # noqa: F401
+from benchmarks.load import load_content  # noqa: F401
@@ -0,0 +1,70 @@
+# Standard Library
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Volto
+from benchmarks.load import CONTENT
+from benchmarks.load import LoadGenerator
+from benchmarks.load import build_scenarios
+from benchmarks.load import compare
+from benchmarks.load import load_content
+from benchmarks.load import login
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Put load through Traefik and Varnish, report per reqtype.",
+    )
+    parser.add_argument("--url", default="http://localhost", help="Public URL")
+    parser.add_argument("--host", default="plone.localhost", help="Host header")
+    parser.add_argument("--content", type=Path, default=CONTENT)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, help="Seconds to run")
+    parser.add_argument("--requests", type=int, help="Requests to send")
+    parser.add_argument(
+        "--http1", action="store_true", help="HTTP/1.1 instead of HTTP/2"
+    )
+    parser.add_argument("--editor", help="login:password of an editor")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Results to compare with")
+    args = parser.parse_args(argv)
+    if args.duration is None and args.requests is None:
+        args.duration = 30.0
+    return args
+
+
+async def main(args: argparse.Namespace) -> dict:
+    token = None
+    if args.editor:
+        username, _, password = args.editor.partition(":")
+        token = await login(args.url, username, password, args.host)
+    generator = LoadGenerator(
+        args.url,
+        build_scenarios(load_content(args.content), token),
+        host=args.host,
+        concurrency=args.concurrency,
+        duration=args.duration,
+        requests=args.requests,
+        http2=not args.http1,
+        seed=args.seed,
+    )
+    results = await generator.run()
+    if args.baseline:
+        with open(args.baseline) as fp:
+            results["baseline"] = compare(json.load(fp), results)
+    return results
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = asyncio.run(main(args))
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(results, fp, indent=2)
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
@@ -0,0 +1,302 @@
+# Standard Library
+import asyncio
+import json
+import math
+import random
+from collections import defaultdict
+from dataclasses import dataclass
+from dataclasses import field
+from datetime import datetime
+from datetime import timezone
+from pathlib import Path
+from time import monotonic
+from typing import Dict
+from typing import List
+from typing import Optional
+
+# HTTP Library
+import httpx
+
+
+CONTENT = Path(__file__).parent.parent / "tests" / "data" / "content.json"
+
+ACCEPT = "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8"  # noQA
+ACCEPT_JSON = "application/json"
+
+# Plone 6 image scales, as Volto requests them in srcset
+SCALES = (
+    "icon",
+    "tile",
+    "thumb",
+    "mini",
+    "preview",
+    "teaser",
+    "large",
+    "larger",
+    "great",
+    "huge",
+)
+
+# Traffic share of each scenario, editors only when credentials are given
+WEIGHTS = {"pages": 4, "api": 3, "images": 2, "editor": 1}
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+@dataclass
+class Scenario:
+    """A kind of client: the URLs it requests and the headers it sends."""
+
+    name: str
+    urls: List[str]
+    headers: Dict[str, str] = field(default_factory=dict)
+    weight: int = 1
+
+
+def load_content(path: Path = CONTENT) -> List[dict]:
+    """content.json as a list of items with their path."""
+    with open(path) as fp:
+        raw_data = json.load(fp)
+    items = []
+    for container, payload in raw_data:
+        items.append({**payload, "path": f"{container}/{payload['id']}"})
+    return items
+
+
+def build_scenarios(
+    items: List[dict], token: Optional[str] = None, weights: Dict[str, int] = WEIGHTS
+) -> List[Scenario]:
+    """Anonymous pages, API reads and image scales, plus editors with a token."""
+    paths = ["/"] + [item["path"] for item in items if item["@type"] != "Image"]
+    api = [f"/++api++{path}".rstrip("/") for path in paths]
+    api.append("/++api++/@navigation")
+    images = [
+        f"{item['path']}/@@images/image/{scale}"
+        for item in items
+        if item["@type"] == "Image"
+        for scale in SCALES
+    ]
+    scenarios = [
+        Scenario("pages", paths, {"Accept": ACCEPT}, weights["pages"]),
+        Scenario("api", api, {"Accept": ACCEPT_JSON}, weights["api"]),
+    ]
+    if images:
+        scenarios.append(
+            Scenario("images", images, {"Accept": ACCEPT}, weights["images"])
+        )
+    if token:
+        scenarios.append(
+            Scenario(
+                "editor",
+                paths + api,
+                {"Accept": ACCEPT_JSON, "Authorization": f"Bearer {token}"},
+                weights["editor"],
+            )
+        )
+    return scenarios
+
+
+def percentiles(values: List[float], points=PERCENTILES) -> Dict[str, float]:
+    """Nearest-rank percentiles, min and max of seconds in milliseconds, and count."""
+    ordered = sorted(values)
+    result = {"count": len(ordered)}
+    if not ordered:
+        return result
+    for point in points:
+        rank = max(math.ceil(point / 100 * len(ordered)), 1)
+        result[f"p{point}"] = round(ordered[rank - 1] * 1000, 3)
+    result["min"] = round(ordered[0] * 1000, 3)
+    result["max"] = round(ordered[-1] * 1000, 3)
+    return result
+
+
+@dataclass
+class Stats:
+    """Responses of one x-varnish-reqtype."""
+
+    requests: int = 0
+    errors: int = 0
+    hits: int = 0
+    latencies: List[float] = field(default_factory=list)
+    statuses: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    def observe(self, elapsed: float, status: int, hit: bool):
+        self.requests += 1
+        self.latencies.append(elapsed)
+        self.statuses[str(status)] += 1
+        if status >= 500:
+            self.errors += 1
+        if hit:
+            self.hits += 1
+
+    def fail(self, elapsed: float):
+        """A request that got no response at all."""
+        self.requests += 1
+        self.errors += 1
+        self.latencies.append(elapsed)
+        self.statuses["error"] += 1
+
+    def merge(self, other: "Stats"):
+        self.requests += other.requests
+        self.errors += other.errors
+        self.hits += other.hits
+        self.latencies.extend(other.latencies)
+        for status, count in other.statuses.items():
+            self.statuses[status] += count
+
+    def summary(self, elapsed: float) -> dict:
+        return {
+            "requests": self.requests,
+            "rps": round(self.requests / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": percentiles(self.latencies),
+            "hit_ratio": round(self.hits / self.requests, 4) if self.requests else 0,
+            "error_rate": round(self.errors / self.requests, 4) if self.requests else 0,
+            "statuses": dict(sorted(self.statuses.items())),
+        }
+
+
+class LoadGenerator:
+    """Concurrent clients replaying the scenarios against the public URL.
+
+    ``concurrency`` workers share one client and pick a scenario by weight
+    and a URL from it, until ``requests`` were sent or ``duration`` seconds
+    passed. Requests carry ``x-varnish-debug`` so every response says its
+    ``x-varnish-reqtype`` and whether it was a cache hit.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        scenarios: List[Scenario],
+        host: str = "plone.localhost",
+        concurrency: int = 32,
+        duration: Optional[float] = None,
+        requests: Optional[int] = None,
+        http2: bool = True,
+        timeout: float = 30.0,
+        seed: int = 42,
+    ):
+        if duration is None and requests is None:
+            raise ValueError("Give a duration, a number of requests or both")
+        self.base_url = base_url.rstrip("/")
+        self.scenarios = scenarios
+        self.host = host
+        self.concurrency = concurrency
+        self.duration = duration
+        self.requests = requests
+        self.http2 = http2
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.stats: Dict[str, Stats] = defaultdict(Stats)
+        self._sent = 0
+        self._deadline = float("inf")
+
+    def pick(self):
+        scenario = self.rng.choices(
+            self.scenarios, [scenario.weight for scenario in self.scenarios]
+        )[0]
+        return scenario, self.rng.choice(scenario.urls)
+
+    def more(self) -> bool:
+        if monotonic() >= self._deadline:
+            return False
+        if self.requests is not None and self._sent >= self.requests:
+            return False
+        self._sent += 1
+        return True
+
+    async def worker(self, client: httpx.AsyncClient):
+        while self.more():
+            scenario, url = self.pick()
+            headers = {"Host": self.host, "x-varnish-debug": "1", **scenario.headers}
+            start = monotonic()
+            try:
+                response = await client.get(url, headers=headers)
+            except httpx.HTTPError:
+                self.stats[scenario.name].fail(monotonic() - start)
+                continue
+            elapsed = monotonic() - start
+            reqtype = response.headers.get("x-varnish-reqtype") or scenario.name
+            hit = response.headers.get("x-cache") == "HIT"
+            self.stats[reqtype].observe(elapsed, response.status_code, hit)
+
+    async def run(self) -> dict:
+        # HTTP/2 without TLS needs prior knowledge, so HTTP/1.1 is disabled
+        async with httpx.AsyncClient(
+            base_url=self.base_url,
+            http1=not self.http2,
+            http2=self.http2,
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.concurrency),
+        ) as client:
+            started = datetime.now(timezone.utc)
+            start = monotonic()
+            if self.duration is not None:
+                self._deadline = start + self.duration
+            await asyncio.gather(
+                *(self.worker(client) for _ in range(self.concurrency))
+            )
+            elapsed = monotonic() - start
+        return self.report(started, elapsed)
+
+    def report(self, started: datetime, elapsed: float) -> dict:
+        total = Stats()
+        for stats in self.stats.values():
+            total.merge(stats)
+        return {
+            "started": started.isoformat(),
+            "base_url": self.base_url,
+            "http2": self.http2,
+            "concurrency": self.concurrency,
+            "duration": round(elapsed, 3),
+            "scenarios": {
+                scenario.name: {"urls": len(scenario.urls), "weight": scenario.weight}
+                for scenario in self.scenarios
+            },
+            "reqtypes": {
+                reqtype: stats.summary(elapsed)
+                for reqtype, stats in sorted(self.stats.items())
+            },
+            "total": total.summary(elapsed),
+        }
+
+
+async def login(
+    base_url: str, username: str, password: str, host: str = "plone.localhost"
+) -> str:
+    """A JWT for editor traffic, from plone.restapi's @login."""
+    async with httpx.AsyncClient(base_url=base_url.rstrip("/")) as client:
+        response = await client.post(
+            "/++api++/@login",
+            headers={"Host": host, "Accept": ACCEPT_JSON},
+            json={"login": username, "password": password},
+        )
+        response.raise_for_status()
+        return response.json()["token"]
+
+
+def compare(baseline: dict, current: dict) -> dict:
+    """Relative change per reqtype of RPS, p95, hit ratio and error rate."""
+
+    def change(before: float, after: float) -> Optional[float]:
+        if not before:
+            return None
+        return round((after - before) / before, 4)
+
+    result = {}
+    for reqtype, after in {**current["reqtypes"], "total": current["total"]}.items():
+        if reqtype == "total":
+            before = baseline.get("total")
+        else:
+            before = baseline.get("reqtypes", {}).get(reqtype)
+        if not before:
+            continue
+        result[reqtype] = {
+            "rps": change(before["rps"], after["rps"]),
+            "p95": change(
+                before["latency_ms"].get("p95", 0), after["latency_ms"].get("p95", 0)
+            ),
+            "hit_ratio": round(after["hit_ratio"] - before["hit_ratio"], 4),
+            "error_rate": round(after["error_rate"] - before["error_rate"], 4),
+        }
+    return result
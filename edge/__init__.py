@@ -0,0 +1,9 @@
+"""In-process stand-in for the docker-compose stack.
+
+``edge.vcl`` mirrors etc/varnish.vcl, ``edge.proxy`` runs it as an asyncio
+Varnish node and ``edge.origin`` plays Volto and Plone. ``LocalStack`` wires
+them together so the tests and benchmarks run without containers.
+"""
+
+# Volto
+from edge.stack import LocalStack  # noqa: F401
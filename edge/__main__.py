@@ -0,0 +1,31 @@
+# Standard Library
+import argparse
+import asyncio
+
+# Volto
+from edge.stack import LocalStack
+
+
+async def main(nodes: int, active: int):
+    stack = LocalStack(nodes=nodes, active=active)
+    await stack.astart()
+    print(f"Traefik (public):  {stack.base_url}")
+    for node in stack.nodes:
+        print(f"{node.name}:         {node.url}")
+    print(f"Purger:            {stack.purger.url}")
+    print(f"Origin (internal): {stack.origin.url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stack.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the local caching stack")
+    parser.add_argument("--nodes", type=int, default=2, help="Varnish nodes")
+    parser.add_argument("--active", type=int, default=1, help="Nodes behind Traefik")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.nodes, args.active))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,403 @@
+# Standard Library
+import asyncio
+import bisect
+import re
+import shlex
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from dataclasses import field
+from typing import AsyncIterable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+# HTTP Library
+import httpx
+
+
+BAN_OPERATORS = ("==", "!=", "~", "!~", "<", "<=", ">", ">=")
+NUMERIC_FIELDS = ("obj.status", "obj.ttl", "obj.age", "obj.grace", "obj.keep")
+
+# varnishd defaults for ban_lurker_age and ban_lurker_sleep
+BAN_LURKER_AGE = 60.0
+BAN_LURKER_SLEEP = 0.01
+
+# Storage backends in bytes, as docker-compose.yml starts varnishd with
+# (-s html=malloc,256m -s blob=malloc,512m). Transient, for uncacheable
+# objects, is unbounded as in varnishd.
+STORAGE = {"html": 256 << 20, "blob": 512 << 20, "Transient": None}
+
+
+class BanError(ValueError):
+    """Raised for ban expressions varnishd would reject."""
+
+
+@dataclass
+class CachedObject:
+    status: int
+    reason: str
+    headers: httpx.Headers
+    body: bytes
+    t_origin: float
+    ttl: float
+    grace: float
+    keep: float = 0.0
+    hits: int = 0
+    xid: int = 0
+    vary: Dict[str, Optional[str]] = field(default_factory=dict)
+    hit_for_miss: bool = False
+    hit_for_pass: bool = False
+    url: str = ""
+    ban_seq: int = 0
+    storage: str = "html"
+    # A passed body still arriving from the backend, ``length`` bytes long
+    # when known. Such objects are delivered once and never stored.
+    stream: Optional[AsyncIterable[bytes]] = field(default=None, repr=False)
+    length: Optional[int] = None
+    _http: Optional[Dict[str, str]] = field(default=None, repr=False)
+
+    @property
+    def size(self) -> int:
+        """Bytes the object takes in its storage: body and headers."""
+        return len(self.body) + sum(
+            len(name) + len(value) for name, value in self.headers.raw
+        )
+
+    def http(self, name: str) -> Optional[str]:
+        """obj.http.<name>, read often enough by the ban lurker to memoize."""
+        if self._http is None:
+            self._http = dict(self.headers.items())
+        return self._http.get(name.lower())
+
+    def ttl_at(self, now: float) -> float:
+        """Remaining TTL, as obj.ttl reports it."""
+        return self.ttl - max(now - self.t_origin, 0.0)
+
+    def is_fresh(self, now: float) -> bool:
+        return self.ttl_at(now) > 0
+
+    def in_grace(self, now: float, grace: Optional[float] = None) -> bool:
+        """Within obj.grace, capped by req.grace when the VCL set one."""
+        if grace is not None:
+            grace = min(self.grace, grace)
+        else:
+            grace = self.grace
+        return self.ttl_at(now) + grace > 0
+
+    def is_dead(self, now: float) -> bool:
+        return self.ttl_at(now) + self.grace + self.keep <= 0
+
+
+@dataclass
+class Condition:
+    field: str
+    operator: str
+    argument: str
+
+    def value(self, req, obj: CachedObject, now: float):
+        if self.field == "req.url":
+            return req.url
+        if self.field.startswith("req.http."):
+            return req.headers.get(self.field[9:])
+        if self.field.startswith("obj.http."):
+            return obj.http(self.field[9:])
+        if self.field == "obj.status":
+            return obj.status
+        if self.field == "obj.ttl":
+            return obj.ttl_at(now)
+        if self.field == "obj.age":
+            return now - obj.t_origin
+        if self.field == "obj.grace":
+            return obj.grace
+        return obj.keep
+
+    def matches(self, req, obj: CachedObject, now: float) -> bool:
+        value = self.value(req, obj, now)
+        if self.field in NUMERIC_FIELDS:
+            argument = float(self.argument.rstrip("s"))
+            return {
+                "==": value == argument,
+                "!=": value != argument,
+                "<": value < argument,
+                "<=": value <= argument,
+                ">": value > argument,
+                ">=": value >= argument,
+            }[self.operator]
+        if self.operator == "==":
+            return value == self.argument
+        if self.operator == "!=":
+            return value != self.argument
+        found = value is not None and re.search(self.argument, value) is not None
+        return found if self.operator == "~" else not found
+
+
+def parse_ban(spec: str) -> List[Condition]:
+    """Parse a ban expression the way varnishd's ban parser does."""
+    lexer = shlex.shlex(spec, posix=True)
+    lexer.whitespace_split = True
+    lexer.escape = ""
+    try:
+        args = list(lexer)
+    except ValueError as exc:
+        raise BanError(str(exc))
+    conditions = []
+    i = 0
+    while i < len(args):
+        if conditions:
+            if args[i] != "&&":
+                raise BanError(f'Expected "&&" between conditions, found "{args[i]}"')
+            i += 1
+        if i + 3 > len(args):
+            raise BanError("Expected ban condition")
+        name, operator, argument = args[i : i + 3]
+        if not (
+            name == "req.url"
+            or name.startswith(("req.http.", "obj.http."))
+            or name in NUMERIC_FIELDS
+        ):
+            raise BanError(f'Unknown or unsupported field "{name}"')
+        if operator not in BAN_OPERATORS:
+            raise BanError(f'Expected operator, got "{operator}"')
+        if name not in NUMERIC_FIELDS and operator not in ("==", "!=", "~", "!~"):
+            raise BanError(f"Operator {operator} not supported for {name}")
+        conditions.append(Condition(name, operator, argument))
+        i += 3
+    if not conditions:
+        raise BanError("Expected ban condition")
+    return conditions
+
+
+@dataclass
+class Ban:
+    spec: str
+    seq: int
+    conditions: List[Condition]
+    created: float = field(default_factory=time.monotonic)
+
+    @property
+    def uses_req(self) -> bool:
+        """Bans on req.* can only be tested at lookup time."""
+        return any(c.field.startswith("req.") for c in self.conditions)
+
+    def matches(self, req, obj: CachedObject, now: float) -> bool:
+        return all(c.matches(req, obj, now) for c in self.conditions)
+
+
+class Storage:
+    """A malloc storage backend holding at most ``size`` bytes.
+
+    Objects that do not fit push out the least recently used ones, as
+    varnishd's LRU nuking does. Only objects of this storage are nuked, so
+    a flood of blobs cannot evict pages stored elsewhere.
+    """
+
+    def __init__(self, name: str, size: Optional[int] = None):
+        self.name = name
+        self.size = size
+        self.used = 0
+        self.nuked = 0
+        self.failed = 0
+        self.lru: "OrderedDict[int, Tuple[Tuple[str, str], CachedObject]]" = (
+            OrderedDict()
+        )
+
+    def allocate(self, key: Tuple[str, str], obj: CachedObject, evict) -> bool:
+        """Make room for obj, calling evict(key, obj) for each nuked object."""
+        size = obj.size
+        if self.size is not None:
+            if size > self.size:
+                self.failed += 1
+                return False
+            while self.used + size > self.size:
+                _, (old_key, old) = self.lru.popitem(last=False)
+                self.used -= old.size
+                self.nuked += 1
+                evict(old_key, old)
+        self.lru[id(obj)] = (key, obj)
+        self.used += size
+        return True
+
+    def touch(self, obj: CachedObject):
+        if id(obj) in self.lru:
+            self.lru.move_to_end(id(obj))
+
+    def free(self, obj: CachedObject):
+        if self.lru.pop(id(obj), None) is not None:
+            self.used -= obj.size
+
+
+@dataclass
+class Lookup:
+    """Outcome of a cache lookup: hit, grace, hit-for-miss, hit-for-pass,
+    busy or miss."""
+
+    kind: str
+    obj: Optional[CachedObject] = None
+    busy: Optional[asyncio.Future] = None
+
+
+class Cache:
+    """Object storage, ban list and waiting list of one Varnish node."""
+
+    def __init__(self, clock=time.monotonic, storage=STORAGE):
+        self.clock = clock
+        self.storages = {name: Storage(name, size) for name, size in storage.items()}
+        self.objects: Dict[Tuple[str, str], List[CachedObject]] = {}
+        self.bans: List[Ban] = []
+        self.busy: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.ban_seq = 0
+        self.bans_tested = 0
+        self.bans_lurker_tested = 0
+        self.bans_lurker_obj_killed = 0
+        self.bans_deleted = 0
+
+    def ban(self, spec: str) -> Ban:
+        conditions = parse_ban(spec)
+        self.ban_seq += 1
+        ban = Ban(spec, self.ban_seq, conditions, created=self.clock())
+        self.bans.append(ban)
+        return ban
+
+    def lurk(self, age: float = BAN_LURKER_AGE) -> int:
+        """One ban lurker pass, returning the number of objects killed.
+
+        Objects are tested against bans older than ``age`` that only use
+        obj.* fields. A req.* ban stops an object from moving past it, so
+        every ban from there on stays on the list until a lookup tests the
+        object. Bans no object needs anymore are deleted.
+        """
+        now = self.clock()
+        ripe = [ban for ban in self.bans if now - ban.created >= age]
+        lurkable = [ban for ban in ripe if not ban.uses_req]
+        lurkable_seqs = [ban.seq for ban in lurkable]
+        req_seqs = [ban.seq for ban in ripe if ban.uses_req]
+        newest = ripe[-1].seq if ripe else 0
+        killed = 0
+        for key, variants in list(self.objects.items()):
+            for obj in list(variants):
+                if obj.ban_seq >= newest:
+                    continue
+                start = bisect.bisect_right(lurkable_seqs, obj.ban_seq)
+                for ban in lurkable[start:]:
+                    self.bans_lurker_tested += 1
+                    if ban.matches(None, obj, now):
+                        variants.remove(obj)
+                        self.storage(obj).free(obj)
+                        killed += 1
+                        break
+                else:
+                    blocked = bisect.bisect_right(req_seqs, obj.ban_seq)
+                    if blocked < len(req_seqs):
+                        obj.ban_seq = req_seqs[blocked] - 1
+                    else:
+                        obj.ban_seq = newest
+            if not variants:
+                del self.objects[key]
+        self.bans_lurker_obj_killed += killed
+        self._delete_unused_bans()
+        return killed
+
+    def _delete_unused_bans(self):
+        oldest = min(
+            (obj.ban_seq for variants in self.objects.values() for obj in variants),
+            default=self.ban_seq,
+        )
+        # The newest ban always stays, as in varnishd
+        kept = [ban for ban in self.bans[:-1] if ban.seq > oldest] + self.bans[-1:]
+        self.bans_deleted += len(self.bans) - len(kept)
+        self.bans = kept
+
+    def _banned(self, req, obj: CachedObject, now: float) -> bool:
+        for ban in reversed(self.bans):
+            if ban.seq <= obj.ban_seq:
+                break
+            self.bans_tested += 1
+            if ban.matches(req, obj, now):
+                return True
+        obj.ban_seq = self.ban_seq
+        return False
+
+    def lookup(self, key: Tuple[str, str], req) -> Lookup:
+        now = self.clock()
+        variants = self.objects.get(key, [])
+        stale = None
+        for obj in list(variants):
+            if obj.is_dead(now) or self._banned(req, obj, now):
+                variants.remove(obj)
+                self.storage(obj).free(obj)
+                continue
+            if not vary_matches(obj, req):
+                continue
+            if obj.hit_for_miss or obj.hit_for_pass:
+                if obj.is_fresh(now):
+                    kind = "hit-for-pass" if obj.hit_for_pass else "hit-for-miss"
+                    return Lookup(kind, obj)
+                continue
+            if obj.is_fresh(now):
+                self.storage(obj).touch(obj)
+                return Lookup("hit", obj)
+            if stale is None and obj.in_grace(now, getattr(req, "grace", None)):
+                stale = obj
+        busy = self.busy.get(key)
+        if stale is not None:
+            self.storage(stale).touch(stale)
+            return Lookup("grace", stale, busy)
+        if busy is not None:
+            return Lookup("busy", None, busy)
+        return Lookup("miss")
+
+    def storage(self, obj: CachedObject) -> Storage:
+        return self.storages[obj.storage]
+
+    def insert(self, key: Tuple[str, str], obj: CachedObject) -> bool:
+        """Store obj, False when it is larger than its whole storage."""
+        obj.ban_seq = self.ban_seq
+        variants = []
+        for old in self.objects.get(key, []):
+            if old.vary == obj.vary:
+                self.storage(old).free(old)
+            else:
+                variants.append(old)
+        if variants:
+            self.objects[key] = variants
+        else:
+            self.objects.pop(key, None)
+        if not self.storage(obj).allocate(key, obj, self._evict):
+            return False
+        self.objects[key] = [obj] + self.objects.get(key, [])
+        return True
+
+    def _evict(self, key: Tuple[str, str], obj: CachedObject):
+        variants = [o for o in self.objects.get(key, []) if o is not obj]
+        if variants:
+            self.objects[key] = variants
+        else:
+            self.objects.pop(key, None)
+
+    def purge_soft(self, key: Tuple[str, str], ttl: float = 0.0) -> int:
+        """purge.soft(): expire every variant under key, keeping its grace."""
+        now = self.clock()
+        variants = self.objects.get(key, [])
+        for obj in variants:
+            obj.ttl = min(obj.ttl, now - obj.t_origin + ttl)
+        return len(variants)
+
+    def __len__(self) -> int:
+        return sum(len(variants) for variants in self.objects.values())
+
+
+def vary_values(headers: httpx.Headers, req) -> Dict[str, Optional[str]]:
+    """Request header values named by a response's Vary header."""
+    names = [
+        name.strip().lower()
+        for value in headers.get_list("vary")
+        for name in value.split(",")
+        if name.strip()
+    ]
+    return {name: req.headers.get(name) for name in names}
+
+
+def vary_matches(obj: CachedObject, req) -> bool:
+    return all(req.headers.get(name) == value for name, value in obj.vary.items())
@@ -0,0 +1,230 @@
+# Standard Library
+import asyncio
+import re
+from dataclasses import dataclass
+from dataclasses import field
+from http import HTTPStatus
+from typing import AsyncIterable
+from typing import Awaitable
+from typing import Callable
+from typing import Optional
+from typing import Tuple
+
+# HTTP Library
+import httpx
+
+
+HOP_BY_HOP = (
+    "connection",
+    "keep-alive",
+    "proxy-connection",
+    "transfer-encoding",
+    "te",
+    "trailer",
+    "upgrade",
+)
+
+# A single byte range, the only kind Varnish answers
+BYTE_RANGE = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$")
+
+
+@dataclass
+class Request:
+    method: str
+    url: str
+    headers: httpx.Headers
+    body: bytes = b""
+    client: str = "127.0.0.1"
+    # req.restarts, req.grace, req.backend_hint, req.hash_always_miss,
+    # bereq.is_bgfetch and bereq.first_byte_timeout, set by Varnish and the
+    # VCL
+    restarts: int = 0
+    grace: Optional[float] = None
+    backend_hint: Optional[str] = None
+    hash_always_miss: bool = False
+    is_bgfetch: bool = False
+    first_byte_timeout: Optional[float] = None
+
+    @property
+    def path(self) -> str:
+        return self.url.split("?", 1)[0]
+
+    @property
+    def query(self) -> str:
+        return self.url.partition("?")[2]
+
+
+@dataclass
+class Response:
+    status: int = 200
+    headers: httpx.Headers = field(default_factory=httpx.Headers)
+    body: bytes = b""
+    reason: str = ""
+    # A body sent as it is produced instead of body, ``length`` bytes long
+    # or chunked when unknown. The server calls its aclose() once done.
+    stream: Optional[AsyncIterable[bytes]] = None
+    length: Optional[int] = None
+
+    def __post_init__(self):
+        if not isinstance(self.headers, httpx.Headers):
+            self.headers = httpx.Headers(self.headers)
+        if not self.reason:
+            try:
+                self.reason = HTTPStatus(self.status).phrase
+            except ValueError:
+                self.reason = "Unknown"
+
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+def strip_hop_by_hop(headers: httpx.Headers) -> httpx.Headers:
+    """Return a copy of headers without hop-by-hop fields."""
+    return httpx.Headers(
+        [
+            (name, value)
+            for name, value in headers.multi_items()
+            if name.lower() not in HOP_BY_HOP and name.lower() != "content-length"
+        ]
+    )
+
+
+def byte_range(value: Optional[str], length: int) -> Optional[Tuple[int, int]]:
+    """First and last byte a Range header asks for, None to send everything.
+
+    Several ranges or a malformed header get the whole body, as from
+    Varnish. Raises ValueError for a range past the end (416).
+    """
+    match = BYTE_RANGE.match(value or "")
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        # The last ``last`` bytes
+        if int(last) == 0:
+            raise ValueError(value)
+        return max(length - int(last), 0), length - 1
+    start = int(first)
+    end = min(int(last), length - 1) if last else length - 1
+    if start >= length or start > end:
+        raise ValueError(value)
+    return start, end
+
+
+async def read_request(reader: asyncio.StreamReader, client: str) -> Optional[Request]:
+    """Parse one HTTP/1.1 request from the stream, None on EOF."""
+    line = await reader.readline()
+    while line in (b"\r\n", b"\n"):
+        line = await reader.readline()
+    if not line:
+        return None
+    method, url, _ = line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+    raw_headers = []
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        raw_headers.append((name.strip(), value.strip()))
+    headers = httpx.Headers(raw_headers)
+    body = b""
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        body = b"".join(chunks)
+    elif headers.get("content-length"):
+        body = await reader.readexactly(int(headers["content-length"]))
+    return Request(method=method, url=url, headers=headers, body=body, client=client)
+
+
+def encode_response(response: Response, head: bool = False) -> bytes:
+    """Serialize a response, setting Content-Length from the body.
+
+    Only the head of a streamed response, send_stream() writes the rest.
+    """
+    lines = [f"HTTP/1.1 {response.status} {response.reason}"]
+    for name, value in strip_hop_by_hop(response.headers).multi_items():
+        lines.append(f"{name}: {value}")
+    if response.status >= 200 and response.status not in (204, 304):
+        if response.stream is None:
+            lines.append(f"Content-Length: {len(response.body)}")
+        elif response.length is not None:
+            lines.append(f"Content-Length: {response.length}")
+        else:
+            lines.append("Transfer-Encoding: chunked")
+    payload = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+    if head or response.stream is not None:
+        return payload
+    return payload + response.body
+
+
+async def send_stream(writer: asyncio.StreamWriter, response: Response):
+    """Write a streamed body chunk by chunk, waiting for the client to read."""
+    chunked = response.length is None
+    async for chunk in response.stream:
+        if not chunk:
+            continue
+        if chunked:
+            writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        else:
+            writer.write(chunk)
+        await writer.drain()
+    if chunked:
+        writer.write(b"0\r\n\r\n")
+
+
+class Server:
+    """Minimal asyncio HTTP/1.1 server with keep-alive."""
+
+    def __init__(self, handler: Handler, host: str = "127.0.0.1", port: int = 0):
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _serve(self, reader, writer):
+        client = writer.get_extra_info("peername")[0]
+        try:
+            while True:
+                request = await read_request(reader, client)
+                if request is None:
+                    break
+                try:
+                    response = await self.handler(request)
+                except Exception as exc:
+                    response = Response(status=503, body=repr(exc).encode())
+                head = request.method == "HEAD"
+                writer.write(encode_response(response, head=head))
+                if response.stream is not None:
+                    try:
+                        if not head and response.status not in (204, 304):
+                            await send_stream(writer, response)
+                    finally:
+                        await response.stream.aclose()
+                await writer.drain()
+                if request.headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,621 @@
+"""Stub origin standing in for Volto and Plone behind Traefik.
+
+It answers the routes the tests use: Volto server side rendering, the
+``/++api++`` REST API (content, ``@users``, ``@login``, ``@registry``,
+``@workflow``, ``@navigation``, ``@search``, ``@actions``, ``@user-context``)
+and ``@@images``/``@@download`` blobs.
+Cache headers follow plone.app.caching once the registry enables caching,
+and edits send PURGE requests the way plone.cachepurging does.
+"""
+
+# Standard Library
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import re
+import uuid
+from collections import Counter
+from datetime import datetime
+from datetime import timezone
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from urllib.parse import parse_qs
+
+# HTTP Library
+import httpx
+
+# Volto
+from edge.http import Request
+from edge.http import Response
+from edge.http import Server
+from edge.http import byte_range
+
+
+PUBLIC_HOST = "plone.localhost"
+
+CACHING_ENABLED = "plone.caching.interfaces.ICacheSettings.enabled"
+PURGING_ENABLED = "plone.cachepurging.interfaces.ICachePurgingSettings.enabled"
+CACHING_PROXIES = "plone.cachepurging.interfaces.ICachePurgingSettings.cachingProxies"
+PURGED_TYPES = "plone.app.caching.interfaces.IPloneCacheSettings.purgedContentTypes"
+
+SCALES = {
+    "huge": 1600,
+    "great": 1200,
+    "larger": 1000,
+    "large": 800,
+    "teaser": 600,
+    "preview": 400,
+    "mini": 200,
+    "thumb": 128,
+    "tile": 64,
+    "icon": 32,
+    "listing": 16,
+}
+
+# plone.app.caching operations, as configured by the with-caching-proxy profile
+OPERATIONS = {
+    "strongCaching": "max-age=86400, proxy-revalidate, public",
+    "moderateCaching": "max-age=0, s-maxage=86400, must-revalidate",
+    "terseCaching": "max-age=10, s-maxage=60, proxy-revalidate, public",
+}
+DO_NOT_CACHE = "max-age=0, must-revalidate, private"
+# What a role-keyed caching add-on sends for reads that only depend on the
+# roles: browsers revalidate, a shared cache may keep them
+ROLE_CACHE = "max-age=0, must-revalidate"
+
+# API reads that only depend on the user's roles once role-keyed caching
+# is on, the rest is personalized
+ROLE_ENDPOINTS = (None, "@navigation", "@search")
+
+WORKFLOW_TYPES = ("Document", "Folder", "News Item", "Event")
+
+# Volto's build output, hashed file names every page links to
+STATIC_ASSETS = {
+    "/static/css/client.5d1d2f5c.css": "text/css",
+    "/static/js/client.4c5e2a1b.js": "application/javascript",
+}
+STATIC_CACHE_CONTROL = "public, max-age=31536000"
+
+BLOB_PATH = re.compile(r"^(?P<path>.*?)/@@(?P<view>images|download)(/(?P<rest>.*))?$")
+HASHED_SCALE = re.compile(r"^(?P<field>[a-z_]+)-(?P<width>\d+)-(?P<hash>[0-9a-f]{32})")
+
+# Blob fields content can have, and plone.namedfile's stream iterator chunk
+BLOB_FIELDS = ("image", "file")
+CHUNK_SIZE = 1 << 16
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+
+
+def json_response(data, status: int = 200, headers: Optional[dict] = None):
+    return Response(
+        status=status,
+        headers={"Content-Type": "application/json", **(headers or {})},
+        body=json.dumps(data).encode(),
+    )
+
+
+async def iter_blob(data: bytes, start: int, end: int):
+    """Bytes start to end of a blob, a chunk at a time as from ZODB."""
+    view = memoryview(data)
+    for offset in range(start, end + 1, CHUNK_SIZE):
+        yield bytes(view[offset : min(offset + CHUNK_SIZE, end + 1)])
+        await asyncio.sleep(0)
+
+
+def purge_paths(path: str, item: dict) -> List[str]:
+    """Paths plone.app.caching and plone.namedfile purge for an item."""
+    paths = [path, f"{path}/", f"{path}/view", f"/++api++{path}"]
+    if item["@type"] == "Image":
+        paths.append(f"{path}/@@images/image")
+        paths.extend(f"{path}/@@images/image/{scale}" for scale in SCALES)
+        paths.append(f"{path}/@@download/image")
+        paths.append(f"{path}/image_view_fullscreen")
+    elif item["@type"] == "File":
+        paths.append(f"{path}/@@download/file")
+    return paths
+
+
+class Origin:
+    """Volto and Plone as seen through Traefik's internal routers."""
+
+    def __init__(self):
+        self.server = Server(self.handle)
+        self.content = {}
+        self.registry = {}
+        self.users = {"admin": {"password": "admin", "roles": ["Manager"]}}
+        self.tokens = {}
+        self.requests = Counter()
+        self.delay = 0.0
+        # Delay of Volto's answers alone, as a stalled Node.js process
+        self.volto_delay = 0.0
+        # Answer everything with this status, as a broken Plone would
+        self.error: Optional[int] = None
+        self.purge_targets: Optional[Callable[[], List[str]]] = None
+        # Extra response headers per path, as Volto's per-route policy or a
+        # plone.app.caching operation sets Surrogate-Control
+        self.route_headers: Dict[str, Dict[str, str]] = {}
+        # Answer @user-context with a role fingerprint and vary shared API
+        # reads on it, as a role-keyed caching add-on would
+        self.user_context = False
+        self._client = None
+        self._tasks = set()
+
+    @property
+    def url(self) -> str:
+        return self.server.url
+
+    async def start(self):
+        self._client = httpx.AsyncClient(timeout=10.0)
+        await self.server.start()
+
+    async def close(self):
+        await self.server.close()
+        for task in list(self._tasks):
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+
+    async def handle(self, req: Request) -> Response:
+        self.requests[req.url] += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.error:
+            return Response(status=self.error, body=b"Service Unavailable")
+        path = req.path
+        if self.volto_delay and not path.startswith("/++api++"):
+            await asyncio.sleep(self.volto_delay)
+        if path.startswith("/++api++"):
+            response = self.plone(req, path[len("/++api++") :] or "/")
+        elif BLOB_PATH.match(path):
+            # Volto proxies blobs to the backend
+            response = self.blob(req, path)
+        else:
+            response = self.volto(req, path)
+        response.headers.update(self.route_headers.get(path, {}))
+        return response
+
+    # Helpers
+
+    def authenticate(self, req: Request) -> Optional[str]:
+        auth = req.headers.get("authorization", "")
+        if auth.startswith("Basic "):
+            login, _, password = base64.b64decode(auth[6:]).decode().partition(":")
+            user = self.users.get(login)
+            if user and user["password"] == password:
+                return login
+        elif auth.startswith("Bearer "):
+            return self.tokens.get(auth[7:])
+        match = re.search(r"auth_token=([^;]+)", req.headers.get("cookie", ""))
+        if match:
+            return self.tokens.get(match.group(1))
+        return None
+
+    def viewable(self, item: dict, user: Optional[str]) -> bool:
+        return bool(user) or item.get("review_state") in (None, "published")
+
+    def cache_headers(self, response: Response, user, rule: str, operation: str):
+        """Apply a plone.app.caching ruleset when caching is enabled."""
+        if not self.registry.get(CACHING_ENABLED):
+            return response
+        response.headers["X-Cache-Rule"] = rule
+        response.headers["X-Cache-Operation"] = f"plone.app.caching.{operation}"
+        if user:
+            response.headers["Cache-Control"] = DO_NOT_CACHE
+        else:
+            response.headers["Cache-Control"] = OPERATIONS[operation]
+        return response
+
+    def normalize(self, path: str) -> str:
+        return "/" + "/".join(part for part in path.split("/") if part)
+
+    def split(self, path: str):
+        """Split a path into content path, endpoint and endpoint arguments."""
+        parts = [part for part in path.split("/") if part]
+        for i, part in enumerate(parts):
+            if part.startswith("@"):
+                return self.normalize("/".join(parts[:i])), part, parts[i + 1 :]
+        return self.normalize(path), None, []
+
+    def serialize(self, path: str, item: dict, host: str) -> dict:
+        base = f"http://{host}"
+        data = {key: value for key, value in item.items() if not key.startswith("_")}
+        data["@id"] = f"{base}{path}"
+        data["parent"] = {"@id": f"{base}{path.rsplit('/', 1)[0]}"}
+        if item["@type"] == "Image":
+            image = item["_image"]
+            digest = hashlib.md5(item["modified"].encode()).hexdigest()
+            data["image"] = {
+                "content-type": image["content-type"],
+                "filename": image["filename"],
+                "size": len(image["data"]),
+                "download": f"{base}{path}/@@images/image-260-{digest}.png",
+                "scales": {
+                    name: {
+                        "download": f"{base}{path}/@@images/image-{width}-{digest}.png",
+                        "width": width,
+                    }
+                    for name, width in SCALES.items()
+                },
+            }
+        if "_file" in item:
+            file = item["_file"]
+            data["file"] = {
+                "content-type": file["content-type"],
+                "filename": file["filename"],
+                "size": len(file["data"]),
+                "download": f"{base}{path}/@@download/file",
+            }
+        data["items"] = [
+            {"@id": f"{base}{child}", "@type": sub["@type"], "title": sub["title"]}
+            for child, sub in self.children(path)
+        ]
+        return data
+
+    def children(self, path: str):
+        prefix = "" if path == "/" else path
+        for child, item in self.content.items():
+            if child.rsplit("/", 1)[0] == prefix:
+                yield child, item
+
+    # Plone
+
+    def plone(self, req: Request, path: str) -> Response:
+        user = self.authenticate(req)
+        host = req.headers.get("host", PUBLIC_HOST)
+        path, endpoint, args = self.split(path)
+        response = self.plone_dispatch(req, user, host, path, endpoint, args)
+        response.headers["Vary"] = "Accept"
+        if self.user_context and endpoint in ROLE_ENDPOINTS:
+            response.headers["Vary"] = "Accept, X-User-Context-Hash"
+            if response.headers.get("Cache-Control") == DO_NOT_CACHE:
+                response.headers["Cache-Control"] = ROLE_CACHE
+        response.headers["Via"] = "waitress"
+        return response
+
+    def plone_dispatch(self, req, user, host, path, endpoint, args) -> Response:
+        method = req.method
+        if endpoint == "@login" and method == "POST":
+            return self.login(req)
+        if method in ("GET", "HEAD"):
+            return self.plone_get(req, user, host, path, endpoint)
+        if not user:
+            return json_response(
+                {"type": "Unauthorized", "message": "You are not authorized."}, 401
+            )
+        if endpoint == "@users" and method == "POST":
+            return self.add_user(req)
+        if endpoint == "@registry" and method == "PATCH":
+            self.registry.update(json.loads(req.body or b"{}"))
+            return Response(status=204)
+        if endpoint == "@workflow" and method == "POST":
+            return self.transition(path, args, host)
+        if endpoint is None and method == "POST":
+            return self.add(path, json.loads(req.body or b"{}"), host)
+        if endpoint is None and method == "PATCH":
+            return self.update(path, json.loads(req.body or b"{}"))
+        if endpoint is None and method == "DELETE":
+            return self.delete(path)
+        return json_response({"type": "NotFound", "message": "Not found"}, 404)
+
+    def plone_get(self, req, user, host, path, endpoint) -> Response:
+        if endpoint == "@navigation":
+            items = [
+                {"@id": f"http://{host}{child}", "title": item["title"]}
+                for child, item in self.children("/")
+                if not item.get("exclude_from_nav") and self.viewable(item, user)
+            ]
+            data = {"@id": f"http://{host}/@navigation", "items": items}
+            return self.cache_headers(
+                json_response(data), user, "plone.content.dynamic", "terseCaching"
+            )
+        if endpoint == "@search":
+            return self.cache_headers(
+                json_response(self.search(req, user, host, path)),
+                user,
+                "plone.content.dynamic",
+                "terseCaching",
+            )
+        if endpoint == "@registry":
+            return json_response(self.registry)
+        if endpoint == "@user-context" and self.user_context:
+            return self.context_hash(user)
+        if endpoint == "@actions":
+            return self.actions(user, host)
+        if endpoint is not None:
+            return json_response({"type": "NotFound", "message": "Not found"}, 404)
+        if path == "/":
+            item = {"@type": "Plone Site", "id": "Plone", "title": "Site"}
+        else:
+            item = self.content.get(path)
+        if item is None:
+            return json_response(
+                {"type": "NotFound", "message": "Resource not found"}, 404
+            )
+        if not self.viewable(item, user):
+            return json_response(
+                {"type": "Unauthorized", "message": "You are not authorized."}, 401
+            )
+        return self.cache_headers(
+            json_response(self.serialize(path, item, host)),
+            user,
+            "plone.content.itemView",
+            "terseCaching",
+        )
+
+    def search(self, req: Request, user, host: str, path: str) -> dict:
+        """Catalog search below path by SearchableText and portal_type."""
+        query = parse_qs(req.query)
+        text = " ".join(query.get("SearchableText", [])).lower()
+        types = query.get("portal_type", [])
+        prefix = "" if path == "/" else path
+        items = [
+            {
+                "@id": f"http://{host}{child}",
+                "@type": item["@type"],
+                "title": item["title"],
+            }
+            for child, item in self.content.items()
+            if child.startswith(f"{prefix}/")
+            and self.viewable(item, user)
+            and text in item["title"].lower()
+            and (not types or item["@type"] in types)
+        ]
+        return {
+            "@id": f"http://{host}{req.url}",
+            "items": items,
+            "items_total": len(items),
+        }
+
+    def context_hash(self, user: Optional[str]) -> Response:
+        """The fingerprint of the user's roles, shared by users alike."""
+        roles = sorted(self.users[user]["roles"]) if user else ["Anonymous"]
+        digest = hashlib.sha256(",".join(roles).encode()).hexdigest()
+        return json_response({"roles": roles}, headers={"X-User-Context-Hash": digest})
+
+    def actions(self, user: Optional[str], host: str) -> Response:
+        """The user menu, personalized with the user's name."""
+        items = (
+            [{"id": "logout", "title": f"Log out {user}"}]
+            if user
+            else [{"id": "login", "title": "Log in"}]
+        )
+        data = {"@id": f"http://{host}/@actions", "user": items}
+        return self.cache_headers(
+            json_response(data), user, "plone.content.dynamic", "terseCaching"
+        )
+
+    def login(self, req: Request) -> Response:
+        data = json.loads(req.body or b"{}")
+        user = self.users.get(data.get("login"))
+        if not user or user["password"] != data.get("password"):
+            return json_response(
+                {"error": {"type": "Invalid credentials", "message": "Wrong login"}},
+                401,
+            )
+        token = uuid.uuid4().hex
+        self.tokens[token] = data["login"]
+        return json_response({"token": token})
+
+    def add_user(self, req: Request) -> Response:
+        data = json.loads(req.body or b"{}")
+        username = data.get("username")
+        if not username or username in self.users:
+            return json_response({"type": "BadRequest", "message": "Exists"}, 400)
+        self.users[username] = {
+            "password": data.get("password", ""),
+            "roles": data.get("roles", ["Member"]),
+        }
+        return json_response({"id": username, "username": username}, 201)
+
+    def add(self, container: str, payload: dict, host: str) -> Response:
+        if container != "/" and container not in self.content:
+            return json_response({"type": "NotFound", "message": "Not found"}, 404)
+        prefix = "" if container == "/" else container
+        o_id = payload.get("id") or payload.get("title", "item").lower()
+        path = f"{prefix}/{o_id}"
+        count = 0
+        while path in self.content:
+            count += 1
+            path = f"{prefix}/{o_id}-{count}"
+        item = {key: value for key, value in payload.items() if key not in BLOB_FIELDS}
+        item["id"] = path.rsplit("/", 1)[1]
+        item["UID"] = uuid.uuid4().hex
+        item["created"] = item["modified"] = now_iso()
+        if payload.get("@type") in WORKFLOW_TYPES:
+            item["review_state"] = "private"
+        for name in BLOB_FIELDS:
+            if name in payload:
+                blob = dict(payload[name])
+                if blob.get("encoding") == "base64":
+                    blob["data"] = base64.b64decode(blob["data"])
+                item[f"_{name}"] = blob
+        self.content[path] = item
+        self.purge(path, item)
+        return json_response(self.serialize(path, item, host), 201)
+
+    def update(self, path: str, payload: dict) -> Response:
+        item = self.content.get(path)
+        if item is None:
+            return json_response({"type": "NotFound", "message": "Not found"}, 404)
+        item.update({key: value for key, value in payload.items() if key != "id"})
+        item["modified"] = now_iso()
+        self.purge(path, item)
+        return Response(status=204)
+
+    def delete(self, path: str) -> Response:
+        item = self.content.pop(path, None)
+        if item is None:
+            return json_response({"type": "NotFound", "message": "Not found"}, 404)
+        for child in [child for child in self.content if child.startswith(path + "/")]:
+            self.content.pop(child)
+        self.purge(path, item)
+        return Response(status=204)
+
+    def transition(self, path: str, args: List[str], host: str) -> Response:
+        item = self.content.get(path)
+        if item is None or not args:
+            return json_response({"type": "NotFound", "message": "Not found"}, 404)
+        states = {"publish": "published", "retract": "private", "reject": "private"}
+        item["review_state"] = states.get(args[0], item.get("review_state"))
+        item["modified"] = now_iso()
+        self.purge(path, item)
+        return json_response(
+            {
+                "action": args[0],
+                "review_state": item["review_state"],
+                "time": item["modified"],
+            }
+        )
+
+    # Blobs
+
+    def blob(self, req: Request, path: str) -> Response:
+        match = BLOB_PATH.match(path)
+        user = self.authenticate(req)
+        content_path = self.normalize(match.group("path"))
+        item = self.content.get(content_path)
+        if item is None or not self.viewable(item, user):
+            return Response(status=404, body=b"Not Found", headers={"Via": "waitress"})
+        rest = match.group("rest") or ""
+        operation, rule = "moderateCaching", "plone.content.file"
+        scale = HASHED_SCALE.match(rest)
+        if scale:
+            operation, rule = "strongCaching", "plone.stableResource"
+            name = scale.group("field")
+        else:
+            # @@download alone is the primary field: the file of a File
+            name = rest.split("/")[0] or ("file" if "_file" in item else "image")
+        blob = item.get(f"_{name}")
+        if blob is None:
+            return Response(status=404, body=b"Not Found", headers={"Via": "waitress"})
+        headers = {
+            "Content-Type": blob["content-type"],
+            "Via": "waitress",
+            "Last-Modified": item["modified"],
+        }
+        if match.group("view") == "images":
+            response = Response(status=200, headers=headers, body=blob["data"])
+            return self.cache_headers(response, user, rule, operation)
+        # Downloads are streamed and answer a single byte range
+        data = blob["data"]
+        headers["Content-Disposition"] = f"attachment; filename={blob['filename']}"
+        headers["Accept-Ranges"] = "bytes"
+        try:
+            bounds = byte_range(req.headers.get("range"), len(data))
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{len(data)}"
+            return Response(status=416, headers=headers)
+        status, (start, end) = 200, (0, len(data) - 1)
+        if bounds is not None:
+            status, (start, end) = 206, bounds
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+        response = Response(
+            status=status,
+            headers=headers,
+            stream=iter_blob(data, start, end),
+            length=end - start + 1,
+        )
+        return self.cache_headers(response, user, rule, operation)
+
+    # Volto
+
+    def volto(self, req: Request, path: str) -> Response:
+        if path in ("/sitemap.xml", "/sitemap.xml.gz"):
+            return self.sitemap(req, path)
+        if path.startswith("/static/"):
+            return self.static(path)
+        path = self.normalize(path)
+        user = self.authenticate(req)
+        if path == "/":
+            item = {"title": "Site", "description": ""}
+        else:
+            item = self.content.get(path)
+        status = 200
+        if item is None:
+            status, item = 404, {"title": "This page does not seem to exist…"}
+        elif not self.viewable(item, user):
+            status, item = 401, {"title": "Unauthorized"}
+        body = (
+            "<!doctype html><html><head>"
+            f"<title>{item['title']}</title>"
+            '<link rel="stylesheet" href="/static/css/client.5d1d2f5c.css">'
+            '<script src="/static/js/client.4c5e2a1b.js" defer></script>'
+            "</head><body>"
+            f"<h1>{item['title']}</h1><p>{item.get('description', '')}</p>"
+            "</body></html>"
+        )
+        return Response(
+            status=status,
+            headers={
+                "Content-Type": "text/html; charset=utf-8",
+                "X-Powered-By": "Express",
+                # Volto renders JSON for ++api++-style Accept headers too
+                "Vary": "Accept",
+            },
+            body=body.encode(),
+        )
+
+    def static(self, path: str) -> Response:
+        """Volto's bundles, the same for every user and cached for a year."""
+        headers = {"X-Powered-By": "Express"}
+        if path not in STATIC_ASSETS:
+            return Response(status=404, headers=headers, body=b"Not Found")
+        headers["Content-Type"] = STATIC_ASSETS[path]
+        headers["Cache-Control"] = STATIC_CACHE_CONTROL
+        return Response(status=200, headers=headers, body=f"/* {path} */\n".encode())
+
+    def sitemap(self, req: Request, path: str) -> Response:
+        """Volto's sitemap of the content anonymous users can view."""
+        host = req.headers.get("host", PUBLIC_HOST)
+        urls = "".join(
+            f"<url><loc>http://{host}{child}</loc>"
+            f"<lastmod>{item['modified']}</lastmod></url>"
+            for child, item in sorted(self.content.items())
+            if self.viewable(item, None)
+        )
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            f"{urls}</urlset>"
+        ).encode()
+        if path.endswith(".gz"):
+            return Response(
+                headers={"Content-Type": "application/x-gzip"},
+                body=gzip.compress(body),
+            )
+        return Response(headers={"Content-Type": "application/xml"}, body=body)
+
+    # plone.cachepurging
+
+    def purge(self, path: str, item: dict):
+        if not (
+            self.registry.get(PURGING_ENABLED) and self.registry.get(CACHING_ENABLED)
+        ):
+            return
+        if item["@type"] not in self.registry.get(PURGED_TYPES, []):
+            return
+        if self.purge_targets is not None:
+            targets = self.purge_targets()
+        else:
+            targets = self.registry.get(CACHING_PROXIES, [])
+        task = asyncio.get_running_loop().create_task(
+            self.send_purges(targets, purge_paths(path, item))
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def send_purges(self, targets: List[str], paths: List[str]):
+        for target in targets:
+            for path in paths:
+                try:
+                    await self._client.request(
+                        "PURGE", f"{target}{path}", headers={"Host": PUBLIC_HOST}
+                    )
+                except httpx.HTTPError:
+                    pass
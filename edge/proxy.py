@@ -0,0 +1,657 @@
+# Standard Library
+import asyncio
+import gzip
+import logging
+from collections import Counter
+from collections import deque
+from time import monotonic
+from typing import Dict
+from typing import Optional
+from typing import Set
+from typing import Tuple
+from typing import Union
+
+# HTTP Library
+import httpx
+
+# Volto
+from edge import vcl
+from edge.cache import BAN_LURKER_AGE
+from edge.cache import BAN_LURKER_SLEEP
+from edge.cache import BanError
+from edge.cache import Cache
+from edge.cache import CachedObject
+from edge.cache import Lookup
+from edge.cache import vary_values
+from edge.http import Request
+from edge.http import Response
+from edge.http import Server
+from edge.http import byte_range
+from edge.http import strip_hop_by_hop
+from edge.origin import PUBLIC_HOST
+
+
+logger = logging.getLogger("edge.varnish")
+
+SYNTH_BODY = """<!DOCTYPE html>
+<html>
+  <head>
+    <title>{status} {reason}</title>
+  </head>
+  <body>
+    <h1>Error {status} {reason}</h1>
+    <p>{reason}</p>
+    <h3>Guru Meditation:</h3>
+    <p>XID: {xid}</p>
+    <hr>
+    <p>Varnish cache server</p>
+  </body>
+</html>
+"""
+
+
+# varnishd max_restarts
+MAX_RESTARTS = 4
+
+# std.log() lines kept, the shared memory log is a ring buffer too
+VSL_LINES = 10000
+
+
+def accepts_gzip(headers: httpx.Headers) -> bool:
+    for coding in headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() == "gzip":
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00")
+    return False
+
+
+def content_length(response: httpx.Response) -> Optional[int]:
+    value = response.headers.get("content-length", "")
+    return int(value) if value.isdigit() else None
+
+
+class Relay:
+    """A backend body sent on as it arrives, bytes ``start`` to ``end``.
+
+    aclose() gives the connection back to the pool whether the body was
+    read to the end or not.
+    """
+
+    def __init__(self, response: httpx.Response):
+        self.response = response
+        self.start = 0
+        self.end: Optional[int] = None
+
+    async def __aiter__(self):
+        stop = float("inf") if self.end is None else self.end + 1
+        offset = 0
+        async for chunk in self.response.aiter_raw():
+            first = max(self.start - offset, 0)
+            last = min(stop - offset, len(chunk))
+            offset += len(chunk)
+            if first < last:
+                yield chunk[first:last]
+            if offset >= stop:
+                break
+
+    async def aclose(self):
+        await self.response.aclose()
+
+
+def relayed(method: str, response: httpx.Response) -> bool:
+    """Whether a response has a body to relay."""
+    return method != "HEAD" and response.status_code not in (204, 304)
+
+
+class Varnish:
+    """One Varnish instance running the Python mirror of etc/varnish.vcl."""
+
+    def __init__(self, backend: str = "", name: str = "varnish"):
+        self.backend = backend
+        self.name = name
+        self.cache = Cache()
+        self.server = Server(self.handle)
+        self.stats = Counter()
+        self.ban_errors = []
+        self.ban_lurker_age = BAN_LURKER_AGE
+        self.ban_lurker_sleep = BAN_LURKER_SLEEP
+        self.first_byte_timeout = vcl.FIRST_BYTE_TIMEOUT
+        self.probe_timeout = vcl.PROBE_TIMEOUT
+        self.probe_interval = vcl.PROBE_INTERVAL
+        self.probe_threshold = vcl.PROBE_THRESHOLD
+        # .initial = .threshold: healthy until probes say otherwise
+        self.probes = {
+            name: deque([True] * vcl.PROBE_THRESHOLD, maxlen=vcl.PROBE_WINDOW)
+            for name in vcl.PROBES
+        }
+        # etc/shard.vcl: the peers' URLs by name and the shard director
+        self.peers: Dict[str, str] = {}
+        self.shard: Optional[vcl.Shard] = None
+        # VCL_Log records, what varnishlog and varnishncsa read
+        self.vsl = deque(maxlen=VSL_LINES)
+        self._xid = 1000
+        self._client = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def url(self) -> str:
+        return self.server.url
+
+    @property
+    def healthy(self) -> bool:
+        """Whether every backend is healthy."""
+        return all(self.backend_healthy(name) for name in self.probes)
+
+    def backend_healthy(self, name: str) -> bool:
+        """std.healthy(): enough good polls in the probe's window."""
+        return sum(self.probes[name]) >= self.probe_threshold
+
+    async def start(self):
+        self._client = httpx.AsyncClient(timeout=self.first_byte_timeout)
+        await self.server.start()
+        for coro in (self.ban_lurker(), self.probe()):
+            task = asyncio.get_running_loop().create_task(coro)
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def close(self):
+        await self.server.close()
+        for task in list(self._tasks):
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+
+    def reset(self):
+        """Start over with an empty cache, like a fresh container."""
+        self.cache = Cache()
+        self.stats.clear()
+        self.ban_errors.clear()
+        self.vsl.clear()
+
+    async def ban_lurker(self):
+        while True:
+            await asyncio.sleep(self.ban_lurker_sleep)
+            self.stats["bans_lurker_obj_killed"] += self.cache.lurk(self.ban_lurker_age)
+
+    async def probe(self):
+        while True:
+            await self.poll()
+            await asyncio.sleep(self.probe_interval)
+
+    async def poll(self) -> bool:
+        """One poll of each probe, HEAD through Traefik: whether all were good."""
+        polls = await asyncio.gather(
+            *(self.poll_backend(name, url) for name, url in vcl.PROBES.items())
+        )
+        return all(polls)
+
+    async def poll_backend(self, name: str, url: str) -> bool:
+        try:
+            response = await self._client.head(
+                self.backend + url,
+                headers={"Host": PUBLIC_HOST, "X-Varnish-Routed": "1"},
+                timeout=self.probe_timeout,
+            )
+            good = response.status_code == 200
+        except httpx.HTTPError:
+            good = False
+        was_healthy = self.backend_healthy(name)
+        self.probes[name].append(good)
+        if self.backend_healthy(name) != was_healthy:
+            state = "healthy" if not was_healthy else "sick"
+            logger.warning("%s: backend %s went %s", self.name, name, state)
+        return good
+
+    def next_xid(self) -> int:
+        self._xid += 2
+        return self._xid
+
+    def ban(self, spec: str):
+        try:
+            self.cache.ban(spec)
+        except BanError as exc:
+            # varnishd logs a VCL_Error and carries on
+            logger.warning("%s: ban(): %s", self.name, exc)
+            self.ban_errors.append(str(exc))
+            self.stats["bans_error"] += 1
+        else:
+            self.stats["bans"] += 1
+
+    async def handle(self, request: Request) -> Response:
+        req = Request(
+            method=request.method,
+            url=request.url,
+            headers=httpx.Headers(request.headers),
+            body=request.body,
+            client=request.client,
+        )
+        t_req = self.cache.clock()
+        xid = self.next_xid()
+        self.stats["client_req"] += 1
+        while True:
+            response = await self.process(req, xid, t_req)
+            if response is not None:
+                return response
+            req.restarts += 1
+            if req.restarts > MAX_RESTARTS:
+                return self.synth(req, xid, 503, "Too many restarts", restart=False)
+
+    async def process(self, req: Request, xid: int, t_req: float):
+        """One pass from vcl_recv to delivery, None when the VCL restarts."""
+        req.grace = None
+        req.backend_hint = None
+        req.hash_always_miss = False
+        verdict = vcl.vcl_recv(req, self.ban, self.shard, self.name)
+        if verdict.action == "synth":
+            return self.synth(req, xid, verdict.status, verdict.reason)
+        if req.backend_hint is not None:
+            self.stats["shard_forward"] += 1
+            return await self.forward(req, xid)
+        if verdict.action in ("pass", "pipe"):
+            self.stats["s_" + verdict.action] += 1
+            if verdict.action == "pass":
+                vcl.vcl_pass(req)
+            obj = await self.fetch(req, xid, cacheable=False)
+            return self.deliver(req, obj, xid, t_req)
+
+        if accepts_gzip(req.headers):
+            req.headers["accept-encoding"] = "gzip"
+        else:
+            req.headers.pop("accept-encoding", None)
+        key = (req.url, req.headers.get("host", ""))
+
+        def purge_soft(ttl: float):
+            self.cache.purge_soft(key, ttl)
+
+        while True:
+            if req.hash_always_miss:
+                # Other requests still find the objects this one replaces
+                lookup = Lookup("miss")
+            else:
+                lookup = self.cache.lookup(key, req)
+            if lookup.kind in ("hit", "grace"):
+                obj = lookup.obj
+                verdict = vcl.vcl_hit(
+                    req,
+                    obj,
+                    self.cache.clock(),
+                    purge_soft,
+                    self.backend_healthy(vcl.backend(req)),
+                )
+                if verdict.action == "synth":
+                    return self.synth(req, xid, verdict.status, verdict.reason)
+                if verdict.action == "restart":
+                    return None
+                obj.hits += 1
+                self.stats["cache_hit"] += 1
+                if lookup.kind == "grace":
+                    self.stats["cache_hit_grace"] += 1
+                    if lookup.busy is None:
+                        self.background_fetch(key, req)
+                return self.deliver(req, obj, xid, t_req, hit=True)
+            if lookup.kind == "busy":
+                self.stats["busy_sleep"] += 1
+                await asyncio.shield(lookup.busy)
+                self.stats["busy_wakeup"] += 1
+                continue
+            if lookup.kind == "hit-for-pass":
+                self.stats["cache_hitpass"] += 1
+                vcl.vcl_pass(req)
+                obj = await self.fetch(req, xid, cacheable=False)
+                return self.deliver(req, obj, xid, t_req)
+            verdict = vcl.vcl_miss(req, purge_soft)
+            if verdict.action == "synth":
+                return self.synth(req, xid, verdict.status, verdict.reason)
+            if lookup.kind == "hit-for-miss":
+                self.stats["cache_hitmiss"] += 1
+                # bereq.uncacheable is only set by pass and hit-for-pass
+                obj = await self.fetch(req, xid, key=key)
+            else:
+                self.stats["cache_miss"] += 1
+                obj = await self.fetch(req, xid, key=key, busy=True)
+            if obj is None:
+                # The fetch was abandoned
+                return self.synth(req, xid, 503, "Backend fetch failed")
+            return self.deliver(req, obj, xid, t_req)
+
+    async def forward(self, req: Request, xid: int) -> Response:
+        """Pass to the peer that owns the URL and deliver its answer as is."""
+        headers = strip_hop_by_hop(req.headers)
+        headers["X-Varnish"] = str(xid)
+        try:
+            response = await self._client.send(
+                httpx.Request(
+                    req.method,
+                    self.peers[req.backend_hint] + req.url,
+                    headers=headers,
+                    content=req.body,
+                ),
+                stream=True,
+            )
+            if relayed(req.method, response):
+                body, stream = b"", Relay(response)
+            else:
+                stream = None
+                try:
+                    body = b"".join([chunk async for chunk in response.aiter_raw()])
+                finally:
+                    await response.aclose()
+        except httpx.HTTPError:
+            self.stats["backend_fail"] += 1
+            obj = self.backend_error(req, xid, uncacheable=True)
+            status, reason = obj.status, obj.reason
+            headers, body, stream = httpx.Headers(obj.headers), obj.body, None
+        else:
+            status, reason = response.status_code, response.reason_phrase
+            headers = strip_hop_by_hop(response.headers)
+        # vcl_deliver in etc/shard.vcl returns before the debug headers
+        headers["X-Varnish"] = str(xid)
+        via = headers.get("via")
+        headers["Via"] = f"{via}, {vcl.VIA}" if via else vcl.VIA
+        return Response(
+            status=status,
+            headers=headers,
+            body=body,
+            reason=reason,
+            stream=stream,
+            length=content_length(response) if stream else None,
+        )
+
+    def background_fetch(self, key, req: Request):
+        bereq = Request(
+            req.method,
+            req.url,
+            httpx.Headers(req.headers),
+            b"",
+            req.client,
+            is_bgfetch=True,
+        )
+        # The busy object exists from the lookup on, as in varnishd
+        future = asyncio.get_running_loop().create_future()
+        self.cache.busy[key] = future
+        task = asyncio.create_task(
+            self.fetch(bereq, self.next_xid(), key=key, busy=future)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def fetch(
+        self,
+        req: Request,
+        xid: int,
+        key=None,
+        busy: Union[bool, asyncio.Future] = False,
+        cacheable=True,
+        uncacheable=False,
+    ) -> Optional[CachedObject]:
+        """Fetch from the backend, run vcl_backend_response and store.
+
+        Returns None when the VCL abandoned the fetch.
+        """
+        future = None
+        if busy is True:
+            future = asyncio.get_running_loop().create_future()
+            self.cache.busy[key] = future
+        elif busy:
+            future = busy
+        try:
+            return await self._fetch(req, xid, key, cacheable, uncacheable)
+        finally:
+            if future is not None:
+                self.cache.busy.pop(key, None)
+                future.set_result(None)
+
+    async def _fetch(
+        self, req: Request, xid: int, key, cacheable: bool, uncacheable: bool
+    ):
+        uncacheable = uncacheable or not cacheable
+        method = req.method
+        headers = httpx.Headers(req.headers)
+        headers["X-Varnish"] = str(xid)
+        if cacheable:
+            method = "GET" if method == "HEAD" else method
+            headers.pop("range", None)
+            headers["accept-encoding"] = "gzip"
+        bereq = Request(
+            method,
+            req.url,
+            strip_hop_by_hop(headers),
+            req.body,
+            is_bgfetch=req.is_bgfetch,
+        )
+        vcl.vcl_backend_fetch(bereq)
+        if not self.backend_healthy(vcl.backend(bereq)):
+            # The director has no healthy backend
+            self.stats["backend_unhealthy"] += 1
+            return self.backend_error(bereq, xid, uncacheable)
+        self.stats["backend_req"] += 1
+        start = monotonic()
+        try:
+            response = await self._client.send(
+                self._client.build_request(
+                    bereq.method,
+                    self.backend + bereq.url,
+                    headers=bereq.headers,
+                    content=bereq.body,
+                    timeout=bereq.first_byte_timeout or self.first_byte_timeout,
+                ),
+                stream=True,
+            )
+        except httpx.HTTPError:
+            self.stats["backend_fail"] += 1
+            return self.backend_error(bereq, xid, uncacheable)
+        fetch_time = monotonic() - start
+        headers = strip_hop_by_hop(response.headers)
+        # beresp.http.Content-Length, the VCL sees it before the body
+        length = content_length(response)
+        if length is not None:
+            headers["Content-Length"] = str(length)
+        beresp = vcl.rfc2616_ttl(response.status_code, headers)
+        beresp.fetch_time = fetch_time
+        vcl.vcl_backend_response(bereq, beresp, uncacheable)
+        # Passed bodies stream through unless they are to be (un)compressed
+        streamed = (
+            (not cacheable or beresp.hit_for_pass)
+            and relayed(bereq.method, response)
+            and not beresp.do_gzip
+            and not beresp.headers.get("content-encoding")
+        )
+        if streamed and not beresp.abandon:
+            self.stats["s_stream"] += 1
+            body, stream = b"", Relay(response)
+        else:
+            stream = None
+            try:
+                body = b"".join([chunk async for chunk in response.aiter_raw()])
+            except httpx.HTTPError:
+                self.stats["backend_fail"] += 1
+                return self.backend_error(bereq, xid, uncacheable)
+            finally:
+                await response.aclose()
+        if beresp.abandon:
+            self.stats["fetch_failed"] += 1
+            return None
+        if beresp.do_gzip and not beresp.headers.get("content-encoding"):
+            body = self.do_gzip(beresp.headers, body)
+        obj = CachedObject(
+            status=beresp.status,
+            reason=response.reason_phrase,
+            headers=beresp.headers,
+            body=body,
+            t_origin=self.cache.clock(),
+            ttl=beresp.ttl,
+            grace=beresp.grace,
+            keep=beresp.keep,
+            xid=xid,
+            vary=vary_values(beresp.headers, req),
+            url=req.url,
+            storage=beresp.storage,
+            stream=stream,
+            length=length,
+        )
+        if not cacheable:
+            return obj
+        if beresp.uncacheable or beresp.hit_for_pass:
+            marker = CachedObject(
+                status=obj.status,
+                reason=obj.reason,
+                headers=obj.headers,
+                body=b"",
+                t_origin=obj.t_origin,
+                ttl=obj.ttl,
+                grace=0.0,
+                xid=xid,
+                vary=obj.vary,
+                hit_for_miss=not beresp.hit_for_pass,
+                hit_for_pass=beresp.hit_for_pass,
+                url=obj.url,
+                storage="Transient",
+            )
+            self.cache.insert(key, marker)
+        elif not obj.is_dead(obj.t_origin):
+            self.cache.insert(key, obj)
+        return obj
+
+    def do_gzip(self, headers: httpx.Headers, body: bytes) -> bytes:
+        """beresp.do_gzip: compress, add Vary and weaken the ETag as varnishd."""
+        self.stats["n_gzip"] += 1
+        headers.pop("content-length", None)
+        headers["Content-Encoding"] = "gzip"
+        vary = [v.strip() for v in headers.get("vary", "").split(",") if v.strip()]
+        if "accept-encoding" not in (v.lower() for v in vary):
+            headers["Vary"] = ", ".join(vary + ["Accept-Encoding"])
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        return gzip.compress(body)
+
+    def backend_error(
+        self, bereq: Request, xid: int, uncacheable: bool
+    ) -> Optional[CachedObject]:
+        """vcl_backend_error: abandon, or the builtin 503 that is never cached."""
+        if vcl.vcl_backend_error(bereq, uncacheable).action == "abandon":
+            self.stats["fetch_failed"] += 1
+            return None
+        reason = "Backend fetch failed"
+        return CachedObject(
+            status=503,
+            reason=reason,
+            headers=httpx.Headers(
+                {
+                    "Content-Type": "text/html; charset=utf-8",
+                    "Retry-After": "5",
+                }
+            ),
+            body=SYNTH_BODY.format(status=503, reason=reason, xid=xid).encode(),
+            t_origin=self.cache.clock(),
+            ttl=0.0,
+            grace=0.0,
+            xid=xid,
+        )
+
+    def synth(
+        self, req: Request, xid: int, status: int, reason: str, restart=True
+    ) -> Optional[Response]:
+        """vcl_synth, None when it restarts the request."""
+        headers = httpx.Headers(
+            {
+                "Server": "Varnish",
+                "X-Varnish": str(xid),
+                "Content-Type": "text/html; charset=utf-8",
+                "Retry-After": "5",
+            }
+        )
+        verdict = vcl.vcl_synth(req, status, reason, headers, self.vsl.append)
+        if verdict.action == "restart" and restart:
+            return None
+        self.stats["s_synth"] += 1
+        phrase = verdict.reason
+        body = b""
+        if status != 301:
+            body = SYNTH_BODY.format(status=status, reason=reason, xid=xid).encode()
+        return Response(status=status, headers=headers, body=body, reason=phrase)
+
+    def deliver(
+        self, req: Request, obj: CachedObject, xid: int, t_req: float, hit=False
+    ) -> Optional[Response]:
+        headers = httpx.Headers(obj.headers)
+        body = obj.body
+        headers["X-Varnish"] = f"{xid} {obj.xid}" if hit else str(xid)
+        headers["Age"] = str(int(max(t_req - obj.t_origin, 0)))
+        via = headers.get("via")
+        headers["Via"] = f"{via}, {vcl.VIA}" if via else vcl.VIA
+        verdict = vcl.vcl_deliver(req, headers, obj, t_req, self.vsl.append)
+        if verdict.action == "synth":
+            self.discard(obj.stream)
+            return self.synth(req, xid, verdict.status, verdict.reason)
+        if verdict.action == "restart":
+            self.discard(obj.stream)
+            return None
+        if headers.get("content-encoding") == "gzip" and not accepts_gzip(req.headers):
+            self.stats["n_gunzip"] += 1
+            body = gzip.decompress(body)
+            del headers["content-encoding"]
+        length = obj.length if obj.stream is not None else len(body)
+        status, reason = obj.status, obj.reason
+        if status == 200 and length is not None:
+            headers["Accept-Ranges"] = "bytes"
+            try:
+                bounds = self.http_range(req, length)
+            except ValueError:
+                self.discard(obj.stream)
+                headers["Content-Range"] = f"bytes */{length}"
+                return Response(
+                    status=416, headers=headers, reason="Range Not Satisfiable"
+                )
+            if bounds is not None:
+                start, end = bounds
+                status, reason = 206, "Partial Content"
+                headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+                if obj.stream is not None:
+                    obj.stream.start, obj.stream.end = start, end
+                else:
+                    body = body[start : end + 1]
+                length = end - start + 1
+        return Response(
+            status=status,
+            headers=headers,
+            body=body,
+            reason=reason,
+            stream=obj.stream,
+            length=length if obj.stream is not None else None,
+        )
+
+    def http_range(self, req: Request, length: int) -> Optional[Tuple[int, int]]:
+        """http_range_support: one byte range of a 200 response to a GET."""
+        if req.method != "GET" or "range" not in req.headers:
+            return None
+        self.stats["s_range"] += 1
+        return byte_range(req.headers["range"], length)
+
+    def discard(self, stream):
+        """Give back the backend connection of a body that is not sent."""
+        if stream is not None:
+            task = asyncio.create_task(stream.aclose())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+
+class Balancer:
+    """Round-robin across the running Varnish nodes, as Traefik does."""
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.active = len(nodes)
+        self.server = Server(self.handle)
+        self._next = 0
+
+    @property
+    def url(self) -> str:
+        return self.server.url
+
+    async def handle(self, request: Request) -> Response:
+        if not self.active:
+            return Response(status=503, body=b"Service Unavailable")
+        node = self.nodes[self._next % self.active]
+        self._next += 1
+        return await node.handle(request)
@@ -0,0 +1,118 @@
+# Standard Library
+import asyncio
+import threading
+from typing import List
+
+# Volto
+from edge import vcl
+from edge.origin import PUBLIC_HOST
+from edge.origin import Origin
+from edge.proxy import Balancer
+from edge.proxy import Varnish
+from purger.service import Purger
+
+
+class LocalStack:
+    """Stub origin, Varnish nodes and a balancer on a background event loop.
+
+    Mirrors docker-compose.yml: ``base_url`` plays Traefik's public routers,
+    each node plays one Varnish container, the origin plays Volto and
+    Plone and sends its purges to the purger, which fans them out to the
+    running nodes. ``scale`` behaves like ``docker compose up --scale
+    varnish=N`` and ``shard`` like switching to docker-compose.shard.yml.
+    """
+
+    host = PUBLIC_HOST
+    name = "local"
+
+    def __init__(self, nodes: int = 2, active: int = 1):
+        self.origin = Origin()
+        self.nodes = [Varnish(name=f"varnish-{i + 1}") for i in range(nodes)]
+        self.balancer = Balancer(self.nodes)
+        self.balancer.active = active
+        self.purger = Purger(self.discover, sites=[PUBLIC_HOST], http2=False)
+        self.loop = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return self.balancer.url
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.base_url}/++api++"
+
+    @property
+    def varnish_url(self) -> str:
+        return self.nodes[0].url
+
+    @property
+    def varnish_urls(self) -> List[str]:
+        """The two instances docker-compose.yml publishes on 8000-8001."""
+        return [node.url for node in self.nodes[:2]]
+
+    def instance_url(self, index: int) -> str:
+        return self.nodes[index - 1].url
+
+    @property
+    def active_nodes(self) -> List[Varnish]:
+        return self.nodes[: self.balancer.active]
+
+    async def astart(self):
+        await self.origin.start()
+        for node in self.nodes:
+            node.backend = self.origin.url
+            await node.start()
+        await self.balancer.server.start()
+        await self.purger.start()
+        self.origin.purge_targets = lambda: [self.purger.url]
+
+    async def aclose(self):
+        await self.purger.close()
+        await self.balancer.server.close()
+        for node in self.nodes:
+            await node.close()
+        await self.origin.close()
+
+    def backend_requests(self, url: str) -> int:
+        """Requests the Varnish nodes sent to the origin for url."""
+        return self.origin.requests[url]
+
+    async def discover(self) -> List[str]:
+        return [node.url for node in self.active_nodes]
+
+    async def ascale(self, count: int):
+        for node in self.nodes[self.balancer.active : count]:
+            node.reset()
+        self.balancer.active = min(count, len(self.nodes))
+
+    async def ashard(self, enabled: bool):
+        peers = {node.name: node.url for node in self.active_nodes}
+        for node in self.nodes:
+            node.peers = peers
+            node.shard = vcl.Shard(list(peers)) if enabled else None
+
+    def start(self):
+        """Run the stack on its own event loop in a daemon thread."""
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+        self.call(self.astart())
+        return self
+
+    def stop(self):
+        self.call(self.aclose())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+    def call(self, coro):
+        """Run a coroutine on the stack's loop and wait for the result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def scale(self, count: int):
+        self.call(self.ascale(count))
+
+    def shard(self, enabled: bool = True):
+        """Route each URL to one owning node, or back to independent nodes."""
+        self.call(self.ashard(enabled))
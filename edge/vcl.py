@@ -0,0 +1,936 @@
+"""Python mirror of etc/varnish.vcl.
+
+Every function follows the VCL subroutine of the same name, so a change in
+the VCL has an obvious counterpart here.
+"""
+
+# Standard Library
+import bisect
+import hashlib
+import re
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from ipaddress import ip_address
+from ipaddress import ip_network
+from typing import Callable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+# HTTP Library
+import httpx
+
+
+# varnishd defaults
+DEFAULT_TTL = 120.0
+DEFAULT_GRACE = 10.0
+VIA = "1.1 varnish (Varnish/7.1)"
+
+# Health probes and timeout of the traefik_loadbalancer and traefik_volto
+# backends
+PROBE_URL = "/++api++/"
+VOLTO_PROBE_URL = "/"
+PROBES = {"plone": PROBE_URL, "volto": VOLTO_PROBE_URL}
+PROBE_TIMEOUT = 2.0
+PROBE_INTERVAL = 5.0
+PROBE_WINDOW = 5
+PROBE_THRESHOLD = 3
+FIRST_BYTE_TIMEOUT = 300.0
+# bereq.first_byte_timeout of express fetches, set in vcl_backend_fetch
+EXPRESS_FIRST_BYTE_TIMEOUT = 10.0
+# Routes Traefik hands to Plone, Volto gets the rest
+PLONE_ROUTES = re.compile(r"^/(\+\+api\+\+|ClassicUI)")
+
+# Grace added by extend_grace when the response has no stale-if-error, only
+# served while the backend is sick or failing
+STALE_IF_ERROR = 24 * 3600.0
+
+# TTL and grace set by anonymous_api_policy in etc/varnish.vcl, for the
+# statuses it stores and for a 404
+ANONYMOUS_API_TTL = 30.0
+ANONYMOUS_API_GRACE = 120.0
+ANONYMOUS_API_STATUS = (200, 203, 300, 301)
+ANONYMOUS_API_NOT_FOUND_TTL = 10.0
+
+# Hashed scale URLs, cached for a year and immutable for browsers
+HASHED_SCALE_URL = re.compile(r"/@@images/[a-z_]+-[0-9]+-[0-9a-f]{32}")
+HASHED_SCALE_TTL = 365 * 24 * 3600.0
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Blobs larger than this are passed and streamed, hit-for-pass for an hour
+LARGE_FILE = 10 << 20
+HIT_FOR_PASS_TTL = 3600.0
+
+# Status codes varnishd considers cacheable (cache_rfc2616.c)
+CACHEABLE_STATUS = (200, 203, 204, 300, 301, 302, 304, 307, 308, 404, 410, 414)
+
+# acl purge
+PURGE_ACL = tuple(
+    ip_network(net)
+    for net in (
+        "127.0.0.1/32",
+        "::1/128",
+        "172.16.0.0/12",
+        "10.0.0.0/8",
+        "192.168.0.0/16",
+    )
+)
+
+AUTH_COOKIE = re.compile(r"__ac(_(name|password|persistent))?=|_ZopeId|auth_token")
+PUBLIC_ASSET_URL = re.compile(r"^/static/|/@@(images|download)/")
+PUBLIC_ASSET_HEADERS = (
+    "x-varnish-public",
+    "x-varnish-public-denied",
+    "x-varnish-cookie",
+    "x-varnish-authorization",
+)
+# Anonymous answers after which a public asset is asked for with credentials
+DENIED_STATUS = (302, 401, 403, 404)
+# API reads shared by logged-in users with the same role fingerprint, which
+# Plone answers at USER_CONTEXT_URL
+ROLE_CACHED_URL = re.compile(
+    r"^/\+\+api\+\+(/[^@?]*)?(/@(navigation|breadcrumbs|actions|types|search))?/?(\?.*)?$"
+)
+USER_CONTEXT_URL = "/++api++/@user-context"
+USER_CONTEXT_TTL = 60.0
+USER_CONTEXT_DISABLED_TTL = 3600.0
+USER_CONTEXT_VARY = re.compile(r"(?i)(^|,)\s*x-user-context-hash\s*(,|$)")
+USER_CONTEXT_HEADERS = (
+    "x-varnish-context-url",
+    "x-varnish-context-done",
+    "x-user-context-hash",
+)
+BLOB_URL = re.compile(r"\/@@(images|download|)\/?(.*)?$")
+API_URL = re.compile(r"\/\+\+api\+\+/?(.*)?$")
+REDIRECT_URL = re.compile(r"^/old-folder/(.*)")
+KEEP_COOKIES = re.compile(
+    r";(sticky|I18N_LANGUAGE|statusmessages|__ac|_ZopeId|__cp|beaker\.session"
+    r"|authomatic|serverid|__rf|auth_token)="
+)
+API_PREFIX = re.compile(r"^/\+\+api\+\+")
+CONTENT_VIEW = re.compile(r"/(@@[^/]*|view|image_view_fullscreen)(/.*)?$")
+SOFT_PURGE_REQTYPES = re.compile(r"^(express|api)$")
+GZIP_ACCEPTED = re.compile(r"(?i)\bgzip\b(?!\s*;\s*q=0(\.0*)?\s*(,|$))")
+COMPRESSIBLE = re.compile(r"^(text/|application/(json|javascript|xml)|image/svg\+xml)")
+# normalize_query: paths that keep their query string and the marketing and
+# tracking parameters stripped everywhere else
+QUERY_ALLOWLIST = re.compile(r"/@{1,2}(search|querystring-search)(/|\?|$)")
+TRACKING_PARAMS = (
+    r"(utm_[a-z]+|gclid|gbraid|wbraid|dclid|fbclid|msclkid|yclid|igshid"
+    r"|mc_cid|mc_eid|_ga|_gl)"
+)
+NO_CACHE = re.compile(r"(private|no-cache|no-store)")
+PRIVATE = re.compile(r"(private|no-store)")
+STATIC_FILE = re.compile(
+    r"(?i)\.(pdf|asc|dat|txt|doc|xls|ppt|tgz|png|gif|jpeg|jpg|ico|swf|css|js)(\?.*)?$"
+)
+
+DEBUG_HEADERS = (
+    "x-varnish-action",
+    "x-cache-operation",
+    "x-cache-rule",
+    "x-powered-by",
+    "xkey",
+)
+
+# directors.shard() default replicas per backend on the hash ring
+SHARD_REPLICAS = 67
+
+STANDARD_METHODS = ("GET", "HEAD", "PUT", "POST", "PATCH", "TRACE", "OPTIONS", "DELETE")
+
+
+@dataclass
+class Verdict:
+    """What a subroutine returned: hash, pass, pipe, synth, restart, ..."""
+
+    action: str
+    status: int = 200
+    reason: str = ""
+
+
+@dataclass
+class BackendResponse:
+    """The beresp variables vcl_backend_response can change."""
+
+    status: int
+    headers: httpx.Headers
+    ttl: float = DEFAULT_TTL
+    grace: float = DEFAULT_GRACE
+    keep: float = 0.0
+    uncacheable: bool = False
+    # return (pass(ttl)): a hit-for-pass object, the body is only streamed
+    hit_for_pass: bool = False
+    do_gzip: bool = False
+    abandon: bool = False
+    # beresp.storage, the -s storage backend the object goes to
+    storage: str = "html"
+    # Seconds from vcl_backend_fetch to the response headers
+    fetch_time: float = 0.0
+
+
+def shard_hash(value: str) -> int:
+    """shard.key(): the first 32 bits of the SHA256 of value."""
+    return int.from_bytes(hashlib.sha256(value.encode()).digest()[:4], "big")
+
+
+class Shard:
+    """directors.shard(): a consistent hash ring over the peer instances.
+
+    Each backend gets ``replicas`` points on the ring and a key belongs to
+    the first point at or after it, so adding or removing an instance only
+    moves the keys of that instance.
+    """
+
+    def __init__(self, backends: List[str] = (), replicas: int = SHARD_REPLICAS):
+        self.replicas = replicas
+        self.backends: List[str] = []
+        self.ring: List[Tuple[int, str]] = []
+        for name in backends:
+            self.add_backend(name)
+        self.reconfigure()
+
+    def add_backend(self, name: str):
+        self.backends.append(name)
+
+    def remove_backend(self, name: str):
+        self.backends.remove(name)
+
+    def reconfigure(self):
+        self.ring = sorted(
+            (shard_hash(f"{name}{replica}"), name)
+            for name in self.backends
+            for replica in range(self.replicas)
+        )
+
+    def key(self, value: str) -> int:
+        return shard_hash(value)
+
+    def backend(self, key: int) -> str:
+        index = bisect.bisect_left(self.ring, (key, ""))
+        return self.ring[index % len(self.ring)][1]
+
+
+def client_allowed(client: str, acl=PURGE_ACL) -> bool:
+    """Check a client address against an acl."""
+    try:
+        address = ip_address(client)
+    except ValueError:
+        return client in ("localhost", "backend")
+    return any(address in network for network in acl)
+
+
+def detect_protocol(req):
+    req.headers["X-Forwarded-Proto"] = "http"
+
+
+def detect_debug(req):
+    req.headers.pop("x-vcl-debug", None)
+    if req.headers.get("x-varnish-debug"):
+        req.headers["x-vcl-debug"] = "false"
+
+
+def detect_auth(req):
+    req.headers.pop("x-auth", None)
+    cookie = req.headers.get("cookie", "")
+    if (
+        (cookie and AUTH_COOKIE.search(cookie))
+        or req.headers.get("authenticate")
+        or req.headers.get("authorization")
+    ):
+        req.headers["x-auth"] = "true"
+
+
+def public_asset(req):
+    # Assets that are the same for every user are looked up without the
+    # credentials, vcl_deliver restarts with them when access is denied
+    if (
+        req.headers.get("x-auth")
+        and not req.headers.get("x-varnish-public-denied")
+        and req.method in ("GET", "HEAD")
+        and PUBLIC_ASSET_URL.search(req.url)
+    ):
+        req.headers["x-varnish-public"] = "1"
+        for name in ("cookie", "authorization"):
+            if req.headers.get(name):
+                req.headers[f"x-varnish-{name}"] = req.headers.pop(name)
+        req.headers.pop("x-auth")
+        detect_requesttype(req)
+
+
+def user_context(req) -> Optional[Verdict]:
+    # Selected API reads of logged-in users are looked up under the role
+    # fingerprint Plone answers at USER_CONTEXT_URL, never one the client
+    # sends: look that up first, vcl_deliver restarts with it
+    if (
+        req.headers.get("x-auth")
+        and req.method in ("GET", "HEAD")
+        and ROLE_CACHED_URL.search(req.url)
+    ):
+        if req.headers.get("x-user-context-hash"):
+            req.headers["x-varnish-reqtype"] = "role"
+        elif not req.headers.get("x-varnish-context-done"):
+            req.headers["x-varnish-context-url"] = req.url
+            req.url = USER_CONTEXT_URL
+            return Verdict("hash")
+    return None
+
+
+def detect_requesttype(req):
+    if req.headers.get("x-auth"):
+        reqtype = "auth"
+    elif BLOB_URL.search(req.url):
+        reqtype = "blob"
+    elif API_URL.search(req.url):
+        reqtype = "api"
+    else:
+        reqtype = "express"
+    req.headers["x-varnish-reqtype"] = reqtype
+
+
+def normalize_accept(req):
+    # Collapse Accept into a few canonical values
+    accept = req.headers.get("accept")
+    if req.headers["x-varnish-reqtype"] in ("api", "role"):
+        # ++api++ always answers with JSON
+        req.headers["accept"] = "application/json"
+    elif accept:
+        if "application/json" in accept:
+            req.headers["accept"] = "application/json"
+        elif "text/html" in accept:
+            req.headers["accept"] = "text/html"
+        elif "image/" in accept:
+            req.headers["accept"] = "image/*"
+        else:
+            req.headers["accept"] = "*/*"
+
+
+def normalize_accept_encoding(req):
+    # Look every object up as gzip so it is stored once, vcl_deliver
+    # restores the client's choice and Varnish gunzips for the rest
+    if req.restarts == 0:
+        accepted = GZIP_ACCEPTED.search(req.headers.get("accept-encoding", ""))
+        req.headers["x-accept-gzip"] = "1" if accepted else "0"
+    req.headers["accept-encoding"] = "gzip"
+
+
+def querysort(url: str) -> str:
+    """std.querysort(): sort the query parameters, dropping empty ones."""
+    path, _, query = url.partition("?")
+    params = sorted(param for param in query.split("&") if param)
+    return f"{path}?{'&'.join(params)}" if params else path
+
+
+def normalize_query(req):
+    # Paths whose query string the backend reads as a whole are left alone
+    if QUERY_ALLOWLIST.search(req.url):
+        return
+    url = req.url
+    # Strip marketing and tracking parameters, nothing renders them
+    if re.search(rf"[?&]{TRACKING_PARAMS}(=|&|$)", url):
+        url = re.sub(rf"&{TRACKING_PARAMS}(=[^&]*)?(?=&|$)", "", url)
+        url = re.sub(rf"\?{TRACKING_PARAMS}(=[^&]*)?(&|$)", "?", url, count=1)
+    # Same parameters in another order are the same page
+    req.url = re.sub(r"\?$", "", querysort(url))
+
+
+def process_redirects(req) -> Optional[Verdict]:
+    if REDIRECT_URL.search(req.url):
+        req.headers["x-redirect-to"] = REDIRECT_URL.sub(r"^/new-folder/\1", req.url)
+    if req.headers.get("x-redirect-to"):
+        return Verdict("synth", 301, req.headers["x-redirect-to"])
+    return None
+
+
+def sanitize_cookies(req):
+    """Keep only the cookies Plone and Volto care about."""
+    if not req.headers.get("cookie"):
+        return
+    cookie = ";" + req.headers["cookie"]
+    cookie = re.sub(r"; +", ";", cookie)
+    cookie = KEEP_COOKIES.sub(r"; \1=", cookie)
+    cookie = re.sub(r";[^ ][^;]*", "", cookie)
+    cookie = re.sub(r"^[; ]+|[; ]+$", "", cookie)
+    if cookie:
+        req.headers["cookie"] = cookie
+    else:
+        del req.headers["cookie"]
+
+
+def shard_route(req, shard: Optional[Shard], identity: str) -> Optional[Verdict]:
+    """etc/shard.vcl: pass to the owning peer, None to look up locally.
+
+    Without a shard director (etc/peers.vcl) every URL is looked up here.
+    """
+    if shard is None or req.headers.get("x-varnish-shard"):
+        return None
+    # Key on the normalized URL, as the cache lookup does
+    owner = shard.backend(shard.key(req.headers.get("host", "") + req.url))
+    if owner == identity:
+        return None
+    # The purger sends the owner the same refresh, it fetches the URL once
+    if req.headers.get("x-varnish-purge-refresh"):
+        return Verdict("synth", 200, "Refreshed by the owner.")
+    req.backend_hint = owner
+    req.headers["x-varnish-shard"] = identity
+    # The owner gunzips for clients without gzip
+    if req.headers.get("x-accept-gzip") == "0":
+        req.headers.pop("accept-encoding", None)
+    return Verdict("pass")
+
+
+def vcl_recv(
+    req,
+    ban: Callable[[str], None],
+    shard: Optional[Shard] = None,
+    identity: str = "",
+) -> Verdict:
+    req.headers["X-Varnish-Routed"] = "1"
+    # Flags vcl_hit and vcl_synth set for restarted requests only
+    if req.restarts == 0:
+        req.headers.pop("x-varnish-refresh", None)
+        req.headers.pop("x-varnish-stale", None)
+        req.headers.pop("x-varnish-purge-refresh", None)
+        for name in PUBLIC_ASSET_HEADERS + USER_CONTEXT_HEADERS:
+            req.headers.pop(name, None)
+    detect_protocol(req)
+    detect_debug(req)
+    detect_auth(req)
+    detect_requesttype(req)
+    redirect = process_redirects(req)
+    if redirect:
+        return redirect
+    normalize_query(req)
+    sanitize_cookies(req)
+    # Serve assets that do not depend on the user from the shared cache
+    public_asset(req)
+    # Share API reads between users with the same roles
+    context = user_context(req)
+    if context:
+        return context
+
+    if req.headers.get("x-auth") and not req.headers.get("x-user-context-hash"):
+        return Verdict("pass")
+
+    if req.method == "PURGE":
+        if not client_allowed(req.client):
+            return Verdict("synth", 405, "Not allowed.")
+        if req.headers.get("xkey"):
+            # Invalidate every object tagged with this content key
+            ban(f"obj.http.xkey == {req.headers['xkey']}")
+            return Verdict("synth", 200, "Purged.")
+        elif req.headers.get("x-purge-refresh") == "1":
+            # Refresh in place: fetch the URL as a GET with a forced miss,
+            # readers keep getting the old object until the new one
+            # replaces it
+            req.method = "GET"
+            req.hash_always_miss = True
+            req.headers["x-varnish-purge-refresh"] = "1"
+            # Refresh the variant browsers get
+            if not req.headers.get("accept"):
+                blob = req.headers["x-varnish-reqtype"] == "blob"
+                req.headers["accept"] = "image/*" if blob else "text/html"
+            normalize_accept(req)
+            # Only that variant is fetched: every other Accept variant and
+            # the role-keyed objects of the URL would keep the old content
+            ban(
+                f"obj.http.x-url == {req.url}"
+                f" && obj.http.x-accept != {req.headers['accept']}"
+            )
+            ban(f"obj.http.x-url == {req.url} && obj.http.x-roles ~ .")
+        else:
+            # Volto pages and API responses are soft purged unless the
+            # request sets X-Purge-Soft: 0, anything else unless it sets
+            # X-Purge-Soft: 1
+            if not req.headers.get("x-purge-soft"):
+                soft = SOFT_PURGE_REQTYPES.search(req.headers["x-varnish-reqtype"])
+                req.headers["x-purge-soft"] = "1" if soft else "0"
+            if req.headers["x-purge-soft"] == "1":
+                # Look the object up, vcl_hit and vcl_miss soft purge it
+                return Verdict("hash")
+            ban(f"obj.http.x-url == {req.url}")
+            return Verdict("synth", 200, "Purged.")
+    elif req.method == "BAN":
+        if not client_allowed(req.client):
+            return Verdict("synth", 405, "Not allowed.")
+        ban(
+            f"obj.http.x-host == {req.headers.get('host', '')}"
+            f" && obj.http.x-url == {req.url}"
+        )
+        return Verdict("synth", 200, "Ban added")
+    elif req.method not in STANDARD_METHODS:
+        return Verdict("pipe")
+    elif req.method not in ("GET", "HEAD", "OPTIONS"):
+        return Verdict("pass")
+    normalize_accept(req)
+    normalize_accept_encoding(req)
+    # vcl_hit restarted the request to replace an object past its grace
+    if req.headers.get("x-varnish-refresh"):
+        req.grace = 0.0
+    # Hand the request to the instance that owns the URL, if that is not us
+    return shard_route(req, shard, identity) or Verdict("hash")
+
+
+def vcl_synth(
+    req, status: int, reason: str, headers: httpx.Headers, log: Callable[[str], None]
+) -> Verdict:
+    """Deliver with the reason phrase to send, or restart after a failed fetch."""
+    if (
+        status == 503
+        and not req.headers.get("x-varnish-stale")
+        and not req.headers.get("x-auth")
+        and not req.headers.get("x-varnish-purge-refresh")
+        and req.method in ("GET", "HEAD")
+    ):
+        # The fetch failed: look again for a stale object (stale-if-error)
+        req.headers.pop("x-varnish-refresh", None)
+        req.headers["x-varnish-stale"] = "1"
+        return Verdict("restart")
+    req.headers["x-varnish-handling"] = "synth"
+    log_request(req, status, headers, "", log)
+    if status == 301:
+        headers["location"] = reason
+        return Verdict("deliver", status, "Moved")
+    return Verdict("deliver", status, reason)
+
+
+def soft_purge(purge_soft: Callable[[float], None]) -> Verdict:
+    # Expire the object but keep its grace: the next request gets the stale
+    # copy while a single background fetch refreshes it
+    purge_soft(0.0)
+    return Verdict("synth", 200, "Soft purged.")
+
+
+def vcl_hit(
+    req, obj, now: float, purge_soft: Callable[[float], None], healthy: bool
+) -> Verdict:
+    req.headers["x-varnish-handling"] = "hit"
+    if req.method == "PURGE":
+        return soft_purge(purge_soft)
+    grace = obj.http("x-grace")
+    if obj.ttl_at(now) >= 0:
+        # A pure unadulterated hit, deliver it
+        return Verdict("deliver")
+    elif obj.ttl_at(now) + (obj.grace if grace is None else float(grace)) > 0:
+        # Object is in grace, deliver it
+        # Automatically triggers a background fetch
+        return Verdict("deliver")
+    elif req.headers.get("x-varnish-stale") or not healthy:
+        # The backend is sick or failed, deliver the stale object rather
+        # than an error (stale-if-error). A background fetch retries.
+        req.headers["x-varnish-stale"] = "1"
+        return Verdict("deliver")
+    # Past its grace, restart to fetch a fresh copy
+    req.headers["x-varnish-refresh"] = "1"
+    return Verdict("restart")
+
+
+def vcl_miss(req, purge_soft: Callable[[float], None]) -> Verdict:
+    req.headers["x-varnish-handling"] = "miss"
+    if req.method == "PURGE":
+        # purge.soft() reaches every variant, whatever the request varies on
+        return soft_purge(purge_soft)
+    if req.headers.get("x-varnish-stale"):
+        # The fetch failed and there is no stale object either
+        return Verdict("synth", 503, "Backend fetch failed")
+    return Verdict("fetch")
+
+
+def vcl_pass(req) -> Verdict:
+    req.headers["x-varnish-handling"] = "pass"
+    return Verdict("fetch")
+
+
+def cache_control(
+    headers: httpx.Headers, directive: str, header: str = "cache-control"
+) -> Optional[float]:
+    """Return the numeric value of a Cache-Control (or Surrogate-Control)
+    directive."""
+    match = re.search(
+        rf"(?:^|[,\s]){re.escape(directive)}\s*=\s*\"?(\d+)",
+        headers.get(header, ""),
+    )
+    return float(match.group(1)) if match else None
+
+
+def rfc2616_ttl(status: int, headers: httpx.Headers) -> BackendResponse:
+    """Initial beresp.ttl and beresp.grace as varnishd computes them."""
+    beresp = BackendResponse(status=status, headers=headers)
+    if status not in CACHEABLE_STATUS:
+        beresp.ttl = -1.0
+        return beresp
+    age = float(headers.get("age", "0") or 0)
+    max_age = cache_control(headers, "s-maxage")
+    if max_age is None:
+        max_age = cache_control(headers, "max-age")
+    if max_age is not None:
+        beresp.ttl = max(max_age - age, 0.0)
+    elif headers.get("expires"):
+        try:
+            expires = parsedate_to_datetime(headers["expires"]).timestamp()
+            date = headers.get("date")
+            now = parsedate_to_datetime(date).timestamp() if date else time.time()
+            beresp.ttl = max(expires - now, 0.0)
+        except (TypeError, ValueError):
+            beresp.ttl = 0.0
+    stale = cache_control(headers, "stale-while-revalidate")
+    if stale is not None:
+        beresp.grace = stale
+    return beresp
+
+
+def content_key(url: str) -> str:
+    """Path of the content item a URL renders, shared by SSR, API and blobs."""
+    key = API_PREFIX.sub("", url.split("?", 1)[0], count=1)
+    key = CONTENT_VIEW.sub("", key, count=1)
+    key = re.sub(r"(.)/$", r"\1", key)
+    return key or "/"
+
+
+def tag_content(bereq, headers: httpx.Headers):
+    if not headers.get("xkey"):
+        headers["xkey"] = content_key(bereq.url)
+
+
+def extend_grace(beresp: BackendResponse):
+    """Keep the object for stale-if-error past the grace the rules chose,
+    from Surrogate-Control, then Cache-Control, else STALE_IF_ERROR."""
+    headers = beresp.headers
+    headers["x-grace"] = f"{beresp.grace:.3f}"
+    stale_if_error = cache_control(headers, "stale-if-error", "surrogate-control")
+    if stale_if_error is None:
+        stale_if_error = cache_control(headers, "stale-if-error")
+    if stale_if_error is None:
+        stale_if_error = STALE_IF_ERROR
+    headers["x-stale-if-error"] = f"{stale_if_error:.3f}"
+    beresp.grace += stale_if_error
+
+
+def surrogate_control(beresp: BackendResponse):
+    """TTL and grace from Surrogate-Control, meant for this cache alone."""
+    headers = beresp.headers
+    headers["x-varnish-action"] = "INSERT (surrogate control)"
+    beresp.uncacheable = False
+    beresp.ttl = cache_control(headers, "max-age", "surrogate-control")
+    stale = cache_control(headers, "stale-while-revalidate", "surrogate-control")
+    if stale is not None:
+        beresp.grace = stale
+
+
+def anonymous_api_policy(beresp: BackendResponse):
+    """Anonymous ++api++ responses Plone sends without caching headers.
+
+    Only statuses a shared cache may store without explicit freshness, a
+    404 briefly and without the outage stretch. 401, 403 and the rest are
+    passed.
+    """
+    headers = beresp.headers
+    if beresp.status in ANONYMOUS_API_STATUS:
+        headers["x-varnish-action"] = (
+            f"INSERT (anonymous API: {ANONYMOUS_API_TTL:.0f}s caching"
+            f" / {ANONYMOUS_API_GRACE:.0f}s grace)"
+        )
+        beresp.uncacheable = False
+        beresp.ttl = ANONYMOUS_API_TTL
+        beresp.grace = ANONYMOUS_API_GRACE
+        extend_grace(beresp)
+    elif beresp.status == 404:
+        headers["x-varnish-action"] = (
+            f"INSERT (anonymous API: {ANONYMOUS_API_NOT_FOUND_TTL:.0f}s caching"
+            " of not found)"
+        )
+        beresp.uncacheable = False
+        beresp.ttl = ANONYMOUS_API_NOT_FOUND_TTL
+        beresp.grace = 0.0
+    else:
+        headers["x-varnish-action"] = (
+            "FETCH (pass - anonymous API status not cacheable)"
+        )
+        beresp.uncacheable = True
+        beresp.ttl = 120.0
+
+
+def backend(req) -> str:
+    """The director vcl_recv picks: the probe name of its backend."""
+    return "plone" if PLONE_ROUTES.search(req.url) else "volto"
+
+
+def vcl_backend_fetch(bereq):
+    # Volto renders a page in well under a second: a stalled one is cut
+    # off before its probe notices
+    if bereq.headers.get("x-varnish-reqtype") == "express":
+        bereq.first_byte_timeout = EXPRESS_FIRST_BYTE_TIMEOUT
+    # Credentials public_asset set aside stay here
+    bereq.headers.pop("x-varnish-cookie", None)
+    bereq.headers.pop("x-varnish-authorization", None)
+
+
+def vcl_backend_response(
+    bereq, beresp: BackendResponse, uncacheable: bool = False
+) -> BackendResponse:
+    headers = beresp.headers
+    # Time to the backend's response headers, for the request log
+    headers["x-backend-time"] = f"{beresp.fetch_time:.3f}"
+    # Copies of URL, host and the variant for bans the lurker can process,
+    # hit-for-miss objects included
+    headers["x-url"] = bereq.url
+    headers["x-host"] = bereq.headers.get("host", "")
+    if bereq.headers.get("accept"):
+        headers["x-accept"] = bereq.headers["accept"]
+    if bereq.headers.get("x-user-context-hash"):
+        headers["x-roles"] = bereq.headers["x-user-context-hash"]
+    # Keep the stale object rather than caching or passing on an error,
+    # vcl_synth restarts the request to look for it. Only background
+    # fetches and refreshes have one: anything else gets Plone's error.
+    if beresp.status >= 500 and not uncacheable:
+        if has_stale_object(bereq):
+            beresp.abandon = True
+            return beresp
+        headers["x-varnish-action"] = "FETCH (pass - backend error)"
+        beresp.uncacheable = True
+        beresp.ttl = 120.0
+        return beresp
+    tag_content(bereq, headers)
+    # Blobs get their own storage with its own size limit: a crawl over
+    # image scales evicts other blobs, never pages or API responses
+    reqtype = bereq.headers.get("x-varnish-reqtype", "")
+    beresp.storage = "blob" if reqtype == "blob" else "html"
+    # Files too large to hold in memory are streamed, never stored, and the
+    # next hour of downloads goes straight to Plone with its Range header
+    length = headers.get("content-length", "")
+    if (
+        reqtype == "blob"
+        and not uncacheable
+        and length.isdigit()
+        and int(length) > LARGE_FILE
+    ):
+        headers["x-varnish-action"] = "FETCH (pass - larger than 10MB)"
+        beresp.hit_for_pass = True
+        beresp.ttl = HIT_FOR_PASS_TTL
+        return beresp
+    # Store text responses gzipped, Traefik no longer compresses them
+    if not headers.get("content-encoding") and COMPRESSIBLE.search(
+        headers.get("content-type", "")
+    ):
+        beresp.do_gzip = True
+    # Don't allow static files to set cookies.
+    if STATIC_FILE.search(bereq.url):
+        headers.pop("set-cookie", None)
+    if headers.get("set-cookie"):
+        headers["x-varnish-action"] = "FETCH (pass - response sets cookie)"
+        beresp.uncacheable = True
+        beresp.ttl = 120.0
+        return beresp
+    # The role fingerprint of a logged-in user, per credentials. A Plone
+    # without the endpoint has role-keyed caching off: remember that for
+    # everyone.
+    if bereq.url == USER_CONTEXT_URL:
+        if beresp.status == 404:
+            headers["x-varnish-action"] = "INSERT (user context: not installed, 1h)"
+            headers.pop("vary", None)
+            beresp.ttl = USER_CONTEXT_DISABLED_TTL
+        else:
+            headers["x-varnish-action"] = (
+                "INSERT (user context: 60s caching per credentials)"
+            )
+            headers["vary"] = "Authorization, Cookie"
+            beresp.ttl = USER_CONTEXT_TTL
+        beresp.uncacheable = False
+        beresp.grace = 0.0
+        return beresp
+    if "no-store" in headers.get("surrogate-control", ""):
+        headers["x-varnish-action"] = "FETCH (pass - surrogate control disallows)"
+        beresp.uncacheable = True
+        beresp.ttl = 120.0
+        return beresp
+    # A private or no-store response is never shared, whatever
+    # Surrogate-Control says. Role-keyed reads do not look at
+    # Surrogate-Control, so no-cache passes them too.
+    cache_control_header = headers.get("cache-control", "")
+    if PRIVATE.search(cache_control_header) or (
+        bereq.headers.get("x-user-context-hash")
+        and NO_CACHE.search(cache_control_header)
+    ):
+        headers["x-varnish-action"] = "FETCH (pass - cache control disallows)"
+        beresp.uncacheable = True
+        beresp.ttl = 120.0
+        return beresp
+    # Role-keyed API reads are shared when Plone says they only depend on
+    # the roles, the rest is personalized
+    if bereq.headers.get("x-user-context-hash"):
+        if not USER_CONTEXT_VARY.search(headers.get("vary", "")):
+            headers["x-varnish-action"] = "FETCH (pass - personalized)"
+            beresp.uncacheable = True
+            beresp.ttl = 120.0
+            return beresp
+        headers["x-varnish-action"] = (
+            f"INSERT (role-keyed API: {ANONYMOUS_API_TTL:.0f}s caching"
+            f" / {ANONYMOUS_API_GRACE:.0f}s grace)"
+        )
+        beresp.uncacheable = False
+        beresp.ttl = ANONYMOUS_API_TTL
+        beresp.grace = ANONYMOUS_API_GRACE
+        extend_grace(beresp)
+        return beresp
+    # Anonymous API objects never answer a role-keyed read
+    vary = headers.get("vary", "")
+    if bereq.url.startswith("/++api++") and not USER_CONTEXT_VARY.search(vary):
+        headers["vary"] = ", ".join(filter(None, [vary, "X-User-Context-Hash"]))
+    # Surrogate-Control wins over Cache-Control: no-cache
+    if cache_control(headers, "max-age", "surrogate-control") is not None:
+        surrogate_control(beresp)
+        extend_grace(beresp)
+        return beresp
+    if "no-cache" in headers.get("cache-control", ""):
+        headers["x-varnish-action"] = "FETCH (pass - cache control disallows)"
+        beresp.uncacheable = True
+        beresp.ttl = 120.0
+        return beresp
+
+    # Do NOT cache if there is an "Authorization" header
+    if headers.get("authorization"):
+        headers["x-varnish-action"] = (
+            "FETCH (pass - authorized and no public cache control)"
+        )
+        beresp.uncacheable = True
+        beresp.ttl = 120.0
+        return beresp
+
+    # Hashed scale URLs change whenever the image does: cache them for a
+    # year and let browsers never revalidate. Only the scale itself, a 404
+    # or redirect may not last.
+    if (
+        reqtype == "blob"
+        and beresp.status == 200
+        and HASHED_SCALE_URL.search(bereq.url)
+    ):
+        headers["x-varnish-action"] = "INSERT (hashed scale: 365d caching, immutable)"
+        headers["cache-control"] = IMMUTABLE
+        beresp.uncacheable = False
+        beresp.ttl = HASHED_SCALE_TTL
+        extend_grace(beresp)
+        return beresp
+
+    # Use this rule IF no cache-control (SSR content)
+    if "express" in reqtype and not headers.get("cache-control"):
+        headers["x-varnish-action"] = "INSERT (30s caching / 60s grace)"
+        beresp.uncacheable = False
+        beresp.ttl = 30.0
+        beresp.grace = 60.0
+        extend_grace(beresp)
+        return beresp
+
+    # Use this rule IF no cache-control on anonymous API responses
+    if (headers.get("x-anonymous") or reqtype == "api") and not headers.get(
+        "cache-control"
+    ):
+        anonymous_api_policy(beresp)
+        return beresp
+
+    if not headers.get("cache-control"):
+        headers["x-varnish-action"] = (
+            "FETCH (override - backend not setting cache control)"
+        )
+        beresp.uncacheable = True
+        beresp.ttl = 120.0
+        return beresp
+
+    headers["x-varnish-action"] = "FETCH (insert)"
+    extend_grace(beresp)
+    return beresp
+
+
+def has_stale_object(bereq) -> bool:
+    """Whether the fetch replaces an object the client can get instead."""
+    return bool(
+        bereq.is_bgfetch
+        or bereq.headers.get("x-varnish-refresh")
+        or bereq.headers.get("x-varnish-purge-refresh")
+    )
+
+
+def vcl_backend_error(bereq, uncacheable: bool = False) -> Verdict:
+    # Connection failures, timeouts and no healthy backend, as above
+    if not uncacheable and has_stale_object(bereq):
+        return Verdict("abandon")
+    return Verdict("deliver")
+
+
+def log_request(
+    req, status: int, headers: httpx.Headers, ttl: str, log: Callable[[str], None]
+):
+    """std.log() the line varnishncsa prints with %{VCL_Log:edge}x.
+
+    Hits carry the stored object's backend time, only misses and passes
+    report one.
+    """
+    backend_time = ""
+    if req.headers.get("x-varnish-handling") in ("miss", "pass"):
+        backend_time = headers.get("x-backend-time", "")
+    log(
+        f"edge:reqtype={req.headers.get('x-varnish-reqtype', '')}"
+        f" handling={req.headers.get('x-varnish-handling', '')}"
+        f" status={status}"
+        f" ttl={ttl}"
+        f" backend_time={backend_time}"
+    )
+
+
+def vcl_deliver(
+    req, headers: httpx.Headers, obj, now: float, log: Callable[[str], None]
+) -> Verdict:
+    if req.headers.get("x-varnish-purge-refresh"):
+        # The new object is in the cache, the purger only needs a status
+        return Verdict("synth", 200, "Refreshed.")
+    if req.headers.get("x-varnish-public") and obj.status in DENIED_STATUS:
+        # Not public after all: ask again with the credentials, passed
+        for name in ("cookie", "authorization"):
+            if req.headers.get(f"x-varnish-{name}"):
+                req.headers[name] = req.headers[f"x-varnish-{name}"]
+        req.headers.pop("x-varnish-public")
+        req.headers.pop("x-varnish-cookie", None)
+        req.headers.pop("x-varnish-authorization", None)
+        req.headers["x-varnish-public-denied"] = "1"
+        return Verdict("restart")
+    if req.headers.get("x-varnish-context-url"):
+        # The role fingerprint: restart the API read with it
+        req.url = req.headers.pop("x-varnish-context-url")
+        req.headers["x-varnish-context-done"] = "1"
+        if obj.status == 200 and headers.get("x-user-context-hash"):
+            req.headers["x-user-context-hash"] = headers["x-user-context-hash"]
+        return Verdict("restart")
+    if USER_CONTEXT_VARY.search(headers.get("vary", "")):
+        # Only this cache varies on the fingerprint
+        vary = USER_CONTEXT_VARY.sub(r"\1", headers["vary"], count=1)
+        vary = re.sub(r"^[\s,]+|[\s,]+$", "", vary)
+        if vary:
+            headers["vary"] = vary
+        else:
+            del headers["vary"]
+    log_request(req, obj.status, headers, f"{obj.ttl_at(now):.3f}", log)
+    headers.pop("x-backend-time", None)
+    headers.pop("x-url", None)
+    headers.pop("x-host", None)
+    headers.pop("x-accept", None)
+    headers.pop("x-roles", None)
+    if req.headers.get("x-accept-gzip") == "0":
+        # The client cannot take gzip, Varnish gunzips on delivery
+        req.headers.pop("accept-encoding", None)
+    if req.headers.get("x-vcl-debug"):
+        headers["x-varnish-ttl"] = f"{obj.ttl_at(now):.3f}"
+        headers["x-varnish-grace"] = headers.get("x-grace", f"{obj.grace:.3f}")
+        if headers.get("x-stale-if-error"):
+            headers["x-varnish-stale-if-error"] = headers["x-stale-if-error"]
+        if req.headers.get("x-varnish-stale"):
+            headers["x-varnish-stale"] = "1"
+        headers["x-hits"] = str(obj.hits)
+        headers["x-varnish-reqtype"] = req.headers.get("x-varnish-reqtype", "")
+        headers["x-auth"] = "Logged-in" if req.headers.get("x-auth") else "Anon"
+        headers["x-cache"] = "HIT" if obj.hits > 0 else "MISS"
+    else:
+        for name in DEBUG_HEADERS:
+            headers.pop(name, None)
+    headers.pop("x-grace", None)
+    headers.pop("x-stale-if-error", None)
+    headers.pop("surrogate-control", None)
+    return Verdict("deliver")
@@ -0,0 +1,13 @@
+"""Prometheus exporter for the request log of etc/varnish.vcl.
+
+``log_request`` in the VCL logs every client request with its type, cache
+handling, status, object TTL and backend time. The exporter follows that
+log through varnishncsa or varnishlog and serves hit, miss and pass
+counters and histograms per request type on ``/metrics``.
+"""
+
+# Volto
+from exporter.service import Exporter  # noqa: F401
+from exporter.service import LogParser  # noqa: F401
+from exporter.service import Metrics  # noqa: F401
+from exporter.service import Record  # noqa: F401
@@ -0,0 +1,55 @@
+# Standard Library
+import asyncio
+import logging
+import os
+import shlex
+import sys
+
+# Volto
+from exporter.service import COMMAND
+from exporter.service import Exporter
+
+
+def from_environment() -> Exporter:
+    """Configure the exporter; EXPORTER_COMMAND=- reads the log from stdin."""
+    command = os.environ.get("EXPORTER_COMMAND")
+    if command == "-":
+        exporter = Exporter(command=None)
+    else:
+        exporter = Exporter(command=shlex.split(command) if command else COMMAND)
+    exporter.server.host = os.environ.get("EXPORTER_HOST", "0.0.0.0")
+    exporter.server.port = int(os.environ.get("EXPORTER_PORT", "9132"))
+    return exporter
+
+
+async def read_stdin(exporter: Exporter):
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), sys.stdin
+    )
+    await exporter.follow(reader)
+    logging.getLogger("exporter").warning("End of input, serving the last values")
+
+
+async def main():
+    exporter = from_environment()
+    await exporter.start()
+    logging.getLogger("exporter").info("Listening on %s", exporter.url)
+    try:
+        if exporter.command is None:
+            await read_stdin(exporter)
+        await asyncio.Event().wait()
+    finally:
+        await exporter.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=os.environ.get("EXPORTER_LOG_LEVEL", "INFO"),
+        format="%(asctime)s %(levelname)s %(name)s %(message)s",
+    )
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,290 @@
+# Standard Library
+import asyncio
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+# Volto
+from edge.http import Request
+from edge.http import Response
+from edge.http import Server
+
+
+logger = logging.getLogger("exporter")
+
+# std.log() prefix of the line log_request writes in etc/varnish.vcl
+LOG_KEY = "edge"
+
+# varnishncsa prints that line, then the time to serve the request
+NCSA_FORMAT = f"%{{VCL_Log:{LOG_KEY}}}x duration_us=%D"
+COMMAND = ("varnishncsa", "-F", NCSA_FORMAT)
+
+# Histogram buckets: remaining TTL of delivered objects, and durations
+TTL_BUCKETS = (0.0, 1.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 3600.0, 86400.0)
+TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# A record of varnishlog's grouped output: "-   VCL_Log        edge:..."
+VSL_RECORD = re.compile(r"^(-+)\s+(\w+)\s*(.*)$")
+
+
+@dataclass
+class Record:
+    """One client request, as log_request describes it."""
+
+    reqtype: str
+    handling: str
+    status: int
+    ttl: Optional[float] = None
+    backend_time: Optional[float] = None
+    duration: Optional[float] = None
+
+
+def _float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def parse_fields(text: str, duration: Optional[float] = None) -> Optional[Record]:
+    """A Record from key=value pairs, None when it is not log_request's line."""
+    fields = dict(part.partition("=")[::2] for part in text.split() if "=" in part)
+    if not fields.get("handling") or not fields.get("status", "").isdigit():
+        return None
+    if duration is None and fields.get("duration_us"):
+        duration = (_float(fields["duration_us"]) or 0.0) / 1e6
+    return Record(
+        reqtype=fields.get("reqtype") or "none",
+        handling=fields["handling"],
+        status=int(fields["status"]),
+        ttl=_float(fields.get("ttl")),
+        backend_time=_float(fields.get("backend_time")),
+        duration=duration,
+    )
+
+
+class LogParser:
+    """Records from varnishncsa lines or varnishlog's grouped output.
+
+    varnishncsa prints one line per request with ``NCSA_FORMAT``. varnishlog
+    prints a block per transaction: the ``VCL_Log`` record carries the
+    fields and ``Timestamp Resp`` the duration, the ``End`` record closes
+    it. With ``-g request`` the backend and ESI transactions nested in a
+    block (``--`` records) are skipped.
+    """
+
+    def __init__(self, key: str = LOG_KEY):
+        self.prefix = f"{key}:"
+        self._fields: Optional[str] = None
+        self._duration: Optional[float] = None
+
+    def feed(self, line: str) -> Optional[Record]:
+        line = line.rstrip("\r\n")
+        if line.startswith("*"):
+            # A new transaction starts
+            self._fields = self._duration = None
+            return None
+        match = VSL_RECORD.match(line)
+        if match is None:
+            return parse_fields(line)
+        level, tag, value = match.groups()
+        if len(level) != 1:
+            return None
+        if tag == "VCL_Log" and value.startswith(self.prefix):
+            self._fields = value[len(self.prefix) :]
+        elif tag == "Timestamp" and value.startswith("Resp:"):
+            # Resp: <absolute> <since start> <since last>
+            parts = value.split()
+            self._duration = _float(parts[2]) if len(parts) > 2 else None
+        elif tag == "End":
+            fields, duration = self._fields, self._duration
+            self._fields = self._duration = None
+            if fields is not None:
+                return parse_fields(fields, duration)
+        return None
+
+
+@dataclass
+class Histogram:
+    buckets: Tuple[float, ...]
+    count: int = 0
+    total: float = 0.0
+    counts: List[int] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.counts = [0] * len(self.buckets)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+
+
+class Metrics:
+    """Counters and histograms per request type and handling."""
+
+    def __init__(self):
+        self.requests = Counter()
+        self.responses = Counter()
+        self.ttl: Dict[Tuple[str, str], Histogram] = {}
+        self.backend_time: Dict[Tuple[str, str], Histogram] = {}
+        self.duration: Dict[Tuple[str, str], Histogram] = {}
+
+    def observe(self, record: Record):
+        key = (record.reqtype, record.handling)
+        self.requests[key] += 1
+        self.responses[(record.reqtype, str(record.status))] += 1
+        if record.ttl is not None and record.handling in ("hit", "miss"):
+            self.ttl.setdefault(key, Histogram(TTL_BUCKETS)).observe(record.ttl)
+        if record.backend_time is not None:
+            histogram = self.backend_time.setdefault(key, Histogram(TIME_BUCKETS))
+            histogram.observe(record.backend_time)
+        if record.duration is not None:
+            histogram = self.duration.setdefault(key, Histogram(TIME_BUCKETS))
+            histogram.observe(record.duration)
+
+    def hit_ratio(self, reqtype: str) -> float:
+        hits = self.requests[(reqtype, "hit")]
+        total = sum(
+            count for (name, _), count in self.requests.items() if name == reqtype
+        )
+        return hits / total if total else 0.0
+
+    def render(self) -> str:
+        """Prometheus text format."""
+        lines = [
+            "# HELP varnish_edge_requests_total Client requests by handling",
+            "# TYPE varnish_edge_requests_total counter",
+        ]
+        for key, count in sorted(self.requests.items()):
+            labels = _labels(("reqtype", "handling"), key)
+            lines.append(f"varnish_edge_requests_total{{{labels}}} {count}")
+        lines.append("# HELP varnish_edge_responses_total Client responses by status")
+        lines.append("# TYPE varnish_edge_responses_total counter")
+        for key, count in sorted(self.responses.items()):
+            labels = _labels(("reqtype", "status"), key)
+            lines.append(f"varnish_edge_responses_total{{{labels}}} {count}")
+        for name, help_text, histograms in (
+            ("ttl_seconds", "Remaining TTL of delivered objects", self.ttl),
+            (
+                "backend_seconds",
+                "Time to the backend's response headers",
+                self.backend_time,
+            ),
+            ("request_seconds", "Time to serve the request", self.duration),
+        ):
+            metric = f"varnish_edge_{name}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for key, histogram in sorted(histograms.items()):
+                labels = _labels(("reqtype", "handling"), key)
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"{metric}_sum{{{labels}}} {histogram.total}")
+                lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+class Exporter:
+    """Follow the Varnish log and serve its metrics on ``/metrics``.
+
+    ``command`` is run and its output parsed, varnishncsa by default; it is
+    started again when it exits, as it does when varnishd restarts. Without
+    a command, lines are passed to ``feed()`` or ``follow()``.
+    """
+
+    def __init__(
+        self, command: Optional[Sequence[str]] = COMMAND, restart_delay: float = 1.0
+    ):
+        self.command = list(command) if command else None
+        self.restart_delay = restart_delay
+        self.parser = LogParser()
+        self.metrics = Metrics()
+        self.server = Server(self.handle)
+        self.stats = Counter()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def url(self) -> str:
+        return self.server.url
+
+    async def start(self):
+        await self.server.start()
+        if self.command:
+            self._task = asyncio.get_running_loop().create_task(self.tail())
+
+    async def close(self):
+        await self.server.close()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def feed(self, line: str):
+        self.stats["lines"] += 1
+        record = self.parser.feed(line)
+        if record is not None:
+            self.stats["records"] += 1
+            self.metrics.observe(record)
+
+    async def follow(self, reader: asyncio.StreamReader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            self.feed(line.decode("utf-8", "replace"))
+
+    async def tail(self):
+        while True:
+            process = await asyncio.create_subprocess_exec(
+                *self.command, stdout=asyncio.subprocess.PIPE
+            )
+            try:
+                await self.follow(process.stdout)
+            finally:
+                if process.returncode is None:
+                    process.kill()
+                await process.wait()
+            self.stats["restarts"] += 1
+            logger.warning(
+                "%s exited with %s, restarting", self.command[0], process.returncode
+            )
+            await asyncio.sleep(self.restart_delay)
+
+    def render_metrics(self) -> str:
+        lines = []
+        for name, help_text in (
+            ("lines", "Log lines read"),
+            ("records", "Requests parsed from the log"),
+            ("restarts", "Times the log command exited"),
+        ):
+            lines.append(f"# HELP varnish_edge_exporter_{name}_total {help_text}")
+            lines.append(f"# TYPE varnish_edge_exporter_{name}_total counter")
+            lines.append(f"varnish_edge_exporter_{name}_total {self.stats[name]}")
+        return "\n".join(lines) + "\n" + self.metrics.render()
+
+    async def handle(self, request: Request) -> Response:
+        if request.method == "GET" and request.path == "/metrics":
+            return Response(
+                headers={"Content-Type": "text/plain; version=0.0.4"},
+                body=self.render_metrics().encode(),
+            )
+        if request.method == "GET" and request.path == "/":
+            return Response(body=b"OK")
+        return Response(status=404, body=b"Not Found")
@@ -0,0 +1,11 @@
+"""Purge fan-out service replacing ghcr.io/kitconcept/cluster-purger.
+
+Plone sends its purges to ``cachingProxies`` (``http://purger:80``); the
+purger batches and deduplicates them and replays each one to every Varnish
+instance it discovers.
+"""
+
+# Volto
+from purger.service import DnsDiscovery  # noqa: F401
+from purger.service import Purger  # noqa: F401
+from purger.service import StaticDiscovery  # noqa: F401
@@ -0,0 +1,62 @@
+# Standard Library
+import ast
+import asyncio
+import logging
+import os
+
+# Volto
+from purger.service import DnsDiscovery
+from purger.service import Purger
+from purger.service import StaticDiscovery
+
+
+def from_environment() -> Purger:
+    """Configure the purger with cluster-purger's environment variables."""
+    mode = os.environ.get("PURGER_MODE", "compose")
+    if mode == "static":
+        discover = StaticDiscovery(
+            node.strip()
+            for node in os.environ.get("PURGER_BACKENDS", "").split(",")
+            if node.strip()
+        )
+    else:
+        # compose service names and DNS names both resolve to every instance
+        discover = DnsDiscovery(
+            os.environ.get("PURGER_SERVICE_NAME", "varnish"),
+            int(os.environ.get("PURGER_SERVICE_PORT", "80")),
+            float(os.environ.get("PURGER_DISCOVERY_INTERVAL", "1.0")),
+        )
+    purger = Purger(
+        discover,
+        sites=ast.literal_eval(os.environ.get("PURGER_PUBLIC_SITES", "[]"))
+        or ["plone.localhost"],
+        window=float(os.environ.get("PURGER_WINDOW", "0.05")),
+        concurrency=int(os.environ.get("PURGER_CONCURRENCY", "32")),
+        retries=int(os.environ.get("PURGER_RETRIES", "3")),
+        http2=os.environ.get("PURGER_HTTP2", "1") not in ("0", "false", "no"),
+        refresh=ast.literal_eval(os.environ.get("PURGER_REFRESH", "[]")),
+    )
+    purger.server.host = os.environ.get("PURGER_HOST", "0.0.0.0")
+    purger.server.port = int(os.environ.get("PURGER_PORT", "80"))
+    return purger
+
+
+async def main():
+    purger = from_environment()
+    await purger.start()
+    logging.getLogger("purger").info("Listening on %s", purger.url)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await purger.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=os.environ.get("PURGER_LOG_LEVEL", "INFO"),
+        format="%(asctime)s %(levelname)s %(name)s %(message)s",
+    )
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,384 @@
+# Standard Library
+import asyncio
+import logging
+import re
+import socket
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from dataclasses import field
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from time import monotonic
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+# HTTP Library
+import httpx
+
+# Volto
+from edge.http import Request
+from edge.http import Response
+
+
+logger = logging.getLogger("purger")
+
+Discovery = Callable[[], Awaitable[List[str]]]
+Handler = Callable[[Request], Awaitable[Response]]
+
+# Histogram buckets for per-node delivery latency, in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Request headers replayed to Varnish along with the method and URL
+FORWARDED_HEADERS = ("x-invalidate-pattern", "x-purge-refresh", "x-purge-soft", "xkey")
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Parse one request with http.server and answer it with the handler.
+
+    http.server answers malformed request lines and headers with 400 itself,
+    every method reaches ``dispatch``.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Errors about unparseable request lines get a status line, not HTTP/0.9's
+    # bare body
+    default_request_version = "HTTP/1.0"
+    # Headers and body are two writes, Nagle would hold the body back for the
+    # client's delayed ACK on keep-alive connections
+    disable_nagle_algorithm = True
+
+    def __getattr__(self, name: str):
+        if name.startswith("do_"):
+            return self.dispatch
+        raise AttributeError(name)
+
+    def dispatch(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self.send_error(400, "Bad Content-Length")
+            return
+        request = Request(
+            self.command,
+            self.path,
+            httpx.Headers(self.headers.items()),
+            body=self.rfile.read(length),
+            client=self.client_address[0],
+        )
+        future = asyncio.run_coroutine_threadsafe(
+            self.server.handler(request), self.server.loop
+        )
+        try:
+            response = future.result()
+        except Exception as exc:
+            response = Response(status=503, body=repr(exc).encode())
+        self.send_response(response.status, response.reason or None)
+        for name, value in response.headers.multi_items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(response.body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(response.body)
+
+    def log_message(self, format: str, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+
+class Server:
+    """The purger's HTTP/1.1 endpoint: http.server in a thread.
+
+    Requests are parsed in the server's threads and handled on the event
+    loop that started it.
+    """
+
+    def __init__(self, handler: Handler, host: str = "127.0.0.1", port: int = 0):
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), RequestHandler)
+        self._server.daemon_threads = True
+        self._server.handler = self.handler
+        self._server.loop = asyncio.get_running_loop()
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="purger-http", daemon=True
+        )
+        self._thread.start()
+
+    async def close(self):
+        if self._server is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._server.shutdown
+            )
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+
+class DnsDiscovery:
+    """All addresses a name resolves to, as Varnish base URLs.
+
+    Docker's embedded DNS answers a compose service name with one record
+    per running container, so scaling ``varnish`` needs no configuration.
+    """
+
+    def __init__(self, name: str, port: int, interval: float = 1.0):
+        self.name = name
+        self.port = port
+        self.interval = interval
+        self._nodes: List[str] = []
+        self._resolved = float("-inf")
+
+    async def __call__(self) -> List[str]:
+        if monotonic() - self._resolved < self.interval:
+            return self._nodes
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                self.name, self.port, type=socket.SOCK_STREAM
+            )
+        except socket.gaierror as exc:
+            logger.warning("Could not resolve %s: %s", self.name, exc)
+            return self._nodes
+        addresses = sorted({info[4][0] for info in infos})
+        self._nodes = [
+            (
+                f"http://[{address}]:{self.port}"
+                if ":" in address
+                else f"http://{address}:{self.port}"
+            )
+            for address in addresses
+        ]
+        self._resolved = monotonic()
+        return self._nodes
+
+
+class StaticDiscovery:
+    """A fixed list of Varnish base URLs."""
+
+    def __init__(self, nodes: Iterable[str]):
+        self.nodes = [node.rstrip("/") for node in nodes]
+
+    async def __call__(self) -> List[str]:
+        return self.nodes
+
+
+@dataclass
+class NodeMetrics:
+    requests: int = 0
+    failures: int = 0
+    retries: int = 0
+    latency_sum: float = 0.0
+    buckets: List[int] = field(default_factory=lambda: [0] * len(BUCKETS))
+
+    def observe(self, elapsed: float):
+        self.requests += 1
+        self.latency_sum += elapsed
+        for index, bound in enumerate(BUCKETS):
+            if elapsed <= bound:
+                self.buckets[index] += 1
+
+
+class Purger:
+    """Collect PURGE/BAN requests from Plone and replay them to every Varnish.
+
+    Requests arriving within ``window`` seconds form one batch, in which
+    duplicates are dropped. Each batch goes to every discovered node
+    concurrently over pooled connections, at most ``concurrency`` requests
+    in flight, retrying failures up to ``retries`` times.
+
+    Plone's PURGEs of URLs matching one of the ``refresh`` patterns ask
+    Varnish to refetch the URL in place (``X-Purge-Refresh: 1``) rather
+    than dropping it, so hot pages never go uncached.
+    """
+
+    def __init__(
+        self,
+        discover: Discovery,
+        sites: Iterable[str] = ("plone.localhost",),
+        window: float = 0.05,
+        concurrency: int = 32,
+        retries: int = 3,
+        http2: bool = True,
+        timeout: float = 5.0,
+        refresh: Iterable[str] = (),
+    ):
+        self.discover = discover
+        self.sites = list(sites)
+        self.refresh = [re.compile(pattern) for pattern in refresh]
+        self.window = window
+        self.concurrency = concurrency
+        self.retries = retries
+        self.http2 = http2
+        self.timeout = timeout
+        self.server = Server(self.handle)
+        self.stats = Counter()
+        self.nodes: Dict[str, NodeMetrics] = {}
+        self.pending: Dict[Tuple[str, str, Tuple], None] = {}
+        self._flush: Optional[asyncio.Task] = None
+        self._client = None
+        self._semaphore = None
+
+    @property
+    def url(self) -> str:
+        return self.server.url
+
+    async def start(self):
+        # HTTP/2 without TLS needs prior knowledge, so HTTP/1.1 is disabled:
+        # varnishd must run with -p feature=+http2
+        self._client = httpx.AsyncClient(
+            http1=not self.http2,
+            http2=self.http2,
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.concurrency),
+        )
+        # A refresh fetches the variant the PURGE's Accept names, the one
+        # browsers get without it: not httpx's default */*
+        del self._client.headers["Accept"]
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        await self.server.start()
+
+    async def close(self):
+        await self.server.close()
+        if self._flush is not None:
+            await self._flush
+        if self._client is not None:
+            await self._client.aclose()
+
+    async def handle(self, request: Request) -> Response:
+        if request.method in ("PURGE", "BAN"):
+            self.enqueue(request)
+            return Response(status=200, body=b"Queued")
+        if request.method == "GET" and request.path == "/metrics":
+            return Response(
+                headers={"Content-Type": "text/plain; version=0.0.4"},
+                body=self.render_metrics().encode(),
+            )
+        if request.method == "GET" and request.path == "/":
+            return Response(body=b"OK")
+        return Response(status=404, body=b"Not Found")
+
+    def enqueue(self, request: Request):
+        self.stats["received"] += 1
+        headers = tuple(
+            (name, request.headers[name])
+            for name in FORWARDED_HEADERS
+            if name in request.headers
+        )
+        if (
+            request.method == "PURGE"
+            and not any(name in ("x-purge-refresh", "xkey") for name, _ in headers)
+            and any(pattern.search(request.path) for pattern in self.refresh)
+        ):
+            self.stats["refreshed"] += 1
+            headers += (("x-purge-refresh", "1"),)
+        key = (request.method, request.url, headers)
+        if key in self.pending:
+            self.stats["deduplicated"] += 1
+            return
+        self.pending[key] = None
+        if self._flush is None:
+            self._flush = asyncio.get_running_loop().create_task(self.flush_later())
+
+    async def flush_later(self):
+        await asyncio.sleep(self.window)
+        batch, self.pending = list(self.pending), {}
+        self._flush = None
+        await self.deliver(batch)
+
+    async def deliver(self, batch: List[Tuple[str, str, Tuple]]):
+        nodes = await self.discover()
+        self.stats["batches"] += 1
+        if not nodes:
+            logger.warning("No Varnish instance to purge, dropping %d", len(batch))
+            self.stats["dropped"] += len(batch)
+            return
+        await asyncio.gather(
+            *(
+                self.send(node, method, url, site, dict(headers))
+                for node in nodes
+                for method, url, headers in batch
+                for site in self.sites
+            )
+        )
+
+    async def send(self, node: str, method: str, url: str, site: str, headers: dict):
+        metrics = self.nodes.setdefault(node, NodeMetrics())
+        headers = {"Host": site, **headers}
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    metrics.retries += 1
+                    await asyncio.sleep(0.05 * 2 ** (attempt - 1))
+                start = monotonic()
+                try:
+                    response = await self._client.request(
+                        method, f"{node}{url}", headers=headers
+                    )
+                except httpx.TransportError as exc:
+                    logger.info("%s %s%s failed: %s", method, node, url, exc)
+                    continue
+                if response.status_code >= 500:
+                    continue
+                metrics.observe(monotonic() - start)
+                self.stats["delivered"] += 1
+                return True
+        metrics.failures += 1
+        self.stats["failed"] += 1
+        logger.warning("Giving up on %s %s%s", method, node, url)
+        return False
+
+    def render_metrics(self) -> str:
+        """Counters and per-node latency histograms in Prometheus format."""
+        lines = []
+        for name, help_text in (
+            ("received", "PURGE and BAN requests received"),
+            ("deduplicated", "Requests dropped as duplicates within a batch"),
+            ("refreshed", "PURGE requests turned into in-place refreshes"),
+            ("batches", "Batches delivered"),
+            ("delivered", "Requests delivered to a Varnish instance"),
+            ("failed", "Requests given up after retries"),
+            ("dropped", "Requests dropped without any Varnish instance"),
+        ):
+            lines.append(f"# HELP purger_{name}_total {help_text}")
+            lines.append(f"# TYPE purger_{name}_total counter")
+            lines.append(f"purger_{name}_total {self.stats[name]}")
+        for name, attribute in (
+            ("node_failures", "failures"),
+            ("node_retries", "retries"),
+        ):
+            lines.append(f"# TYPE purger_{name}_total counter")
+            for node, metrics in sorted(self.nodes.items()):
+                value = getattr(metrics, attribute)
+                lines.append(f'purger_{name}_total{{node="{node}"}} {value}')
+        lines.append("# TYPE purger_node_latency_seconds histogram")
+        for node, metrics in sorted(self.nodes.items()):
+            for bound, count in zip(BUCKETS, metrics.buckets):
+                lines.append(
+                    f'purger_node_latency_seconds_bucket{{node="{node}",le="{bound}"}}'
+                    f" {count}"
+                )
+            lines.append(
+                f'purger_node_latency_seconds_bucket{{node="{node}",le="+Inf"}}'
+                f" {metrics.requests}"
+            )
+            lines.append(
+                f'purger_node_latency_seconds_sum{{node="{node}"}} {metrics.latency_sum}'
+            )
+            lines.append(
+                f'purger_node_latency_seconds_count{{node="{node}"}} {metrics.requests}'
+            )
+        return "\n".join(lines) + "\n"
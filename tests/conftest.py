@@ -1,8 +1,8 @@
 # Standard Library
 import json
+import os
 import subprocess
 from pathlib import Path
-from time import sleep
 
 # HTTP Library
 import httpx
@@ -10,21 +10,19 @@ import httpx
 # pytest
 import pytest
 
+# Volto
+from benchmarks.load import ACCEPT
+from edge import LocalStack
+from tests.helpers import CONVERGENCES
+from tests.helpers import wait_for
 
-BASE_URL = "http://plone.localhost"
-API_URL = f"{BASE_URL}/++api++"
 
-BACKEND_URL = "http://plone.localhost:8080/Plone"
+HOST = "plone.localhost"
 
-VARNISH_PORT = (
-    subprocess.run(
-        ["docker", "compose", "port", "varnish", "80"], capture_output=True, text=True
-    )
-    .stdout.strip()
-    .split(":")[1]
-)
+BASE_URL = f"http://{HOST}"
+API_URL = f"{BASE_URL}/++api++"
 
-VARNISH_URL = f"http://plone.localhost:{VARNISH_PORT}"
+BACKEND_URL = "http://plone.localhost:8080/Plone"
 
 VARNISH_MULTIPLE_URL = ["http://plone.localhost:8000", "http://plone.localhost:8001"]
 
@@ -32,7 +30,211 @@ REPO_DIR = Path(__file__).parent.parent
 
 CONTENTS = Path(REPO_DIR / "tests/data/content.json").resolve()
 
-ACCEPT = "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8"  # noQA
+STARTUP_TIMEOUT = 300.0
+
+BENCHMARK_RESULTS = pytest.StashKey[dict]()
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--stack",
+        choices=("docker", "local"),
+        default=os.environ.get("STACK", "docker"),
+        help="Run against the docker-compose services or the in-process edge stack",
+    )
+    group = parser.getgroup("benchmark")
+    group.addoption(
+        "--benchmark",
+        action="store_true",
+        default=False,
+        help="Run the tests marked as benchmark",
+    )
+    group.addoption(
+        "--benchmark-edits",
+        type=int,
+        default=20,
+        help="Content edits per benchmark run",
+    )
+    group.addoption(
+        "--benchmark-ban-edits",
+        type=int,
+        default=1000,
+        help="Content edits sent through the purge path by the ban-list benchmark",
+    )
+    group.addoption(
+        "--benchmark-views",
+        type=int,
+        default=200,
+        help="Anonymous page views per benchmark run",
+    )
+    group.addoption(
+        "--benchmark-instances",
+        type=int,
+        default=2,
+        help="Varnish instances to measure",
+    )
+    group.addoption(
+        "--benchmark-json",
+        default=None,
+        help="Write benchmark results to this JSON file",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("benchmark"):
+        return
+    skip = pytest.mark.skip(reason="benchmark, run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    results = config.stash.get(BENCHMARK_RESULTS, None)
+    if results:
+        terminalreporter.section("benchmark")
+        terminalreporter.write_line(json.dumps(results, indent=2))
+    if not CONVERGENCES:
+        return
+    elapsed = sorted(convergence.elapsed for convergence in CONVERGENCES)
+    terminalreporter.section("purge convergence")
+    terminalreporter.write_line(
+        f"{len(elapsed)} purges: "
+        f"min {elapsed[0] * 1000:.1f}ms, "
+        f"median {elapsed[len(elapsed) // 2] * 1000:.1f}ms, "
+        f"max {elapsed[-1] * 1000:.1f}ms"
+    )
+    for convergence in CONVERGENCES:
+        terminalreporter.write_line(
+            f"  {convergence.url}: {convergence.elapsed * 1000:.1f}ms "
+            f"({convergence.polls} polls)"
+        )
+
+
+def is_up(url: str) -> bool:
+    try:
+        httpx.get(url, headers={"Host": HOST})
+    except httpx.HTTPError:
+        return False
+    return True
+
+
+class DockerStack:
+    """The services started from docker-compose.yml."""
+
+    name = "docker"
+    host = HOST
+    base_url = BASE_URL
+    api_url = API_URL
+    varnish_urls = VARNISH_MULTIPLE_URL
+
+    @property
+    def varnish_url(self) -> str:
+        return self.instance_url(1)
+
+    def instance_url(self, index: int) -> str:
+        port = (
+            subprocess.run(
+                ["docker", "compose", "port", "--index", str(index), "varnish", "80"],
+                capture_output=True,
+                text=True,
+            )
+            .stdout.strip()
+            .split(":")[1]
+        )
+        return f"http://{HOST}:{port}"
+
+    def backend_requests(self, url: str) -> int:
+        """Requests Varnish sent to Traefik's internal routers for url.
+
+        Counted from Traefik's JSON access log, which keeps the
+        X-Varnish-Routed header. Read until two reads agree, as the log
+        trails the responses slightly.
+        """
+
+        def count() -> int:
+            logs = subprocess.run(
+                ["docker", "compose", "logs", "--no-log-prefix", "webserver"],
+                capture_output=True,
+                text=True,
+            ).stdout
+            total = 0
+            for line in logs.splitlines():
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if (
+                    isinstance(entry, dict)
+                    and entry.get("request_X-Varnish-Routed") == "1"
+                    and entry.get("RequestPath") == url
+                ):
+                    total += 1
+            return total
+
+        counts = [count()]
+
+        def stable() -> bool:
+            counts.append(count())
+            return counts[-1] == counts[-2]
+
+        wait_for(stable, STARTUP_TIMEOUT, f"Access log for {url}")
+        return counts[-1]
+
+    def varnish(self, *command: str, stdin: str = "", index: int = 1) -> str:
+        """Output of a Varnish tool, e.g. varnishadm, run in a varnish container."""
+        return subprocess.run(
+            ["docker", "compose", "exec", "-T", "--index", str(index), "varnish"]
+            + list(command),
+            input=stdin,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+    def scale(self, count: int):
+        subprocess.run(["docker", "compose", "up", "--scale", f"varnish={count}", "-d"])
+        # Wait for the new containers to answer
+        for index in range(1, count + 1):
+            url = self.instance_url(index)
+            wait_for(lambda: is_up(url), STARTUP_TIMEOUT, f"Varnish at {url}")
+
+    def shard(self, enabled: bool = True):
+        """Switch to the sharded layout of docker-compose.shard.yml and back."""
+        files = ["-f", "docker-compose.yml"]
+        if enabled:
+            files += ["-f", "docker-compose.shard.yml"]
+        subprocess.run(
+            ["docker", "compose", *files, "up", "-d", "--remove-orphans"],
+            cwd=REPO_DIR,
+        )
+        for url in self.varnish_urls:
+            wait_for(lambda: is_up(url), STARTUP_TIMEOUT, f"Varnish at {url}")
+
+
+@pytest.fixture(scope="session")
+def stack(request):
+    if request.config.getoption("stack") == "local":
+        instances = request.config.getoption("benchmark_instances")
+        local_stack = LocalStack(nodes=max(instances, 2)).start()
+        yield local_stack
+        local_stack.stop()
+    else:
+        yield DockerStack()
+
+
+@pytest.fixture(scope="session")
+def benchmark_report(request) -> dict:
+    """Collect benchmark results, written as JSON at the end of the session."""
+    results = {}
+    yield results
+    if not results:
+        return
+    request.config.stash[BENCHMARK_RESULTS] = results
+    path = request.config.getoption("benchmark_json")
+    if path:
+        with open(path, "w") as fp:
+            json.dump(results, fp, indent=2)
 
 
 @pytest.fixture(scope="session")
@@ -41,18 +243,18 @@ def repo_dir() -> Path:
 
 
 @pytest.fixture(scope="session")
-def varnish_client() -> httpx.Client:
-    client = httpx.Client(base_url=VARNISH_URL, headers={"Host": "plone.localhost"})
+def varnish_client(stack) -> httpx.Client:
+    client = httpx.Client(base_url=stack.varnish_url, headers={"Host": HOST})
     yield client
     client.close()
 
 
 @pytest.fixture(scope="session")
-def varnish_multiple_clients() -> list:
+def varnish_multiple_clients(stack) -> list:
     clients = []
-    for v_url in VARNISH_MULTIPLE_URL:
+    for v_url in stack.varnish_urls:
         client = httpx.Client(
-            base_url=v_url, headers={"Host": "plone.localhost", "x-varnish-debug": "1"}
+            base_url=v_url, headers={"Host": HOST, "x-varnish-debug": "1"}
         )
         clients.append(client)
     yield clients
@@ -61,20 +263,20 @@ def varnish_multiple_clients() -> list:
 
 
 @pytest.fixture(scope="session")
-def anon_client() -> httpx.Client:
+def anon_client(stack) -> httpx.Client:
     client = httpx.Client(
-        base_url=BASE_URL,
-        headers={"Accept": ACCEPT, "x-varnish-debug": "1"},
+        base_url=stack.base_url,
+        headers={"Host": HOST, "Accept": ACCEPT, "x-varnish-debug": "1"},
     )
     yield client
     client.close()
 
 
 @pytest.fixture(scope="session")
-def auth_root_client() -> httpx.Client:
+def auth_root_client(stack) -> httpx.Client:
     client = httpx.Client(
-        base_url=BASE_URL,
-        headers={"Accept": "application/json", "x-varnish-debug": "1"},
+        base_url=stack.base_url,
+        headers={"Host": HOST, "Accept": "application/json", "x-varnish-debug": "1"},
         auth=("admin", "admin"),
     )
     yield client
@@ -82,10 +284,14 @@ def auth_root_client() -> httpx.Client:
 
 
 @pytest.fixture(scope="session")
-def auth_client() -> httpx.Client:
+def auth_client(stack) -> httpx.Client:
     resp = httpx.post(
-        f"{API_URL}/@users",
-        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        f"{stack.api_url}/@users",
+        headers={
+            "Host": HOST,
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+        },
         json={
             "description": "Professor of Linguistics",
             "email": "noam.chomsky@example.com",
@@ -99,16 +305,21 @@ def auth_client() -> httpx.Client:
         auth=("admin", "admin"),
     )
     response = httpx.post(
-        f"{API_URL}/@login",
-        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        f"{stack.api_url}/@login",
+        headers={
+            "Host": HOST,
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+        },
         json={"password": "12345678", "login": "noamchomsky"},
     )
     data = response.json()
     token = data["token"]
 
     client = httpx.Client(
-        base_url=BASE_URL,
+        base_url=stack.base_url,
         headers={
+            "Host": HOST,
             "Accept": ACCEPT,
             "x-varnish-debug": "1",
             "Authorization": f"Bearer {token}",
@@ -135,23 +346,20 @@ def init_data() -> list:
 @pytest.fixture(scope="session", autouse=True)
 def site(auth_root_client, init_data, varnish_client):
     """Create content."""
+
     # Check if api is up
-    while True:
+    def api_is_up() -> bool:
         try:
-            response = varnish_client.get("/++api++/")
-            assert response.status_code == 200
-        except Exception as exc:
-            sleep(5)
+            return varnish_client.get("/++api++/").status_code == 200
+        except httpx.HTTPError:
+            return False
 
-        else:
-            # API is up
-            break
+    wait_for(api_is_up, STARTUP_TIMEOUT, "Plone API")
 
     # Purge cache
     response = varnish_client.request(
         method="BAN", url="/", headers={"x-invalidate-pattern": "obj.status != 0"}
     )
-    sleep(0.5)
 
     # Setup default content
     for url, container_url, payload in init_data:
@@ -179,6 +387,20 @@ def purge_url(varnish_client: httpx.Client):
         response = varnish_client.request(
             method="PURGE",
             url=url,
+            headers={"X-Purge-Soft": "0"},
+        )
+        return response.status_code == 200
+
+    return inner
+
+
+@pytest.fixture
+def purge_key(varnish_client: httpx.Client):
+    def inner(key: str) -> bool:
+        response = varnish_client.request(
+            method="PURGE",
+            url="/",
+            headers={"xkey": key},
         )
         return response.status_code == 200
 
@@ -193,6 +415,7 @@ def purge_multiple_varnish_url(varnish_multiple_clients: list):
             response = varnish_client.request(
                 method="PURGE",
                 url=url,
+                headers={"X-Purge-Soft": "0"},
             )
             if response.status_code != 200:
                 success = False
@@ -1,13 +1,169 @@
 # Standard Library
+import asyncio
+import os
 import re
+from dataclasses import dataclass
+from dataclasses import field
+from time import monotonic
+from time import sleep
+from typing import Callable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+# HTTP Library
+import httpx
 
 
 PATTERN = r"^/(\+\+api\+\+\/?)+($|/.*)"
 VHM = "/VirtualHostBase/http/plone.localhost:80/Plone/++api++/VirtualHostRoot"
 
+PURGE_TIMEOUT = float(os.environ.get("PURGE_TIMEOUT", "10"))
+
 
 def nginx_rewrite(url: str) -> str:
     """Simulate an nginx rewrite."""
-    if re.search("\+\+api\+\+", url):
+    if re.search(r"\+\+api\+\+", url):
         url = re.sub(pattern=PATTERN, repl=f"{VHM}\\2", string=url)
     return url
+
+
+@dataclass
+class Convergence:
+    """How long a purge took to reach every client."""
+
+    url: str
+    elapsed: float
+    polls: int
+    per_client: List[float] = field(default_factory=list)
+
+
+class ConvergenceTimeout(AssertionError):
+    """The cache did not converge before the timeout."""
+
+
+# Every wait_for_purge call, reported at the end of the test session
+CONVERGENCES: List[Convergence] = []
+
+
+def backoff(
+    initial: float = 0.01, factor: float = 1.5, maximum: float = 0.25
+) -> Iterator[float]:
+    """Polling intervals growing from initial to maximum."""
+    interval = initial
+    while True:
+        yield interval
+        interval = min(interval * factor, maximum)
+
+
+def wait_for(
+    check: Callable[[], bool],
+    timeout: float,
+    description: str = "condition",
+    maximum: float = 0.25,
+) -> Tuple[float, int]:
+    """Poll check with backoff until it is true, return (elapsed, polls)."""
+    start = monotonic()
+    polls = 0
+    for interval in backoff(maximum=maximum):
+        polls += 1
+        if check():
+            return monotonic() - start, polls
+        if monotonic() - start + interval > timeout:
+            raise ConvergenceTimeout(
+                f"{description} not reached after {polls} polls in {timeout:.1f}s"
+            )
+        sleep(interval)
+
+
+def is_cache_hit(headers: dict) -> bool:
+    """Validate if we have a hit in Varnish."""
+    return headers.get("x-cache") == "HIT"
+
+
+def is_stale(headers: dict) -> bool:
+    """Validate if Varnish served an expired object from grace."""
+    ttl = headers.get("x-varnish-ttl")
+    return ttl is not None and float(ttl) <= 0
+
+
+def wait_for_purges(
+    clients: List[httpx.Client],
+    urls: List[str],
+    timeout: float = PURGE_TIMEOUT,
+    since: Optional[float] = None,
+    maximum: float = 0.25,
+) -> List[Convergence]:
+    """Poll urls on every client until each one served them as a MISS.
+
+    A soft-purged object served stale from grace counts as a miss. A
+    purged object is cached again by the request that misses, so each
+    client is polled only until its first miss. Pass one client per
+    Varnish instance, not a client behind the load balancer: which
+    instance served a miss is not known there. Times are measured from
+    ``since`` (a ``monotonic()`` value), or from the call when it is not
+    given.
+    """
+    start = monotonic() if since is None else since
+    pending = {(index, url) for index in range(len(clients)) for url in urls}
+    per_client = {url: [0.0] * len(clients) for url in urls}
+
+    def converged() -> bool:
+        for index, url in list(pending):
+            headers = clients[index].get(url).headers
+            if not is_cache_hit(headers) or is_stale(headers):
+                pending.remove((index, url))
+                per_client[url][index] = monotonic() - start
+        return not pending
+
+    _, polls = wait_for(converged, timeout, f"Purge of {', '.join(urls)}", maximum)
+    convergences = [
+        Convergence(
+            url=url,
+            elapsed=max(per_client[url]),
+            polls=polls,
+            per_client=per_client[url],
+        )
+        for url in urls
+    ]
+    CONVERGENCES.extend(convergences)
+    return convergences
+
+
+def wait_for_purge(
+    clients: List[httpx.Client],
+    url: str,
+    timeout: float = PURGE_TIMEOUT,
+) -> Convergence:
+    """Poll url on every client until each one served it as a MISS."""
+    return wait_for_purges(clients, [url], timeout=timeout)[0]
+
+
+@dataclass
+class Burst:
+    """Responses to concurrent requests for one URL and how long they took."""
+
+    responses: List[httpx.Response]
+    elapsed: float
+
+
+def burst(base_url: str, url: str, clients: int, headers: dict) -> Burst:
+    """Send ``clients`` concurrent GET requests for url, one connection each."""
+
+    async def run() -> Burst:
+        sessions = [
+            httpx.AsyncClient(base_url=base_url, headers=headers, timeout=60.0)
+            for _ in range(clients)
+        ]
+        try:
+            start = monotonic()
+            responses = await asyncio.gather(
+                *(session.get(url) for session in sessions)
+            )
+            return Burst(list(responses), monotonic() - start)
+        finally:
+            for session in sessions:
+                await session.aclose()
+
+    return asyncio.run(run())
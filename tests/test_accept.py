@@ -0,0 +1,67 @@
+# pytest
+import pytest
+
+# Volto
+from tests.conftest import ACCEPT
+
+
+CHROME = (
+    "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,"
+    "image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7"
+)
+SAFARI = "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
+GOOGLEBOT = "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
+CHROME_IMAGE = "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8"
+FIREFOX_IMAGE = "image/avif,image/webp,*/*"
+# Volto's superagent and other client libraries
+SUPERAGENT = "application/json"
+AXIOS = "application/json, text/plain, */*"
+CURL = "*/*"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def caching(auth_client):
+    # Enable caching, disable purge
+    url = "/++api++/@registry"
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": True,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+    yield "Enabled"
+    # Disable caching, disable purge
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": False,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+
+
+@pytest.mark.parametrize(
+    "url,accepts",
+    [
+        ("/++api++/page", [SUPERAGENT, AXIOS, CURL, ACCEPT, CHROME, GOOGLEBOT]),
+        ("/page", [ACCEPT, CHROME, SAFARI, GOOGLEBOT]),
+        (
+            "/page/logo-260x260.png/@@images/image/icon",
+            [CHROME_IMAGE, FIREFOX_IMAGE],
+        ),
+    ],
+)
+def test_accept_variants_share_one_object(anon_client, purge_url, url, accepts):
+    purge_url(url)
+
+    responses = [anon_client.get(url, headers={"Accept": a}) for a in accepts]
+
+    assert all(response.status_code == 200 for response in responses)
+    # The first request fetched the object, every other one hit it
+    hits = [response.headers.get("x-hits") for response in responses]
+    assert hits == [str(count) for count in range(len(accepts))]
+    objects = {response.headers["x-varnish"].split()[-1] for response in responses}
+    assert len(objects) == 1
@@ -0,0 +1,160 @@
+# Standard Library
+import gzip
+import json
+import random
+from time import monotonic
+
+# pytest
+import pytest
+
+# Volto
+from accesslog.__main__ import main
+from accesslog.__main__ import parse_args
+from accesslog.analyzer import Analyzer
+from accesslog.analyzer import TopUrls
+from tests.conftest import REPO_DIR
+
+
+ACCESS_LOG = REPO_DIR / "tests/data/traefik-access.log"
+
+
+def analyze(*paths, **kwargs) -> dict:
+    analyzer = Analyzer(**kwargs)
+    analyzer.read_files(paths)
+    return analyzer.report()
+
+
+def test_edge_and_origin_per_router():
+    report = analyze(ACCESS_LOG)
+
+    assert report["lines"] == 14
+    # Traefik's own log lines are not access log entries
+    assert report["invalid"] == 1
+    assert report["edge"]["requests"] == 7
+    assert set(report["edge"]["routers"]) == {
+        "rt-frontend-public",
+        "rt-backend-api-public",
+    }
+    assert report["origin"]["requests"] == 6
+    assert set(report["origin"]["routers"]) == {
+        "rt-frontend-internal",
+        "rt-backend-api-internal",
+        "rt-backend-ui-internal",
+    }
+    assert report["origin_ratio"] == round(6 / 7, 4)
+    api = report["origin"]["routers"]["rt-backend-api-internal"]
+    assert api["requests"] == 3
+    assert api["statuses"] == {"2xx": 3}
+    assert report["origin"]["routers"]["rt-backend-ui-internal"]["statuses"] == {
+        "4xx": 1
+    }
+
+
+def test_latency_histograms():
+    report = analyze(ACCESS_LOG)
+
+    api = report["origin"]["routers"]["rt-backend-api-internal"]["latency_ms"]
+    assert api["p50"] == 250.0
+    # The last bucket is capped at the slowest request
+    assert api["p99"] == 1620.0
+    assert api["max"] == 1620.0
+    assert sum(api["buckets"].values()) == 3
+    assert api["buckets"]["0.1"] == 1
+    edge = report["edge"]["routers"]["rt-frontend-public"]["latency_ms"]
+    assert edge["p50"] == 5.0
+
+
+def test_top_uncached_urls():
+    report = analyze(ACCESS_LOG, top=2)
+
+    top = report["top_uncached"]
+    assert [entry["url"] for entry in top] == ["/++api++/page", "/page"]
+    assert top[0]["requests"] == 2
+    assert top[0]["error"] == 0
+    assert top[0]["origin_seconds"] == pytest.approx(1.678, abs=0.001)
+
+
+def test_gzip_rotated_logs(tmp_path):
+    lines = ACCESS_LOG.read_bytes().splitlines(keepends=True)
+    rotated = tmp_path / "access.log.1.gz"
+    with gzip.open(rotated, "wb") as fp:
+        fp.writelines(lines[:7])
+    current = tmp_path / "access.log"
+    current.write_bytes(b"".join(lines[7:]))
+
+    assert analyze(rotated, current) == analyze(ACCESS_LOG)
+
+
+def test_since_and_until():
+    report = analyze(ACCESS_LOG, since="2024-05-01T13", until="2024-05-01T14")
+
+    assert report["skipped"] == 2
+    assert report["edge"]["requests"] == 5
+    assert report["origin"]["requests"] == 6
+
+
+def test_top_urls_memory_is_bounded():
+    rng = random.Random(42)
+    heavy = {f"/heavy-{number}": 500 - number * 100 for number in range(3)}
+    urls = [url for url, count in heavy.items() for _ in range(count)]
+    urls += [f"/page-{number}" for number in range(10000)]
+    rng.shuffle(urls)
+    top = TopUrls(size=3, capacity=50)
+
+    for url in urls:
+        top.add(url, 0.1)
+        assert len(top.counts) <= 100
+
+    result = top.top()
+    assert [entry["url"] for entry in result] == list(heavy)
+    for entry in result:
+        # Counts are overestimated by at most the error
+        assert entry["requests"] - entry["error"] <= heavy[entry["url"]]
+        assert entry["requests"] >= heavy[entry["url"]]
+
+
+def test_cli(tmp_path):
+    output = tmp_path / "report.json"
+    args = parse_args([str(ACCESS_LOG), "--top", "1", "--output", str(output)])
+
+    report = main(args)
+
+    assert len(report["top_uncached"]) == 1
+    assert report["origin"]["requests"] == 6
+
+
+def synthetic_log(path, lines: int):
+    """A gzipped log shaped like the fixture, with many distinct URLs."""
+    rng = random.Random(42)
+    template = [json.loads(line) for line in ACCESS_LOG.read_text().splitlines()[:-1]]
+    with gzip.open(path, "wt") as fp:
+        for _ in range(lines):
+            entry = dict(rng.choice(template))
+            entry["RequestPath"] += f"?b_start={rng.randrange(lines // 10)}"
+            entry["Duration"] = int(rng.expovariate(20) * 1e9)
+            fp.write(json.dumps(entry) + "\n")
+
+
+@pytest.mark.benchmark
+def test_accesslog_throughput(tmp_path, benchmark_report, request):
+    """Lines per second the analyzer reads from a gzip-rotated log."""
+    lines = request.config.getoption("benchmark_views") * 1000
+    path = tmp_path / "access.log.1.gz"
+    synthetic_log(path, lines)
+
+    start = monotonic()
+    analyzer = Analyzer()
+    analyzer.read_files([path])
+    elapsed = monotonic() - start
+
+    report = analyzer.report()
+    benchmark_report["accesslog"] = {
+        "lines": lines,
+        "compressed_bytes": path.stat().st_size,
+        "seconds": round(elapsed, 3),
+        "lines_per_second": round(lines / elapsed),
+        "urls_tracked": len(analyzer.uncached.counts),
+    }
+    assert report["lines"] == lines
+    assert report["invalid"] == 0
+    assert len(analyzer.uncached.counts) <= 2 * analyzer.uncached.capacity
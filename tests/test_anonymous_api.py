@@ -0,0 +1,132 @@
+# pytest
+import pytest
+
+# Volto
+from tests.helpers import is_cache_hit
+
+
+# Requests the browser sends to ++api++ after Volto rendered a page
+HYDRATION = ["/++api++/page", "/++api++/@navigation"]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def no_caching(auth_client, varnish_client):
+    # Disable caching, Plone sends no Cache-Control
+    url = "/++api++/@registry"
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": False,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+    yield "Disabled"
+    # Do not leave responses without caching headers behind
+    for url in ["/++api++/", "/page", *HYDRATION]:
+        varnish_client.request("PURGE", url, headers={"X-Purge-Soft": "0"})
+
+
+@pytest.mark.parametrize("url", ["/++api++/", *HYDRATION])
+def test_anonymous_api_is_cached(anon_client, purge_url, url: str):
+    purge_url(url)
+
+    response = anon_client.get(url)
+    assert response.status_code == 200
+    headers = response.headers
+    assert "cache-control" not in headers
+    assert headers.get("x-varnish-reqtype") == "api"
+    assert headers.get("x-cache") == "MISS"
+    assert headers.get("x-varnish-ttl") == "30.000"
+    assert headers.get("x-varnish-grace") == "120.000"
+
+    # Second request will get cached version
+    headers = anon_client.get(url).headers
+    assert is_cache_hit(headers) is True
+    assert headers.get("x-hits") == "1"
+
+
+def test_anonymous_api_not_found_is_kept_briefly(anon_client, purge_url):
+    url = "/++api++/missing"
+    purge_url(url)
+
+    response = anon_client.get(url)
+    assert response.status_code == 404
+    headers = response.headers
+    assert (
+        headers.get("x-varnish-action")
+        == "INSERT (anonymous API: 10s caching of not found)"
+    )
+    assert headers.get("x-varnish-ttl") == "10.000"
+    assert headers.get("x-varnish-grace") == "0.000"
+    assert is_cache_hit(anon_client.get(url).headers) is True
+    purge_url(url)
+
+
+@pytest.fixture
+def private_document(auth_root_client):
+    url = "/++api++/private-document"
+    auth_root_client.post(
+        "/++api++/",
+        json={"@type": "Document", "id": "private-document", "title": "Private"},
+    )
+    yield url
+    auth_root_client.delete(url)
+
+
+def test_anonymous_api_unauthorized_is_passed(
+    anon_client, purge_url, stack, private_document: str
+):
+    url = private_document
+    purge_url(url)
+    before = stack.backend_requests(url)
+
+    for _ in range(2):
+        response = anon_client.get(url)
+        assert response.status_code == 401
+        headers = response.headers
+        assert (
+            headers.get("x-varnish-action")
+            == "FETCH (pass - anonymous API status not cacheable)"
+        )
+        assert is_cache_hit(headers) is False
+    assert stack.backend_requests(url) == before + 2
+
+
+@pytest.mark.parametrize("url", HYDRATION)
+def test_authenticated_api_is_not_cached(auth_client, url: str):
+    for _ in range(2):
+        response = auth_client.get(url, headers={"x-varnish-debug": "1"})
+        assert response.status_code == 200
+        assert response.headers.get("x-auth") == "Logged-in"
+        assert is_cache_hit(response.headers) is False
+
+
+@pytest.mark.benchmark
+def test_volto_page_views(anon_client, purge_url, stack, benchmark_report, request):
+    """Backend requests for anonymous page views, SSR then API hydration."""
+    views = request.config.getoption("benchmark_views")
+    for url in ["/page", *HYDRATION]:
+        purge_url(url)
+    before = {url: stack.backend_requests(url) for url in HYDRATION}
+
+    hits = 0
+    for _ in range(views):
+        assert anon_client.get("/page").status_code == 200
+        for url in HYDRATION:
+            response = anon_client.get(url)
+            assert response.status_code == 200
+            hits += is_cache_hit(response.headers)
+
+    api_requests = views * len(HYDRATION)
+    backend_requests = sum(
+        stack.backend_requests(url) - count for url, count in before.items()
+    )
+    benchmark_report["anonymous_api"] = {
+        "stack": stack.name,
+        "views": views,
+        "api_requests": api_requests,
+        "backend_requests": backend_requests,
+        "hit_ratio": round(hits / api_requests, 4),
+    }
+    assert backend_requests < api_requests
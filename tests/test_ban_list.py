@@ -0,0 +1,232 @@
+"""Ban-list growth under edits, with req.* bans and with lurker-friendly bans.
+
+The benchmark runs against varnishd in the docker stack: the same purge
+workload goes through etc/varnish.vcl and through the previous VCL, which
+banned on req.*, loaded next to it. Ban-list length comes from varnishadm
+ban.list and the ban counters from varnishstat.
+"""
+
+# Standard Library
+import json
+import random
+import re
+from time import perf_counter
+from time import sleep
+from typing import Dict
+
+# HTTP Library
+import httpx
+
+# pytest
+import pytest
+
+# Volto
+from benchmarks.load import percentiles
+from edge import vcl
+from edge.cache import Cache
+from edge.cache import CachedObject
+from edge.http import Request
+from edge.origin import purge_paths
+from tests.conftest import HOST
+
+
+# The previous VCL's bans, which only lookups can test, in place of the
+# lurker-friendly ones
+LEGACY_BANS = [
+    (
+        'ban("obj.http.x-url == " + req.url);',
+        'ban("req.url == " + req.url);',
+    ),
+    (
+        'ban("obj.http.x-host == " + req.http.host + " && obj.http.x-url == " + req.url);',
+        'ban("req.http.host == " + req.http.host + " && req.url == " + req.url);',
+    ),
+]
+
+# Content the docker stack's Plone holds
+ITEMS = [
+    ("/page", {"@type": "Document"}),
+    ("/page/logo-260x260.png", {"@type": "Image"}),
+]
+# Listing pages cached next to the items, never purged
+LISTINGS = 50
+# Lookups timed after each edit
+LOOKUPS = 20
+# Edits between two ban.list samples
+SAMPLE_EVERY = 20
+# ban_lurker_age during the run, varnishd's default of 60s would let no
+# ban of a short run reach the lurker
+LURKER_AGE = 1.0
+
+COUNTERS = (
+    "bans_added",
+    "bans_deleted",
+    "bans_tested",
+    "bans_tests_tested",
+    "bans_obj_killed",
+    "bans_lurker_tested",
+    "bans_lurker_tests_tested",
+    "bans_lurker_obj_killed",
+)
+
+
+def legacy_vcl(repo_dir) -> str:
+    text = (repo_dir / "etc/varnish.vcl").read_text()
+    for new, old in LEGACY_BANS:
+        assert text.count(new) == 1, new
+        text = text.replace(new, old)
+    return text
+
+
+def ban_list(stack) -> int:
+    """Bans varnishadm ban.list shows, the completed ones included."""
+    lines = stack.varnish("varnishadm", "ban.list").splitlines()
+    return len([line for line in lines[1:] if line.strip()])
+
+
+def ban_counters(stack) -> Dict[str, int]:
+    data = json.loads(stack.varnish("varnishstat", "-j", "-f", "MAIN.bans*"))
+    # varnishstat 7 nests the counters, 6 has them at the top
+    counters = data.get("counters", data)
+    return {
+        name.split(".", 1)[1]: counter["value"]
+        for name, counter in counters.items()
+        if isinstance(counter, dict)
+    }
+
+
+@pytest.fixture
+def vcls(stack, repo_dir):
+    """The running VCL's name and the previous VCL's, loaded next to it."""
+    if stack.name != "docker":
+        pytest.skip("Measures varnishd's ban list, run with --stack docker")
+    active = next(
+        line.split()[-1]
+        for line in stack.varnish("varnishadm", "vcl.list").splitlines()
+        if line.startswith("active")
+    )
+    age = re.search(
+        r"Value is: ([0-9.]+)",
+        stack.varnish("varnishadm", "param.show", "ban_lurker_age"),
+    ).group(1)
+    stack.varnish("sh", "-c", "cat > /tmp/legacy.vcl", stdin=legacy_vcl(repo_dir))
+    stack.varnish("varnishadm", "vcl.load", "legacy", "/tmp/legacy.vcl")
+    stack.varnish("varnishadm", "param.set", "ban_lurker_age", str(LURKER_AGE))
+    yield active, "legacy"
+    stack.varnish("varnishadm", "vcl.use", active)
+    stack.varnish("varnishadm", "vcl.discard", "legacy")
+    stack.varnish("varnishadm", "param.set", "ban_lurker_age", age)
+
+
+def run(stack, client: httpx.Client, name: str, edits: int) -> dict:
+    """Send edits' purges through the VCL called name, with lookups between."""
+    stack.varnish("varnishadm", "vcl.use", name)
+    urls = [url for path, item in ITEMS for url in purge_paths(path, item)]
+    urls += [f"/page?b_start={number}" for number in range(LISTINGS)]
+    for url in urls:
+        client.get(url)
+    before = ban_counters(stack)
+
+    rng = random.Random(0)
+    lengths = []
+    lookup_times = []
+    for edit in range(edits):
+        path, item = rng.choice(ITEMS)
+        for url in purge_paths(path, item):
+            client.request("PURGE", url, headers={"X-Purge-Soft": "0"})
+        for url in rng.sample(urls, LOOKUPS):
+            start = perf_counter()
+            client.get(url)
+            lookup_times.append(perf_counter() - start)
+        if edit % SAMPLE_EVERY == 0:
+            lengths.append(ban_list(stack))
+    # Let the lurker process what it can of the last edits
+    sleep(LURKER_AGE * 3)
+    after = ban_counters(stack)
+
+    return {
+        "ban_list": {
+            "final": ban_list(stack),
+            "max": max(lengths),
+            "mean": round(sum(lengths) / len(lengths), 1),
+        },
+        "lookup_ms": percentiles(lookup_times),
+        **{name: after[name] - before[name] for name in COUNTERS},
+    }
+
+
+@pytest.mark.benchmark
+def test_ban_list_growth(stack, varnish_client, vcls, benchmark_report, request):
+    """Ban-list length and lookup time, req.url bans against obj.http bans."""
+    edits = request.config.getoption("benchmark_ban_edits")
+    current, legacy = vcls
+    # First, so that the req.* bans left on the list do not count
+    lurker_friendly = run(stack, varnish_client, current, edits)
+    req_bans = run(stack, varnish_client, legacy, edits)
+
+    assert lurker_friendly["bans_lurker_tested"] > 0
+    assert req_bans["bans_lurker_tested"] == 0
+    assert lurker_friendly["ban_list"]["final"] < req_bans["ban_list"]["final"]
+
+    benchmark_report["ban_list"] = {
+        "edits": edits,
+        "objects": sum(len(purge_paths(*item)) for item in ITEMS) + LISTINGS,
+        "ban_lurker_age": LURKER_AGE,
+        "req_bans": req_bans,
+        "obj_bans": lurker_friendly,
+    }
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def fetch(cache: Cache, url: str):
+    """Insert an object the way a backend fetch through the VCL would."""
+    bereq = Request("GET", url, httpx.Headers({"Host": HOST}))
+    vcl.detect_requesttype(bereq)
+    beresp = vcl.vcl_backend_response(
+        bereq,
+        vcl.rfc2616_ttl(
+            200, httpx.Headers({"Cache-Control": "max-age=0, s-maxage=86400"})
+        ),
+    )
+    cache.insert(
+        (url, HOST),
+        CachedObject(
+            status=200,
+            reason="OK",
+            headers=beresp.headers,
+            body=b"",
+            t_origin=cache.clock(),
+            ttl=beresp.ttl,
+            grace=beresp.grace,
+            url=url,
+        ),
+    )
+
+
+@pytest.mark.parametrize(
+    "expression,lurked",
+    [("obj.http.x-url == {url}", True), ("req.url == {url}", False)],
+)
+def test_lurker_processes_obj_bans(expression: str, lurked: bool):
+    """The edge mirror's lurker tests obj.* bans and leaves req.* bans alone."""
+    clock = Clock()
+    cache = Cache(clock=clock)
+    path, item = ITEMS[1]
+    urls = purge_paths(path, item)
+    for url in urls:
+        fetch(cache, url)
+
+    clock.now += 1.0
+    for url in urls:
+        cache.ban(expression.format(url=url))
+    cache.lurk(age=0.0)
+
+    assert (cache.bans_lurker_obj_killed == len(urls)) is lurked
+    assert (len(cache.bans) <= 1) is lurked
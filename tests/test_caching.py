@@ -1,9 +1,14 @@
 # Standard Library
-from time import sleep
+import uuid
+from urllib.parse import urlparse
 
 # pytest
 import pytest
 
+# Volto
+from edge.cache import STORAGE
+from tests.helpers import is_cache_hit
+
 
 @pytest.fixture(scope="module", autouse=True)
 def caching(auth_client):
@@ -41,7 +46,6 @@ def caching(auth_client):
 def test_varnish_in_front_of_express_cache(anon_client, purge_url, url: str):
     # Remove from cache
     purge_url(url)
-    sleep(0.5)
 
     response = anon_client.get(url)
     assert response.status_code == 200
@@ -60,14 +64,16 @@ def test_varnish_in_front_of_express_cache(anon_client, purge_url, url: str):
     assert float(headers.get("x-varnish-ttl")) < 30000
 
 
-@pytest.mark.parametrize(
-    "url",
-    [
-        "/page/logo-260x260.png/@@images/image/preview",
-        "/page/logo-260x260.png/@@images/image/thumb",
-        "/page/logo-260x260.png/@@images/image/icon",
-    ],
-)
+SCALE_URLS = [
+    "/page/logo-260x260.png/@@images/image/preview",
+    "/page/logo-260x260.png/@@images/image/thumb",
+    "/page/logo-260x260.png/@@images/image/icon",
+]
+
+PAGE_URLS = ["/page", "/++api++/page"]
+
+
+@pytest.mark.parametrize("url", SCALE_URLS)
 def test_varnish_in_front_of_express_with_cache(anon_client, url: str):
     # First request could or could not be cached (we do not invalidate everything)
     response = anon_client.get(url)
@@ -80,6 +86,94 @@ def test_varnish_in_front_of_express_with_cache(anon_client, url: str):
     assert headers.get("x-varnish-reqtype") == "blob"
 
 
+def test_hashed_scale_is_immutable(anon_client):
+    image = anon_client.get("/++api++/page/logo-260x260.png").json()["image"]
+    url = urlparse(image["scales"]["thumb"]["download"]).path
+
+    anon_client.get(url)
+    headers = anon_client.get(url).headers
+
+    assert is_cache_hit(headers) is True
+    assert headers.get("x-varnish-reqtype") == "blob"
+    assert headers.get("cache-control") == "public, max-age=31536000, immutable"
+    # Cached for a year
+    assert float(headers.get("x-varnish-ttl")) > 364 * 24 * 3600
+
+
+def test_missing_hashed_scale_is_not_kept(anon_client):
+    url = f"/page/logo-260x260.png/@@images/missing-128-{uuid.uuid4().hex}.png"
+
+    for _ in range(2):
+        response = anon_client.get(url)
+        assert response.status_code == 404
+        headers = response.headers
+        assert is_cache_hit(headers) is False
+        assert headers.get("cache-control") != "public, max-age=31536000, immutable"
+        assert float(headers.get("x-varnish-ttl")) < 24 * 3600
+
+
+@pytest.fixture
+def storages(stack):
+    if stack.name != "local":
+        pytest.skip("Sizes the local node's storage, docker-compose.yml sets -s")
+    storages = stack.nodes[0].cache.storages
+    yield storages
+    for name, size in STORAGE.items():
+        storages[name].size = size
+
+
+def shrink(storage, objects: int):
+    """Leave room for about ``objects`` more objects of the largest size."""
+    largest = max(obj.size for _, obj in storage.lru.values())
+    storage.size = storage.used + objects * largest
+
+
+def nuked(storages) -> dict:
+    return {name: storage.nuked for name, storage in storages.items()}
+
+
+def populate(anon_client, urls):
+    for url in urls:
+        anon_client.get(url)
+        assert is_cache_hit(anon_client.get(url).headers) is True, url
+
+
+@pytest.mark.parametrize("url", SCALE_URLS)
+def test_image_flood_does_not_evict_pages(anon_client, storages, url: str):
+    populate(anon_client, PAGE_URLS + [url])
+    shrink(storages["blob"], 4)
+    before = nuked(storages)
+
+    # A crawler requesting image scales the cache has never seen
+    for _ in range(50):
+        flood = f"/page/logo-260x260.png/@@images/image-128-{uuid.uuid4().hex}.png"
+        assert anon_client.get(flood).status_code == 200
+
+    # Blobs evicted blobs, the scale included
+    assert storages["blob"].nuked > before["blob"]
+    assert storages["blob"].used <= storages["blob"].size
+    assert is_cache_hit(anon_client.get(url).headers) is False
+    # Pages and API responses were untouched
+    assert storages["html"].nuked == before["html"]
+    for page in PAGE_URLS:
+        assert is_cache_hit(anon_client.get(page).headers) is True, page
+
+
+@pytest.mark.parametrize("url", SCALE_URLS)
+def test_page_flood_does_not_evict_images(anon_client, storages, url: str):
+    populate(anon_client, PAGE_URLS + [url])
+    shrink(storages["html"], 4)
+    before = nuked(storages)
+
+    # Pages the cache has never seen, one per query string
+    for number in range(50):
+        assert anon_client.get(f"/page?b_start={number}").status_code == 200
+
+    assert storages["html"].nuked > before["html"]
+    assert storages["blob"].nuked == before["blob"]
+    assert is_cache_hit(anon_client.get(url).headers) is True
+
+
 @pytest.fixture(scope="module")
 def site_root(anon_client) -> dict:
     response = anon_client.get("/++api++/")
@@ -0,0 +1,130 @@
+# pytest
+import pytest
+
+# Volto
+from tests.conftest import ACCEPT
+from tests.helpers import PURGE_TIMEOUT
+from tests.helpers import burst
+from tests.helpers import is_cache_hit
+from tests.helpers import is_stale
+from tests.helpers import wait_for
+
+
+CLIENTS = 20
+
+# Origin delay in the local stack, long enough for every client of a burst
+# to arrive while the first fetch is still running
+ORIGIN_DELAY = 0.1
+
+URLS = [
+    ("express", "/page"),
+    ("api", "/++api++/page"),
+    ("blob", "/page/logo-260x260.png/@@images/image/icon"),
+]
+
+
+def set_caching(auth_client, enabled: bool):
+    response = auth_client.patch(
+        "/++api++/@registry",
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": enabled,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+    assert response.status_code == 204
+
+
+@pytest.fixture(scope="module", autouse=True)
+def caching(auth_client):
+    # Enable caching, disable purge
+    set_caching(auth_client, True)
+    yield "Enabled"
+    set_caching(auth_client, False)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def slow_origin(stack):
+    if stack.name == "local":
+        stack.origin.delay = ORIGIN_DELAY
+    yield
+    if stack.name == "local":
+        stack.origin.delay = 0.0
+
+
+@pytest.fixture
+def no_caching(auth_client):
+    # Plone sends no Cache-Control, so Varnish marks responses uncacheable
+    set_caching(auth_client, False)
+    yield
+    set_caching(auth_client, True)
+
+
+@pytest.fixture
+def fire(stack):
+    """Burst of anonymous clients, returning it with the origin fetches."""
+
+    def inner(url: str):
+        before = stack.backend_requests(url)
+        result = burst(
+            stack.base_url,
+            url,
+            CLIENTS,
+            {"Host": stack.host, "Accept": ACCEPT, "x-varnish-debug": "1"},
+        )
+        assert all(response.status_code == 200 for response in result.responses)
+        return result, stack.backend_requests(url) - before
+
+    return inner
+
+
+@pytest.mark.parametrize("reqtype,url", URLS)
+def test_cold_burst_is_coalesced(fire, purge_url, reqtype: str, url: str):
+    purge_url(url)
+
+    result, fetches = fire(url)
+
+    assert fetches == 1
+    assert {r.headers["x-varnish-reqtype"] for r in result.responses} == {reqtype}
+    # One client fetched, the others waited for its object
+    assert sum(not is_cache_hit(r.headers) for r in result.responses) == 1
+
+
+@pytest.mark.parametrize("reqtype,url", URLS)
+def test_soft_purged_burst_is_coalesced(
+    fire, anon_client, varnish_client, stack, reqtype: str, url: str
+):
+    anon_client.get(url)
+    assert is_cache_hit(anon_client.get(url).headers) is True
+    response = varnish_client.request("PURGE", url, headers={"X-Purge-Soft": "1"})
+    assert response.status_code == 200
+    before = stack.backend_requests(url)
+
+    result, _ = fire(url)
+
+    # Everyone got the stale object while one background fetch ran
+    assert all(is_cache_hit(r.headers) for r in result.responses)
+    assert any(is_stale(r.headers) for r in result.responses)
+    wait_for(
+        lambda: stack.backend_requests(url) > before,
+        PURGE_TIMEOUT,
+        f"Background fetch of {url}",
+    )
+    assert stack.backend_requests(url) - before == 1
+
+
+@pytest.mark.parametrize("reqtype,url", URLS[2:])
+def test_uncacheable_burst_is_not_serialized(
+    fire, anon_client, purge_url, no_caching, reqtype: str, url: str
+):
+    purge_url(url)
+    # The first uncacheable fetch leaves a hit-for-miss object behind
+    anon_client.get(url)
+    single = anon_client.get(url)
+    assert is_cache_hit(single.headers) is False
+
+    result, fetches = fire(url)
+
+    # Every client goes to the origin once, and all of them at the same time
+    assert fetches == CLIENTS
+    assert result.elapsed < single.elapsed.total_seconds() * CLIENTS / 2
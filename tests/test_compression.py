@@ -0,0 +1,230 @@
+# Standard Library
+import json
+import re
+from typing import Dict
+
+# HTTP Library
+import httpx
+
+# pytest
+import pytest
+
+# Volto
+from tests.conftest import ACCEPT
+from tests.conftest import HOST
+
+
+BROWSER = "gzip, deflate, br"
+ENCODINGS = [BROWSER, "gzip", "br", "identity", "gzip;q=0, deflate", ""]
+TEXT_URLS = ["/page", "/++api++/page", "/++api++/@navigation"]
+IMAGE_URL = "/page/logo-260x260.png/@@images/image/icon"
+
+# What the previous VCL did not have: the Accept-Encoding normalization, gzip
+# storage and the gunzip on delivery
+LEGACY_COMPRESSION = [
+    r"^sub normalize_accept_encoding\{\n.*?^\}\n\n",
+    r"^  call normalize_accept_encoding;\n",
+    r"^  # Store text responses gzipped, once\..*?^  \}\n\n",
+    r'^  if \(req\.http\.x-accept-gzip == "0"\) \{\n.*?^  \}\n\n',
+]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def caching(auth_client):
+    # Enable caching, disable purge
+    url = "/++api++/@registry"
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": True,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+    yield "Enabled"
+    # Disable caching, disable purge
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": False,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+
+
+def get(client, url: str, encoding: str):
+    return client.get(url, headers={"Accept-Encoding": encoding})
+
+
+@pytest.mark.parametrize("url", [*TEXT_URLS, IMAGE_URL])
+def test_encodings_share_one_object(anon_client, purge_url, url: str):
+    purge_url(url)
+
+    responses = [get(anon_client, url, encoding) for encoding in ENCODINGS]
+
+    assert all(response.status_code == 200 for response in responses)
+    # The first request fetched the object, every other one hit it
+    hits = [response.headers.get("x-hits") for response in responses]
+    assert hits == [str(count) for count in range(len(ENCODINGS))]
+    # A miss shows only the request's id, hits add the object's
+    objects = {response.headers["x-varnish"].split()[-1] for response in responses[1:]}
+    assert len(objects) == 1
+    assert len({response.content for response in responses}) == 1
+
+
+@pytest.mark.parametrize("url", TEXT_URLS)
+def test_text_is_delivered_gzipped(anon_client, purge_url, url: str):
+    purge_url(url)
+
+    response = get(anon_client, url, BROWSER)
+    assert response.status_code == 200
+    assert response.headers.get("content-encoding") == "gzip"
+    assert "Accept-Encoding" in response.headers.get("vary", "")
+    assert response.num_bytes_downloaded < len(response.content)
+
+
+@pytest.mark.parametrize("encoding", ["identity", "br", "gzip;q=0, deflate", ""])
+@pytest.mark.parametrize("url", TEXT_URLS)
+def test_text_is_gunzipped_for_other_clients(
+    anon_client, purge_url, url: str, encoding: str
+):
+    purge_url(url)
+    compressed = get(anon_client, url, "gzip")
+
+    response = get(anon_client, url, encoding)
+    assert response.status_code == 200
+    assert response.headers.get("x-cache") == "HIT"
+    assert "content-encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers.get("vary", "")
+    assert response.num_bytes_downloaded == len(response.content)
+    assert response.content == compressed.content
+
+
+def test_images_are_not_compressed(anon_client, purge_url):
+    purge_url(IMAGE_URL)
+
+    response = get(anon_client, IMAGE_URL, BROWSER)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("image/png")
+    assert "content-encoding" not in response.headers
+
+
+def legacy_vcl(repo_dir) -> str:
+    """etc/varnish.vcl without gzip: what Varnish ran when Traefik compressed."""
+    text = (repo_dir / "etc/varnish.vcl").read_text()
+    for pattern in LEGACY_COMPRESSION:
+        text, count = re.subn(pattern, "", text, flags=re.M | re.S)
+        assert count == 1, pattern
+    return text
+
+
+@pytest.fixture
+def vcls(stack, repo_dir):
+    """The running VCL's name and the previous VCL's, loaded next to it."""
+    if stack.name != "docker":
+        yield None, None
+        return
+    active = next(
+        line.split()[-1]
+        for line in stack.varnish("varnishadm", "vcl.list").splitlines()
+        if line.startswith("active")
+    )
+    stack.varnish("sh", "-c", "cat > /tmp/legacy.vcl", stdin=legacy_vcl(repo_dir))
+    stack.varnish("varnishadm", "vcl.load", "legacy", "/tmp/legacy.vcl")
+    yield active, "legacy"
+    stack.varnish("varnishadm", "vcl.use", active)
+    stack.varnish("varnishadm", "vcl.discard", "legacy")
+
+
+def storage(stack) -> Dict[str, int]:
+    """Bytes in each storage and objects in the varnishd behind varnish_url."""
+    data = json.loads(
+        stack.varnish("varnishstat", "-j", "-f", "SMA.*.g_bytes", "-f", "MAIN.n_object")
+    )
+    # varnishstat 7 nests the counters, 6 has them at the top
+    counters = data.get("counters", data)
+    return {
+        name: counter["value"]
+        for name, counter in counters.items()
+        if isinstance(counter, dict)
+    }
+
+
+def run(stack, client: httpx.Client, purge_url, name: str = None) -> dict:
+    """Send the client mix through the VCL called name, the running one if None."""
+    if name is not None:
+        stack.varnish("varnishadm", "vcl.use", name)
+    urls = [*TEXT_URLS, IMAGE_URL]
+    for url in urls:
+        purge_url(url)
+    measured = stack.name == "docker"
+    if measured:
+        before = storage(stack)
+
+    report = {}
+    for url in urls:
+        responses = [get(client, url, encoding) for encoding in ENCODINGS]
+        assert all(response.status_code == 200 for response in responses)
+        # Again, all hits: a miss shows only the request's id, hits add the
+        # object's. What the first client of each object downloads is what
+        # Varnish stores.
+        stored = {}
+        for encoding in ENCODINGS:
+            response = get(client, url, encoding)
+            xid = response.headers["x-varnish"].split()[-1]
+            stored.setdefault(xid, response.num_bytes_downloaded)
+        report[url] = {
+            "variants": len(stored),
+            "bytes": sum(stored.values()),
+            "bytes_identity": get(client, url, "identity").num_bytes_downloaded,
+        }
+
+    result = {
+        "objects": report,
+        "variants": sum(entry["variants"] for entry in report.values()),
+        "bytes": sum(entry["bytes"] for entry in report.values()),
+        "bytes_identity": sum(entry["bytes_identity"] for entry in report.values()),
+    }
+    if measured:
+        after = storage(stack)
+        # Storage overhead included, varnishd's own account of the run
+        result["varnishstat"] = {
+            name: after[name] - before.get(name, 0) for name in after
+        }
+    return result
+
+
+@pytest.mark.benchmark
+def test_cached_bytes(stack, purge_url, vcls, benchmark_report):
+    """Cached bytes and variants per object for a mix of clients.
+
+    With --stack docker the same mix also goes through the previous VCL,
+    loaded next to the running one. Traefik's compress middleware is not
+    restored, so it stores what Plone and Volto send uncompressed.
+    """
+    current, legacy = vcls
+    # One instance, the one whose storage is measured
+    client = httpx.Client(
+        base_url=stack.varnish_url,
+        headers={"Host": HOST, "Accept": ACCEPT, "x-varnish-debug": "1"},
+    )
+    gzip_once = run(stack, client, purge_url, current)
+    if legacy is not None:
+        previous = run(stack, client, purge_url, legacy)
+        stack.varnish("varnishadm", "vcl.use", current)
+        for url in previous["objects"]:
+            purge_url(url)
+    client.close()
+
+    for entry in gzip_once["objects"].values():
+        assert entry["variants"] == 1
+        assert entry["bytes"] <= entry["bytes_identity"]
+
+    benchmark_report["compression"] = {
+        "stack": stack.name,
+        "clients": ENCODINGS,
+        "gzip_once": gzip_once,
+    }
+    if legacy is not None:
+        benchmark_report["compression"]["legacy"] = previous
@@ -0,0 +1,184 @@
+# Standard Library
+import base64
+import hashlib
+import os
+import tracemalloc
+from time import monotonic
+
+# pytest
+import pytest
+
+
+LARGE_FILE = 16 << 20
+SMALL_FILE = 256 << 10
+
+RANGES = [
+    ("bytes=0-99", slice(0, 100)),
+    ("bytes=1000-1999", slice(1000, 2000)),
+    # The last 100 bytes, and everything from byte 100 on
+    ("bytes=-100", slice(-100, None)),
+    ("bytes=100-", slice(100, None)),
+]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def caching(auth_client):
+    # Enable caching, disable purge
+    url = "/++api++/@registry"
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": True,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+    yield "Enabled"
+    # Disable caching, disable purge
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": False,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+
+
+def upload(client, name: str, size: int):
+    """A File below /page, its download URL and its data."""
+    data = os.urandom(size)
+    response = client.post(
+        "/++api++/page",
+        json={
+            "@type": "File",
+            "id": name,
+            "title": name,
+            "file": {
+                "data": base64.b64encode(data).decode(),
+                "encoding": "base64",
+                "filename": name,
+                "content-type": "application/octet-stream",
+            },
+        },
+    )
+    assert response.status_code == 201
+    return f"/page/{name}/@@download/file", data
+
+
+@pytest.fixture(scope="module")
+def large_file(auth_root_client):
+    url, data = upload(auth_root_client, "dataset.bin", LARGE_FILE)
+    yield url, data
+    auth_root_client.delete("/++api++/page/dataset.bin")
+
+
+@pytest.fixture(scope="module")
+def small_file(auth_root_client):
+    url, data = upload(auth_root_client, "notes.bin", SMALL_FILE)
+    yield url, data
+    auth_root_client.delete("/++api++/page/notes.bin")
+
+
+def download(client, url: str, **headers):
+    """Stream url, returning the response, its body digest and timings."""
+    digest = hashlib.sha256()
+    start = monotonic()
+    first_byte = None
+    with client.stream("GET", url, headers=headers) as response:
+        for chunk in response.iter_raw():
+            if first_byte is None:
+                first_byte = monotonic() - start
+            digest.update(chunk)
+    return response, digest.hexdigest(), first_byte, monotonic() - start
+
+
+def test_large_file_is_streamed(anon_client, large_file):
+    url, data = large_file
+
+    response, digest, first_byte, total = download(anon_client, url)
+
+    assert response.status_code == 200
+    assert response.headers["x-cache"] == "MISS"
+    assert int(response.headers["content-length"]) == LARGE_FILE
+    assert digest == hashlib.sha256(data).hexdigest()
+    # The first bytes arrive long before the last left Plone
+    assert first_byte < total / 2
+
+
+def test_large_file_is_not_stored(anon_client, large_file, stack):
+    url, data = large_file
+    download(anon_client, url)
+    before = stack.backend_requests(url)
+
+    response, digest, *_ = download(anon_client, url)
+
+    assert response.headers["x-cache"] == "MISS"
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert stack.backend_requests(url) == before + 1
+
+
+@pytest.mark.parametrize("header,part", RANGES)
+def test_large_file_range(anon_client, large_file, header: str, part: slice):
+    url, data = large_file
+    expected = data[part]
+
+    response = anon_client.get(url, headers={"Range": header})
+
+    assert response.status_code == 206
+    start = part.start % LARGE_FILE
+    assert response.headers["content-range"] == (
+        f"bytes {start}-{start + len(expected) - 1}/{LARGE_FILE}"
+    )
+    assert response.content == expected
+
+
+@pytest.mark.parametrize("header,part", RANGES)
+def test_cached_file_range(anon_client, small_file, stack, header: str, part: slice):
+    url, data = small_file
+    anon_client.get(url)
+    before = stack.backend_requests(url)
+    expected = data[part]
+
+    response = anon_client.get(url, headers={"Range": header})
+
+    assert response.status_code == 206
+    assert response.headers["x-cache"] == "HIT"
+    start = part.start % SMALL_FILE
+    assert response.headers["content-range"] == (
+        f"bytes {start}-{start + len(expected) - 1}/{SMALL_FILE}"
+    )
+    assert response.content == expected
+    assert stack.backend_requests(url) == before
+
+
+@pytest.mark.parametrize("fixture", ["small_file", "large_file"])
+def test_unsatisfiable_range(anon_client, request, fixture: str):
+    url, data = request.getfixturevalue(fixture)
+
+    response = anon_client.get(url, headers={"Range": f"bytes={len(data)}-"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(data)}"
+
+
+def test_large_file_memory(anon_client, large_file, stack):
+    if stack.name != "local":
+        pytest.skip("Traces the local edge's allocations, use docker stats")
+    url, data = large_file
+    download(anon_client, url)
+    used = {node.name: node.cache.storages["blob"].used for node in stack.active_nodes}
+
+    tracemalloc.start()
+    try:
+        response, digest, *_ = download(anon_client, url)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert digest == hashlib.sha256(data).hexdigest()
+    # Origin, edge and client hold a few chunks at a time, never the file
+    assert peak < LARGE_FILE / 8
+    assert {
+        node.name: node.cache.storages["blob"].used for node in stack.active_nodes
+    } == used
@@ -0,0 +1,175 @@
+# Standard Library
+import asyncio
+from collections import Counter
+
+# HTTP Library
+import httpx
+
+# pytest
+import pytest
+
+# Volto
+from exporter.service import Exporter
+from exporter.service import LogParser
+from exporter.service import Metrics
+from tests.conftest import REPO_DIR
+
+
+VARNISHNCSA_LOG = REPO_DIR / "tests/data/varnishncsa.log"
+VARNISHLOG_LOG = REPO_DIR / "tests/data/varnishlog.log"
+
+URLS = [
+    ("express", "/page"),
+    ("api", "/++api++/page"),
+    ("blob", "/page/logo-260x260.png/@@images/image/icon"),
+]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def caching(auth_client):
+    # Enable caching, disable purge
+    url = "/++api++/@registry"
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": True,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+    yield "Enabled"
+    # Disable caching, disable purge
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": False,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+
+
+def parse(path):
+    parser = LogParser()
+    with open(path) as fp:
+        return [record for record in map(parser.feed, fp) if record is not None]
+
+
+def test_varnishncsa_fixture():
+    records = parse(VARNISHNCSA_LOG)
+
+    # Requests without the VCL_Log record are skipped
+    assert len(records) == 12
+    handling = Counter((record.reqtype, record.handling) for record in records)
+    assert handling == {
+        ("express", "miss"): 1,
+        ("express", "hit"): 2,
+        ("express", "synth"): 1,
+        ("api", "miss"): 1,
+        ("api", "hit"): 2,
+        ("api", "synth"): 1,
+        ("blob", "miss"): 1,
+        ("blob", "hit"): 1,
+        ("auth", "pass"): 2,
+    }
+    miss = records[0]
+    assert (miss.status, miss.ttl, miss.backend_time) == (200, 30.0, 0.412)
+    assert miss.duration == pytest.approx(0.41523)
+    # Hits and synthetic responses have no backend time
+    assert records[1].backend_time is None
+    assert records[10].ttl is None
+
+
+def test_varnishlog_fixture():
+    records = parse(VARNISHLOG_LOG)
+
+    # The nested backend transaction and the session are skipped
+    assert [(record.reqtype, record.handling) for record in records] == [
+        ("express", "miss"),
+        ("api", "hit"),
+        ("auth", "pass"),
+        ("express", "synth"),
+    ]
+    # Durations come from the Timestamp Resp records
+    assert records[0].duration == pytest.approx(0.41523)
+    assert records[1].duration == pytest.approx(0.00014)
+    assert records[3].duration is None
+
+
+def test_render_metrics():
+    metrics = Metrics()
+    for record in parse(VARNISHNCSA_LOG):
+        metrics.observe(record)
+
+    body = metrics.render()
+    assert 'varnish_edge_requests_total{reqtype="express",handling="hit"} 2' in body
+    assert 'varnish_edge_responses_total{reqtype="auth",status="401"} 1' in body
+    # Histograms are cumulative, +Inf holds every observation
+    assert (
+        'varnish_edge_ttl_seconds_bucket{reqtype="api",handling="hit",le="0.0"} 1'
+        in body
+    )
+    assert (
+        'varnish_edge_ttl_seconds_bucket{reqtype="api",handling="hit",le="+Inf"} 2'
+        in body
+    )
+    assert (
+        'varnish_edge_backend_seconds_count{reqtype="auth",handling="pass"} 2' in body
+    )
+    assert (
+        'varnish_edge_backend_seconds_count{reqtype="api",handling="hit"}' not in body
+    )
+    assert metrics.hit_ratio("express") == 0.5
+    assert metrics.hit_ratio("auth") == 0.0
+
+
+def test_exporter_follows_command():
+    async def scrape():
+        exporter = Exporter(command=["cat", str(VARNISHLOG_LOG)], restart_delay=60)
+        await exporter.start()
+        try:
+            while not exporter.stats["restarts"]:
+                await asyncio.sleep(0.01)
+            async with httpx.AsyncClient(base_url=exporter.url) as client:
+                return await client.get("/metrics")
+        finally:
+            await exporter.close()
+
+    response = asyncio.run(scrape())
+
+    assert response.status_code == 200
+    assert "varnish_edge_exporter_records_total 4" in response.text
+    assert (
+        'varnish_edge_requests_total{reqtype="api",handling="hit"} 1' in response.text
+    )
+
+
+def test_vcl_logs_every_request(varnish_client, stack, purge_url):
+    if stack.name != "local":
+        pytest.skip("Reads the local node's log, use varnishncsa with docker")
+    node = stack.nodes[0]
+    for _, url in URLS:
+        purge_url(url)
+    node.vsl.clear()
+
+    expected = Counter()
+    for reqtype, url in URLS:
+        for _ in range(2):
+            response = varnish_client.get(url, headers={"x-varnish-debug": "1"})
+            assert response.status_code == 200
+            handling = "hit" if response.headers["x-cache"] == "HIT" else "miss"
+            expected[(reqtype, handling)] += 1
+        assert "x-backend-time" not in response.headers
+    response = varnish_client.get("/page", headers={"Authorization": "Bearer x"})
+    expected[("auth", "pass")] += 1
+
+    exporter = Exporter(command=None)
+    for line in node.vsl:
+        # What varnishncsa prints for %{VCL_Log:edge}x
+        exporter.feed(line.partition(":")[2])
+    assert exporter.metrics.requests == expected
+    for reqtype, _ in URLS:
+        assert exporter.metrics.hit_ratio(reqtype) == 0.5
+        assert exporter.metrics.backend_time[(reqtype, "miss")].count == 1
+        assert (reqtype, "hit") not in exporter.metrics.backend_time
+        assert exporter.metrics.ttl[(reqtype, "hit")].count == 1
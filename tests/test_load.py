@@ -0,0 +1,160 @@
+# Standard Library
+import asyncio
+import json
+
+# pytest
+import pytest
+
+# Volto
+from benchmarks.__main__ import main
+from benchmarks.__main__ import parse_args
+from benchmarks.load import SCALES
+from benchmarks.load import LoadGenerator
+from benchmarks.load import build_scenarios
+from benchmarks.load import compare
+from benchmarks.load import load_content
+from benchmarks.load import login
+
+
+@pytest.fixture(scope="module", autouse=True)
+def caching(auth_client):
+    # Enable caching, disable purge
+    url = "/++api++/@registry"
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": True,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+    yield "Enabled"
+    # Disable caching, disable purge
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": False,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+
+
+@pytest.fixture(scope="module")
+def token(stack) -> str:
+    return asyncio.run(login(stack.base_url, "admin", "admin", stack.host))
+
+
+def generator(stack, token=None, **kwargs) -> LoadGenerator:
+    # The local stack only speaks HTTP/1.1
+    return LoadGenerator(
+        stack.base_url,
+        build_scenarios(load_content(), token),
+        host=stack.host,
+        http2=stack.name != "local",
+        **kwargs,
+    )
+
+
+def test_scenarios_follow_content(init_data):
+    scenarios = {
+        scenario.name: scenario for scenario in build_scenarios(load_content())
+    }
+
+    assert set(scenarios) == {"pages", "api", "images"}
+    for url, *_ in init_data:
+        path = url[len("/++api++") :]
+        if path.endswith(".png"):
+            assert f"{path}/@@images/image/thumb" in scenarios["images"].urls
+        else:
+            assert path in scenarios["pages"].urls
+            assert url in scenarios["api"].urls
+    assert len(scenarios["images"].urls) == len(SCALES)
+
+
+def test_editor_scenario_needs_a_token():
+    scenarios = build_scenarios(load_content(), token="secret")
+
+    editor = [scenario for scenario in scenarios if scenario.name == "editor"]
+    assert editor
+    assert editor[0].headers["Authorization"] == "Bearer secret"
+
+
+def test_load_is_reported_per_reqtype(stack, token):
+    report = asyncio.run(generator(stack, token, concurrency=8, requests=300).run())
+
+    reqtypes = report["reqtypes"]
+    assert set(reqtypes) == {"express", "api", "blob", "auth"}
+    assert sum(stats["requests"] for stats in reqtypes.values()) == 300
+    assert report["total"]["error_rate"] == 0
+    for reqtype in ("express", "api", "blob"):
+        assert reqtypes[reqtype]["hit_ratio"] > 0.5
+        assert reqtypes[reqtype]["rps"] > 0
+        assert set(reqtypes[reqtype]["latency_ms"]) >= {"p50", "p95", "p99"}
+    # Editors are always passed to the backend
+    assert reqtypes["auth"]["hit_ratio"] == 0
+
+
+def test_duration_stops_the_run(stack):
+    report = asyncio.run(generator(stack, concurrency=4, duration=0.5).run())
+
+    assert report["duration"] < 1.5
+    assert report["total"]["requests"] > 0
+
+
+def test_cli_writes_json_and_compares(stack, tmp_path):
+    output = tmp_path / "results.json"
+    args = parse_args(
+        [
+            "--url",
+            stack.base_url,
+            "--requests",
+            "50",
+            "--concurrency",
+            "4",
+            "--http1",
+            "--editor",
+            "admin:admin",
+            "--output",
+            str(output),
+        ]
+    )
+    results = asyncio.run(main(args))
+    output.write_text(json.dumps(results))
+
+    args.baseline = output
+    again = asyncio.run(main(args))
+    assert set(again["baseline"]) == set(results["reqtypes"]) | {"total"}
+    assert again["baseline"]["total"]["error_rate"] == 0
+
+
+def test_compare():
+    def run(rps, p95, hit_ratio):
+        stats = {
+            "rps": rps,
+            "latency_ms": {"p95": p95},
+            "hit_ratio": hit_ratio,
+            "error_rate": 0.0,
+        }
+        return {"reqtypes": {"api": stats}, "total": stats}
+
+    result = compare(run(100.0, 10.0, 0.5), run(150.0, 5.0, 0.75))
+
+    assert result["api"] == {
+        "rps": 0.5,
+        "p95": -0.5,
+        "hit_ratio": 0.25,
+        "error_rate": 0.0,
+    }
+
+
+@pytest.mark.benchmark
+def test_load(stack, token, benchmark_report, request):
+    """RPS, latency, hit ratio and errors per reqtype under concurrent load."""
+    views = request.config.getoption("benchmark_views")
+    report = asyncio.run(
+        generator(stack, token, concurrency=32, requests=views * 10).run()
+    )
+
+    benchmark_report["load"] = {"stack": stack.name, **report}
+    assert report["total"]["error_rate"] == 0
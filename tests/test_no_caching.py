@@ -1,17 +1,12 @@
-# Standard Library
-from time import sleep
-
 # pytest
 import pytest
 
 
 @pytest.fixture(scope="module", autouse=True)
 def purge_varnish(varnish_client):
-    sleep(0.5)
     response = varnish_client.request(
         method="BAN", url="/", headers={"x-invalidate-pattern": "obj.status != 0"}
     )
-    sleep(0.5)
     yield response.status_code
 
 
@@ -0,0 +1,344 @@
+# Standard Library
+from time import monotonic
+
+# pytest
+import pytest
+
+# Volto
+from benchmarks.load import percentiles
+from edge import vcl
+from edge.vcl import PROBE_THRESHOLD
+from edge.vcl import PROBE_TIMEOUT
+from edge.vcl import PROBE_WINDOW
+from tests.helpers import PURGE_TIMEOUT
+from tests.helpers import wait_for
+
+
+DEBUG = {"x-varnish-debug": "1"}
+
+URLS = [
+    ("express", "/page"),
+    ("api", "/++api++/page"),
+    ("blob", "/page/logo-260x260.png/@@images/image/icon"),
+]
+
+# Origin delay while Plone hangs, probes time out well before it
+SLOW_ORIGIN = 1.0
+SLOW_PROBE_TIMEOUT = 0.1
+
+
+@pytest.fixture(scope="module", autouse=True)
+def caching(auth_client):
+    # Enable caching, disable purge
+    url = "/++api++/@registry"
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": True,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+    yield "Enabled"
+    # Disable caching, disable purge
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": False,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+
+
+@pytest.fixture(scope="module")
+def node(stack):
+    if stack.name != "local":
+        pytest.skip("Outages are simulated with the local stack's origin")
+    return stack.nodes[0]
+
+
+def poll_until(stack, node, healthy: bool) -> int:
+    """Run probe polls until the backend is healthy or sick, return the count."""
+    polls = 0
+    while node.healthy != healthy and polls < PROBE_WINDOW:
+        stack.call(node.poll())
+        polls += 1
+    assert node.healthy == healthy
+    return polls
+
+
+def settle(node):
+    """Wait for the background fetches stale hits started."""
+    wait_for(lambda: not node.cache.busy, PURGE_TIMEOUT, "background fetches")
+
+
+@pytest.fixture
+def origin(stack, node):
+    """The origin, back to fast and healthy after the test."""
+    yield stack.origin
+    settle(node)
+    stack.origin.error = None
+    stack.origin.delay = 0.0
+    stack.origin.volto_delay = 0.0
+    node.probe_timeout = PROBE_TIMEOUT
+    poll_until(stack, node, healthy=True)
+
+
+@pytest.fixture
+def travel(node):
+    """Move the node's clock forward, as if the outage lasted that long."""
+    offset = 0.0
+
+    def inner(seconds: float):
+        nonlocal offset
+        offset += seconds
+        node.cache.clock = lambda: monotonic() + offset
+
+    yield inner
+    settle(node)
+    # Objects stored in the future would outlive the test
+    node.reset()
+
+
+def past_grace(response) -> float:
+    """Seconds until the object is past its TTL and grace."""
+    ttl = float(response.headers["x-varnish-ttl"])
+    grace = float(response.headers["x-varnish-grace"])
+    return ttl + grace + 1
+
+
+def cache(varnish_client, purge_url, url: str):
+    purge_url(url)
+    response = varnish_client.get(url, headers=DEBUG)
+    assert response.status_code == 200
+    assert response.headers.get("x-cache") == "MISS"
+    return response
+
+
+def test_probe_marks_backend_sick_and_healthy(stack, node, origin):
+    origin.error = 503
+    # Threshold good polls out of the window, the initial ones included
+    assert poll_until(stack, node, healthy=False) == PROBE_WINDOW - PROBE_THRESHOLD + 1
+
+    origin.error = None
+    assert poll_until(stack, node, healthy=True) == PROBE_THRESHOLD
+
+
+@pytest.mark.parametrize("reqtype,url", URLS)
+def test_stale_is_served_while_backend_is_sick(
+    varnish_client, stack, node, origin, travel, purge_url, reqtype, url
+):
+    cached = cache(varnish_client, purge_url, url)
+    travel(past_grace(cached))
+    origin.error = 503
+    poll_until(stack, node, healthy=False)
+    before = stack.backend_requests(url)
+
+    response = varnish_client.get(url, headers=DEBUG)
+    assert response.status_code == 200
+    assert response.headers.get("x-cache") == "HIT"
+    assert response.headers.get("x-varnish-stale") == "1"
+    assert response.content == cached.content
+    # A sick backend gets no fetches at all
+    assert stack.backend_requests(url) == before
+
+
+@pytest.mark.parametrize("reqtype,url", URLS)
+def test_fresh_copy_past_grace(
+    varnish_client, stack, origin, travel, purge_url, reqtype, url
+):
+    cached = cache(varnish_client, purge_url, url)
+    travel(past_grace(cached))
+    before = stack.backend_requests(url)
+
+    # A healthy backend replaces the object before delivery
+    response = varnish_client.get(url, headers=DEBUG)
+    assert response.status_code == 200
+    assert response.headers.get("x-cache") == "MISS"
+    assert "x-varnish-stale" not in response.headers
+    assert stack.backend_requests(url) == before + 1
+
+
+@pytest.mark.parametrize("status", [500, 502, 503])
+@pytest.mark.parametrize("reqtype,url", URLS)
+def test_stale_if_error(
+    varnish_client, stack, node, origin, travel, purge_url, reqtype, url, status
+):
+    cached = cache(varnish_client, purge_url, url)
+    travel(past_grace(cached))
+    origin.error = status
+    before = stack.backend_requests(url)
+
+    # The probe has not noticed yet, the fetch fails and the object is kept
+    response = varnish_client.get(url, headers=DEBUG)
+    assert response.status_code == 200
+    assert response.headers.get("x-varnish-stale") == "1"
+    assert response.content == cached.content
+    # The failed fetch, then the background fetch the stale hit started
+    settle(node)
+    assert stack.backend_requests(url) == before + 2
+
+
+def test_errors_are_not_cached(varnish_client, stack, origin, purge_url):
+    url = "/page"
+    purge_url(url)
+    origin.error = 503
+
+    response = varnish_client.get(url, headers=DEBUG)
+    assert response.status_code == 503
+
+    origin.error = None
+    response = varnish_client.get(url, headers=DEBUG)
+    assert response.status_code == 200
+    assert response.headers.get("x-cache") == "MISS"
+
+
+@pytest.mark.parametrize("status", [500, 502, 503])
+def test_uncached_url_gets_backend_error(
+    varnish_client, stack, origin, purge_url, status
+):
+    url = "/page?b_start=10"
+    purge_url(url)
+    origin.error = status
+    before = stack.backend_requests(url)
+
+    response = varnish_client.get(url, headers=DEBUG)
+
+    # Plone's own error, fetched once and not stored
+    assert response.status_code == status
+    assert response.content == b"Service Unavailable"
+    assert response.headers["x-varnish-action"] == "FETCH (pass - backend error)"
+    assert "x-varnish-stale" not in response.headers
+    assert stack.backend_requests(url) == before + 1
+
+    origin.error = None
+    response = varnish_client.get(url, headers=DEBUG)
+    assert response.status_code == 200
+    assert stack.backend_requests(url) == before + 2
+
+
+def test_uncached_url_fails_fast(varnish_client, stack, node, origin, purge_url):
+    url = "/page?b_start=20"
+    purge_url(url)
+    origin.delay = SLOW_ORIGIN
+    node.probe_timeout = SLOW_PROBE_TIMEOUT
+    poll_until(stack, node, healthy=False)
+    before = stack.backend_requests(url)
+
+    start = monotonic()
+    response = varnish_client.get(url, headers=DEBUG)
+    elapsed = monotonic() - start
+    assert response.status_code == 503
+    assert elapsed < SLOW_ORIGIN
+    assert stack.backend_requests(url) == before
+
+
+def test_volto_stall_serves_stale_pages(
+    varnish_client, stack, node, origin, travel, purge_url
+):
+    page, api = "/page", "/++api++/page"
+    cached = [cache(varnish_client, purge_url, url) for url in (page, api)]
+    travel(max(past_grace(response) for response in cached))
+    # Volto hangs, Plone answers
+    origin.volto_delay = SLOW_ORIGIN
+    node.probe_timeout = SLOW_PROBE_TIMEOUT
+    poll_until(stack, node, healthy=False)
+    assert node.backend_healthy("volto") is False
+    assert node.backend_healthy("plone") is True
+
+    start = monotonic()
+    response = varnish_client.get(page, headers=DEBUG)
+    assert monotonic() - start < SLOW_ORIGIN
+    assert response.status_code == 200
+    assert response.headers.get("x-varnish-stale") == "1"
+
+    # API reads do not depend on Volto
+    response = varnish_client.get(api, headers=DEBUG)
+    assert response.status_code == 200
+    assert "x-varnish-stale" not in response.headers
+    assert response.headers.get("x-cache") == "MISS"
+
+
+def test_volto_stall_is_cut_off(
+    varnish_client, stack, node, origin, purge_url, monkeypatch
+):
+    url = "/page?b_start=30"
+    purge_url(url)
+    monkeypatch.setattr(vcl, "EXPRESS_FIRST_BYTE_TIMEOUT", SLOW_PROBE_TIMEOUT)
+    # Before the probe notices
+    origin.volto_delay = SLOW_ORIGIN
+    assert node.healthy is True
+    failed = node.stats["backend_fail"]
+
+    start = monotonic()
+    response = varnish_client.get(url, headers=DEBUG)
+    assert monotonic() - start < SLOW_ORIGIN
+    assert response.status_code == 503
+    assert node.stats["backend_fail"] == failed + 1
+
+    # Plone's reads keep the full first_byte_timeout
+    origin.volto_delay = 0.0
+    origin.delay = SLOW_PROBE_TIMEOUT * 2
+    assert varnish_client.get("/++api++/page", headers=DEBUG).status_code == 200
+
+
+def outage_latencies(varnish_client, stack, node, origin, travel, purge_url, rounds):
+    """Client latencies for URLS past their grace, slow origin then hung origin."""
+    cached = [cache(varnish_client, purge_url, url) for _, url in URLS]
+    travel(max(past_grace(response) for response in cached))
+    origin.delay = SLOW_ORIGIN
+    slow = []
+    for _, url in URLS:
+        # Healthy but slow: the client waits for the refetch, as every
+        # client did before stale-if-error
+        start = monotonic()
+        assert varnish_client.get(url, headers=DEBUG).status_code == 200
+        slow.append(monotonic() - start)
+    travel(max(past_grace(response) for response in cached))
+    node.probe_timeout = SLOW_PROBE_TIMEOUT
+    poll_until(stack, node, healthy=False)
+    sick = []
+    for _ in range(rounds):
+        for _, url in URLS:
+            start = monotonic()
+            response = varnish_client.get(url, headers=DEBUG)
+            sick.append(monotonic() - start)
+            assert response.status_code == 200
+            assert response.headers.get("x-varnish-stale") == "1"
+    return slow, sick
+
+
+def test_latency_during_outage(varnish_client, stack, node, origin, travel, purge_url):
+    slow, sick = outage_latencies(
+        varnish_client, stack, node, origin, travel, purge_url, rounds=5
+    )
+
+    assert min(slow) >= SLOW_ORIGIN
+    assert max(sick) < SLOW_ORIGIN
+
+
+@pytest.mark.benchmark
+def test_outage_latency(
+    varnish_client,
+    stack,
+    node,
+    origin,
+    travel,
+    purge_url,
+    benchmark_report,
+    request,
+):
+    """Client latency for cached URLs while the origin hangs."""
+    rounds = request.config.getoption("benchmark_views")
+    slow, sick = outage_latencies(
+        varnish_client, stack, node, origin, travel, purge_url, rounds
+    )
+
+    benchmark_report["outage"] = {
+        "stack": stack.name,
+        "origin_delay": SLOW_ORIGIN,
+        "waiting_for_origin_ms": percentiles(slow),
+        "stale_if_error_ms": percentiles(sick),
+    }
+    assert max(sick) < SLOW_ORIGIN
@@ -0,0 +1,132 @@
+# Standard Library
+import base64
+import re
+from typing import List
+
+# pytest
+import pytest
+
+# Volto
+from tests.helpers import is_cache_hit
+
+
+STATIC_ASSET = re.compile(r'(?:src|href)="(/static/[^"]+)"')
+
+SCALES = [
+    "/page/logo-260x260.png/@@images/image/thumb",
+    "/page/logo-260x260.png/@@download/image",
+]
+
+# Rendered or answered per user, never shared
+CONTENT = ["/page", "/++api++/page", "/++api++/@navigation"]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def caching(auth_client):
+    # Enable caching, disable purge
+    url = "/++api++/@registry"
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": True,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+    yield "Enabled"
+    # Disable caching, disable purge
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": False,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+
+
+@pytest.fixture(scope="module")
+def static_assets(anon_client) -> List[str]:
+    """The bundles Volto's pages link to."""
+    assets = STATIC_ASSET.findall(anon_client.get("/page").text)
+    assert assets
+    return assets
+
+
+def test_static_assets_are_cached_for_editors(auth_client, purge_url, static_assets):
+    for url in static_assets:
+        purge_url(url)
+
+        response = auth_client.get(url)
+        assert response.status_code == 200
+        assert response.headers["x-auth"] == "Anon"
+        assert is_cache_hit(response.headers) is False
+
+        response = auth_client.get(url)
+        assert response.status_code == 200
+        assert is_cache_hit(response.headers) is True
+
+
+@pytest.mark.parametrize("url", SCALES)
+def test_public_blobs_are_shared_with_editors(
+    anon_client, auth_client, purge_url, stack, url: str
+):
+    purge_url(url)
+    response = anon_client.get(url)
+    assert response.status_code == 200
+    before = stack.backend_requests(url)
+
+    response = auth_client.get(url)
+
+    assert response.status_code == 200
+    assert is_cache_hit(response.headers) is True
+    assert response.headers["x-varnish-reqtype"] == "blob"
+    assert stack.backend_requests(url) == before
+
+
+@pytest.mark.parametrize("url", CONTENT)
+def test_content_is_passed_for_editors(auth_client, url: str):
+    for _ in range(2):
+        response = auth_client.get(url)
+        assert response.status_code == 200
+        assert response.headers["x-auth"] == "Logged-in"
+        assert response.headers["x-varnish-reqtype"] == "auth"
+        assert is_cache_hit(response.headers) is False
+
+
+@pytest.fixture
+def private_image(auth_root_client, anon_client, stack):
+    """A private document with a lead image only editors may see."""
+    if stack.name != "local":
+        pytest.skip("Lead images on documents are set up on the local origin")
+    response = auth_root_client.get("/page/logo-260x260.png/@@download/image")
+    response = auth_root_client.post(
+        "/++api++/page",
+        json={
+            "@type": "Document",
+            "id": "draft",
+            "title": "Draft",
+            "image": {
+                "data": base64.b64encode(response.content).decode(),
+                "encoding": "base64",
+                "filename": "draft.png",
+                "content-type": "image/png",
+            },
+        },
+    )
+    assert response.status_code == 201
+    yield "/page/draft/@@images/image/thumb"
+    auth_root_client.delete("/++api++/page/draft")
+
+
+def test_private_blobs_are_passed_for_editors(anon_client, auth_client, private_image):
+    assert anon_client.get(private_image).status_code == 404
+
+    for _ in range(2):
+        response = auth_client.get(private_image)
+        assert response.status_code == 200
+        assert response.headers["x-auth"] == "Logged-in"
+        assert is_cache_hit(response.headers) is False
+
+    # The editor's copy was never shared
+    assert anon_client.get(private_image).status_code == 404
@@ -1,14 +1,20 @@
 # Standard Library
+import re
+import threading
 from datetime import datetime
-from time import sleep
+
+# HTTP Library
+import httpx
 
 # pytest
 import pytest
 
-
-def is_cache_hit(headers: dict) -> bool:
-    """Validate if we have a hit in Varnish."""
-    return headers.get("x-cache") == "HIT"
+# Volto
+from tests.helpers import PURGE_TIMEOUT
+from tests.helpers import is_cache_hit
+from tests.helpers import is_stale
+from tests.helpers import wait_for
+from tests.helpers import wait_for_purge
 
 
 @pytest.fixture(scope="module", autouse=True)
@@ -61,7 +67,6 @@ def test_manual_purge_works(anon_client, purge_url):
 
     # Purge URL
     assert purge_url(url) is True
-    sleep(0.5)
 
     headers = anon_client.get(url).headers
     assert is_cache_hit(headers) is False
@@ -91,17 +96,147 @@ def test_auto_purge_document(anon_client, auth_client, purge_url):
         json={"title": f"New Page Document {now}"},
     )
     assert response.status_code == 204
-    sleep(1.0)
 
     # Volto should be purged
-    url = base_url
-    headers = anon_client.get(url).headers
-    assert is_cache_hit(headers) is False
+    wait_for_purge([anon_client], base_url)
 
     # RestAPI should be purged
-    url = f"/++api++{base_url}"
+    wait_for_purge([anon_client], f"/++api++{base_url}")
+
+
+def object_xid(headers: dict) -> str:
+    """XID of the fetch that stored the object Varnish delivered."""
+    return headers["x-varnish"].split()[-1]
+
+
+@pytest.fixture
+def refresh_page(stack):
+    # docker-compose.yml sets PURGER_REFRESH for /page
+    if stack.name != "local":
+        yield
+        return
+    stack.purger.refresh = [re.compile(r"^(/\+\+api\+\+)?/page$")]
+    yield
+    stack.purger.refresh = []
+
+
+def test_refresh_purge(anon_client, varnish_client, purge_url):
+    url = "/page"
+    purge_url(url)
+    anon_client.get(url)
+    old = object_xid(anon_client.get(url).headers)
+
+    response = varnish_client.request(
+        "PURGE", url, headers={"X-Purge-Refresh": "1", "Accept": "text/html"}
+    )
+    assert response.status_code == 200
+    assert response.reason_phrase == "Refreshed."
+
+    # The first request after the refresh hits the new object
     headers = anon_client.get(url).headers
-    assert is_cache_hit(headers) is False
+    assert is_cache_hit(headers) is True
+    assert is_stale(headers) is False
+    assert object_xid(headers) != old
+
+
+def test_auto_purge_document_refreshes_in_place(
+    anon_client, auth_client, purge_url, stack, refresh_page
+):
+    prefixes = ("", "/++api++")
+    # Document
+    base_url = "/page"
+    urls = [f"{prefix}{base_url}" for prefix in prefixes]
+
+    for url in urls:
+        # First cleanup
+        purge_url(url)
+        # Populate cache with Volto rendered page and restapi cache
+        anon_client.get(url)
+
+        # Check url is in cache
+        headers = anon_client.get(url).headers
+        assert is_cache_hit(headers) is True
+    before = {url: stack.backend_requests(url) for url in urls}
+
+    # Anonymous visitors keep reading while the page is edited
+    responses = {url: [] for url in urls}
+    stop = threading.Event()
+
+    def read(url: str):
+        with httpx.Client(
+            base_url=stack.base_url, headers=anon_client.headers
+        ) as client:
+            while not stop.is_set():
+                responses[url].append(client.get(url))
+
+    readers = [
+        threading.Thread(target=read, args=(url,)) for url in urls for _ in range(4)
+    ]
+    for reader in readers:
+        reader.start()
+    try:
+        wait_for(
+            lambda: all(len(responses[url]) >= 4 for url in urls),
+            PURGE_TIMEOUT,
+            "Readers started",
+        )
+        # Edit page, should trigger refreshes
+        title = f"Refreshed Page Document {datetime.utcnow()}"
+        response = auth_client.patch(
+            f"/++api++{base_url}",
+            headers={"Accept": "application/json", "Content-Type": "application/json"},
+            json={"title": title},
+        )
+        assert response.status_code == 204
+
+        wait_for(
+            lambda: all(
+                responses[url] and title in responses[url][-1].text for url in urls
+            ),
+            PURGE_TIMEOUT,
+            f"Refresh of {', '.join(urls)}",
+        )
+    finally:
+        stop.set()
+        for reader in readers:
+            reader.join()
+
+    for url in urls:
+        # Only fresh hits, on the old object and then the new one
+        assert all(is_cache_hit(response.headers) for response in responses[url])
+        assert not any(is_stale(response.headers) for response in responses[url])
+        assert len({object_xid(response.headers) for response in responses[url]}) == 2
+        # One fetch replaced the object, besides the edit itself
+        edits = 1 if url.startswith("/++api++") else 0
+        assert stack.backend_requests(url) - before[url] - edits == 1
+
+
+def test_refresh_purge_replaces_other_variants(
+    anon_client, auth_client, purge_url, refresh_page
+):
+    url = "/page"
+    # curl, bots and feed readers
+    other = {"Accept": "*/*"}
+    purge_url(url)
+    anon_client.get(url)
+    anon_client.get(url, headers=other)
+    assert is_cache_hit(anon_client.get(url, headers=other).headers) is True
+
+    title = f"Refreshed Page Document {datetime.utcnow()}"
+    response = auth_client.patch(
+        f"/++api++{url}",
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={"title": title},
+    )
+    assert response.status_code == 204
+
+    # Only the browser variant is refetched, the others are banned
+    wait_for(
+        lambda: title in anon_client.get(url, headers=other).text,
+        PURGE_TIMEOUT,
+        f"Accept: */* variant of {url}",
+    )
+    assert title in anon_client.get(url).text
 
 
 def test_auto_purge_image(anon_client, auth_client, purge_url):
@@ -123,8 +258,5 @@ def test_auto_purge_image(anon_client, auth_client, purge_url):
         json={"title": f"New Page Document {now}"},
     )
     assert response.status_code == 204
-    # Sleep a bit longer to allow purger to propagate
-    sleep(3.0)
-
-    headers = anon_client.get(url).headers
-    assert is_cache_hit(headers) is False
+    # Wait for the purger to propagate
+    wait_for_purge([anon_client], url)
@@ -0,0 +1,99 @@
+# Standard Library
+from datetime import datetime
+from urllib.parse import urlparse
+
+# pytest
+import pytest
+
+# Volto
+from tests.helpers import is_cache_hit
+
+
+SCALES = (
+    "huge",
+    "great",
+    "larger",
+    "large",
+    "teaser",
+    "preview",
+    "mini",
+    "thumb",
+    "tile",
+    "icon",
+    "listing",
+)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def caching(auth_client):
+    # Enable caching, leave purging off so edits alone do not invalidate
+    url = "/++api++/@registry"
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": True,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+    yield "Enabled"
+    # Disable caching
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={"plone.caching.interfaces.ICacheSettings.enabled": False},
+    )
+
+
+def image_urls(anon_client, base_url: str) -> list:
+    """Volto page, API response, named and hashed scales of an image."""
+    urls = [base_url, f"{base_url}/view", f"/++api++{base_url}"]
+    urls.append(f"{base_url}/@@images/image")
+    urls.extend(f"{base_url}/@@images/image/{scale}" for scale in SCALES)
+    urls.append(f"{base_url}/@@download/image")
+    image = anon_client.get(f"/++api++{base_url}").json()["image"]
+    urls.extend(urlparse(scale["download"]).path for scale in image["scales"].values())
+    return urls
+
+
+def test_purge_key_invalidates_all_scales(anon_client, auth_client, purge_key):
+    base_url = "/page/logo-260x260.png"
+    urls = image_urls(anon_client, base_url)
+
+    # Populate cache
+    for url in urls:
+        anon_client.get(url)
+        assert is_cache_hit(anon_client.get(url).headers) is True, url
+
+    # Edit image, nothing is purged yet
+    now = datetime.utcnow()
+    response = auth_client.patch(
+        f"/++api++{base_url}",
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={"title": f"New Image {now}"},
+    )
+    assert response.status_code == 204
+    for url in urls:
+        assert is_cache_hit(anon_client.get(url).headers) is True, url
+
+    # One purge for the content key
+    assert purge_key(base_url) is True
+
+    for url in urls:
+        assert is_cache_hit(anon_client.get(url).headers) is False, url
+
+
+def test_purge_key_spares_other_content(anon_client, purge_key):
+    image_url = "/page/logo-260x260.png/@@images/image/icon"
+    page_urls = ["/page", "/++api++/page"]
+
+    # Populate cache
+    for url in [image_url, *page_urls]:
+        anon_client.get(url)
+        assert is_cache_hit(anon_client.get(url).headers) is True, url
+
+    # Purging the image leaves its parent page cached
+    assert purge_key("/page/logo-260x260.png") is True
+    assert is_cache_hit(anon_client.get(image_url).headers) is False
+    for url in page_urls:
+        assert is_cache_hit(anon_client.get(url).headers) is True, url
@@ -0,0 +1,125 @@
+# Standard Library
+from datetime import datetime
+from time import monotonic
+
+# HTTP Library
+import httpx
+
+# pytest
+import pytest
+
+# Volto
+from benchmarks.load import percentiles
+from tests.helpers import is_cache_hit
+from tests.helpers import wait_for_purges
+
+
+pytestmark = pytest.mark.benchmark
+
+# Poll often enough to resolve latencies in the tens of milliseconds
+POLL_INTERVAL = 0.02
+
+
+@pytest.fixture(scope="module", autouse=True)
+def caching(auth_client, stack, request):
+    # Enable caching
+    url = "/++api++/@registry"
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": True,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": True,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.cachingProxies": [
+                "http://purger:80"
+            ],
+            "plone.cachepurging.interfaces.ICachePurgingSettings.domains": [],
+            "plone.cachepurging.interfaces.ICachePurgingSettings.virtualHosting": False,
+            "plone.app.caching.interfaces.IPloneCacheSettings.purgedContentTypes": [
+                "File",
+                "Folder",
+                "Image",
+                "News Item",
+                "Document",
+            ],
+        },
+    )
+    stack.scale(request.config.getoption("benchmark_instances"))
+    yield "Enabled"
+    # Disable caching, disable purge
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": False,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+    stack.scale(0)
+    stack.scale(1)
+
+
+@pytest.fixture(scope="module")
+def instance_clients(stack, request) -> list:
+    """One client per Varnish instance, bypassing the load balancer."""
+    clients = []
+    for index in range(1, request.config.getoption("benchmark_instances") + 1):
+        client = httpx.Client(
+            base_url=stack.instance_url(index),
+            headers={"Host": stack.host, "x-varnish-debug": "1"},
+        )
+        clients.append(client)
+    yield clients
+    for client in clients:
+        client.close()
+
+
+def test_purge_propagation_latency(
+    auth_client, instance_clients, benchmark_report, stack, request
+):
+    """Time from a PATCH to a MISS on every Varnish, for Volto and the API."""
+    edits = request.config.getoption("benchmark_edits")
+    base_url = "/page"
+    targets = {"volto": base_url, "api": f"/++api++{base_url}"}
+    latencies = {kind: [] for kind in targets}
+    per_instance = {
+        f"varnish-{index + 1}": {kind: [] for kind in targets}
+        for index in range(len(instance_clients))
+    }
+
+    for edit in range(edits):
+        # Populate every instance with Volto rendered page and restapi cache
+        for client in instance_clients:
+            for url in targets.values():
+                client.get(url)
+                assert is_cache_hit(client.get(url).headers) is True
+
+        start = monotonic()
+        response = auth_client.patch(
+            f"/++api++{base_url}",
+            headers={"Accept": "application/json", "Content-Type": "application/json"},
+            json={"title": f"Benchmark edit {edit} {datetime.utcnow()}"},
+        )
+        assert response.status_code == 204
+        convergences = wait_for_purges(
+            instance_clients,
+            list(targets.values()),
+            since=start,
+            maximum=POLL_INTERVAL,
+        )
+        for kind, convergence in zip(targets, convergences):
+            latencies[kind].append(convergence.elapsed)
+            for index, elapsed in enumerate(convergence.per_client):
+                per_instance[f"varnish-{index + 1}"][kind].append(elapsed)
+
+    benchmark_report["purge_propagation"] = {
+        "stack": stack.name,
+        "edits": edits,
+        "instances": len(instance_clients),
+        "unit": "ms",
+        "latency": {kind: percentiles(values) for kind, values in latencies.items()},
+        "per_instance": {
+            name: {kind: percentiles(values) for kind, values in kinds.items()}
+            for name, kinds in per_instance.items()
+        },
+    }
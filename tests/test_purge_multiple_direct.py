@@ -1,19 +1,16 @@
 # Standard Library
-import subprocess
 from datetime import datetime
-from time import sleep
 
 # pytest
 import pytest
 
-
-def is_cache_hit(headers: dict) -> bool:
-    """Validate if we have a hit in Varnish."""
-    return headers.get("x-cache") == "HIT"
+# Volto
+from tests.helpers import is_cache_hit
+from tests.helpers import wait_for_purge
 
 
 @pytest.fixture(scope="module", autouse=True)
-def multicaching(auth_client):
+def multicaching(auth_client, stack):
     # Enable caching
     url = "/++api++/@registry"
     auth_client.patch(
@@ -37,9 +34,8 @@ def multicaching(auth_client):
             "plone.cachepurging.interfaces.ICachePurgingSettings.domains": [],
         },
     )
-    # spawn second varnish container and wait a second for it to start
-    subprocess.run(["docker", "compose", "up", "--scale", "varnish=2", "-d"])
-    sleep(1.0)
+    # spawn second varnish container, returns once it answers
+    stack.scale(2)
     yield "Enabled"
     # Disable caching, disable purge
     auth_client.patch(
@@ -51,8 +47,8 @@ def multicaching(auth_client):
         },
     )
     # disable second varnish container
-    subprocess.run(["docker", "compose", "up", "--scale", "varnish=0", "-d"])
-    subprocess.run(["docker", "compose", "up", "--scale", "varnish=1", "-d"])
+    stack.scale(0)
+    stack.scale(1)
 
 
 def test_manual_purge_works(
@@ -71,7 +67,6 @@ def test_manual_purge_works(
 
     # Purge URL
     assert purge_multiple_varnish_url(url) is True
-    sleep(3.0)
 
     for varnish in varnish_multiple_clients:
         headers = varnish.get(url).headers
@@ -106,16 +101,10 @@ def test_auto_purge_document(
         json={"title": f"New Page Document {now}"},
     )
     assert response.status_code == 204
-    sleep(2.0)
 
     # To make sure content has been purged in every varnish instance we have to check varnish directly
-    for varnish_client in varnish_multiple_clients:
-        url = base_url
-        headers = varnish_client.get(url).headers
-        assert is_cache_hit(headers) is False
-        url = f"/++api++{base_url}"
-        headers = varnish_client.get(url).headers
-        assert is_cache_hit(headers) is False
+    wait_for_purge(varnish_multiple_clients, base_url)
+    wait_for_purge(varnish_multiple_clients, f"/++api++{base_url}")
 
 
 def test_auto_purge_image(
@@ -126,7 +115,6 @@ def test_auto_purge_image(
     url = f"{base_url}/@@images/image/icon"
     # Cleanup cache
     purge_multiple_varnish_url(url)
-    sleep(2.0)
     # Populate cache
     anon_client.get(url)
     anon_client.get(url)
@@ -142,8 +130,5 @@ def test_auto_purge_image(
         json={"title": f"New Page Document {now}"},
     )
     assert response.status_code == 204
-    # Sleep a bit longer to allow purger to propagate
-    sleep(3.0)
-
-    headers = anon_client.get(url).headers
-    assert is_cache_hit(headers) is False
+    # Wait for the purger to propagate to every instance
+    wait_for_purge(varnish_multiple_clients, url)
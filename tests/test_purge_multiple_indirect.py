@@ -1,7 +1,5 @@
 # Standard Library
-import subprocess
 from datetime import datetime
-from time import sleep
 
 # HTTP Library
 import httpx
@@ -9,16 +7,18 @@ import httpx
 # pytest
 import pytest
 
+# Volto
+from tests.conftest import ACCEPT
+from tests.helpers import wait_for_purge
 
-def is_cache_hit(headers: dict) -> bool:
-    """Validate if we have a hit in Varnish."""
-    return headers.get("x-cache") == "HIT"
+
+VARNISH_INSTANCES = 2
 
 
 # Since we do not have direct access to all varnish containers we have to infer
 # via multiple requests and parsing headers wether a url is cached on both varnish
 # containers
-# Varnish sets the Header x-hits as a counter how often this cached content has been 
+# Varnish sets the Header x-hits as a counter how often this cached content has been
 # accessed. On the first call to a content that has not been cached it is 0.
 # Every call to this (now cached) document will increase the counter by one.
 # If the x-hits counter did not increase by one on two successive calls to a content
@@ -40,7 +40,7 @@ def check_url_against_multiple_varnish(url: str, client: httpx.Client) -> list:
 
 
 @pytest.fixture(scope="module", autouse=True)
-def caching(auth_client):
+def caching(auth_client, stack):
     # Enable caching
     url = "/++api++/@registry"
     auth_client.patch(
@@ -64,9 +64,8 @@ def caching(auth_client):
             "plone.cachepurging.interfaces.ICachePurgingSettings.domains": [],
         },
     )
-    # spawn second varnish container and wait a second for it to start
-    subprocess.run(["docker", "compose", "up", "--scale", "varnish=2", "-d"])
-    sleep(1.0)
+    # spawn second varnish container, returns once it answers
+    stack.scale(VARNISH_INSTANCES)
     yield "Enabled"
     # Disable caching, disable purge
     auth_client.patch(
@@ -78,12 +77,26 @@ def caching(auth_client):
         },
     )
     # disable second varnish container
-    subprocess.run(["docker", "compose", "up", "--scale", "varnish=0", "-d"])
-    subprocess.run(["docker", "compose", "up", "--scale", "varnish=1", "-d"])
-    sleep(5.0)
-
-
-def test_auto_purge_document(anon_client, auth_client, purge_url):
+    stack.scale(0)
+    stack.scale(1)
+
+
+@pytest.fixture(scope="module")
+def instance_clients(stack) -> list:
+    """One client per Varnish instance, asking for anon_client's variants."""
+    clients = []
+    for index in range(1, VARNISH_INSTANCES + 1):
+        client = httpx.Client(
+            base_url=stack.instance_url(index),
+            headers={"Host": stack.host, "Accept": ACCEPT, "x-varnish-debug": "1"},
+        )
+        clients.append(client)
+    yield clients
+    for client in clients:
+        client.close()
+
+
+def test_auto_purge_document(anon_client, auth_client, instance_clients, purge_url):
     prefixes = ("", "/++api++")
     # Document
     base_url = "/page"
@@ -93,7 +106,6 @@ def test_auto_purge_document(anon_client, auth_client, purge_url):
         # First cleanup
         purge_url(url)
         purge_url(url)
-        sleep(2.0)
         # Populate cache with Volto rendered page and restapi cache
         anon_client.get(url)
         anon_client.get(url)
@@ -110,20 +122,15 @@ def test_auto_purge_document(anon_client, auth_client, purge_url):
         json={"title": f"New Page Document {now}"},
     )
     assert response.status_code == 204
-    sleep(1.0)
 
-    # Volto should be purged
-    url = base_url
-    for hit in check_url_against_multiple_varnish(url, anon_client):
-        assert hit is False
+    # Volto should be purged on every varnish instance
+    wait_for_purge(instance_clients, base_url)
 
     # RestAPI should be purged
-    url = f"/++api++{base_url}"
-    for hit in check_url_against_multiple_varnish(url, anon_client):
-        assert hit is False
+    wait_for_purge(instance_clients, f"/++api++{base_url}")
 
 
-def test_auto_purge_image(anon_client, auth_client, purge_url):
+def test_auto_purge_image(anon_client, auth_client, instance_clients, purge_url):
     # Use image
     base_url = "/page/logo-260x260.png"
     url = f"{base_url}/@@images/image/icon"
@@ -145,7 +152,5 @@ def test_auto_purge_image(anon_client, auth_client, purge_url):
         json={"title": f"New Page Document {now}"},
     )
     assert response.status_code == 204
-    # Sleep a bit longer to allow purger to propagate
-    sleep(3.0)
-    for hit in check_url_against_multiple_varnish(url, anon_client):
-        assert hit is False
+    # Wait for the purger to propagate to every instance
+    wait_for_purge(instance_clients, url)
@@ -0,0 +1,118 @@
+# Standard Library
+import re
+import socket
+
+# HTTP Library
+import httpx
+
+# pytest
+import pytest
+
+# Volto
+from tests.conftest import ACCEPT
+from tests.helpers import PURGE_TIMEOUT
+from tests.helpers import is_cache_hit
+from tests.helpers import wait_for
+from tests.helpers import wait_for_purge
+
+
+@pytest.fixture(scope="module")
+def purger(stack):
+    if stack.name != "local":
+        pytest.skip("The purger is not published by docker-compose.yml")
+    stack.scale(2)
+    yield stack.purger
+    stack.scale(1)
+
+
+@pytest.fixture(scope="module")
+def purger_client(purger) -> httpx.Client:
+    client = httpx.Client(base_url=purger.url)
+    yield client
+    client.close()
+
+
+def test_burst_is_deduplicated(purger, purger_client):
+    url = "/page/@@images/image/thumb"
+    before = purger.stats.copy()
+
+    # Plone purges the same path several times when saving an item
+    for _ in range(10):
+        response = purger_client.request("PURGE", url)
+        assert response.status_code == 200
+
+    # One delivery per Varnish instance
+    wait_for(
+        lambda: purger.stats["delivered"] - before["delivered"] == 2,
+        PURGE_TIMEOUT,
+        description=f"{url} delivered to both instances",
+    )
+    assert purger.stats["received"] - before["received"] == 10
+    assert purger.stats["deduplicated"] - before["deduplicated"] == 9
+
+
+def test_purge_reaches_every_instance(purger_client, varnish_multiple_clients):
+    url = "/page"
+
+    # Populate cache on each instance
+    for client in varnish_multiple_clients:
+        client.get(url)
+        assert is_cache_hit(client.get(url).headers) is True
+
+    purger_client.request("PURGE", url)
+    wait_for_purge(varnish_multiple_clients, url)
+
+
+def test_refresh_patterns(purger, purger_client, varnish_multiple_clients):
+    url = "/page"
+    # The browser variant, the one a refresh fetches
+    browser = {"Accept": ACCEPT}
+    old = []
+    for client in varnish_multiple_clients:
+        client.get(url, headers=browser)
+        headers = client.get(url, headers=browser).headers
+        assert is_cache_hit(headers) is True
+        old.append(headers["x-varnish"].split()[-1])
+    before = purger.stats["refreshed"]
+
+    purger.refresh = [re.compile(r"^/page$")]
+    try:
+        purger_client.request("PURGE", url)
+        # Refreshed on each instance, never purged
+        for client, xid in zip(varnish_multiple_clients, old):
+
+            def refreshed() -> bool:
+                headers = client.get(url, headers=browser).headers
+                assert is_cache_hit(headers) is True
+                return headers["x-varnish"].split()[-1] != xid
+
+            wait_for(refreshed, PURGE_TIMEOUT, f"Refresh of {url}")
+    finally:
+        purger.refresh = []
+    assert purger.stats["refreshed"] - before == 1
+
+
+def test_metrics(purger, purger_client):
+    before = purger.stats["batches"]
+    purger_client.request("PURGE", "/page")
+    wait_for(lambda: purger.stats["batches"] > before, PURGE_TIMEOUT, "batch delivered")
+
+    response = purger_client.get("/metrics")
+    assert response.status_code == 200
+    body = response.text
+    assert "purger_received_total" in body
+    for node in purger.nodes:
+        assert f'purger_node_latency_seconds_count{{node="{node}"}}' in body
+
+
+@pytest.mark.parametrize(
+    "line", [b"PURGE\r\n", b"PURGE /page HTTP/1.1 extra\r\n", b"\x16\x03\x01\r\n"]
+)
+def test_malformed_request_line(purger, purger_client, line: bytes):
+    with socket.create_connection((purger.server.host, purger.server.port), 5) as sock:
+        sock.sendall(line + b"Host: plone.localhost\r\n\r\n")
+        status = sock.makefile("rb").readline()
+    assert status.split()[1] == b"400"
+
+    # The purger still serves the next request
+    assert purger_client.get("/").status_code == 200
@@ -0,0 +1,182 @@
+# Standard Library
+import random
+from collections import Counter
+from typing import List
+
+# pytest
+import pytest
+
+
+DEBUG = {"x-varnish-debug": "1"}
+
+PAGES = ["/page", "/++api++/page", "/", "/++api++/@navigation"]
+# Query strings as they arrive from newsletters, social networks and ads,
+# next to the ones Volto sends for listings
+QUERIES = [
+    "",
+    "",
+    "",
+    "?utm_source=newsletter&utm_medium=email&utm_campaign=spring",
+    "?utm_campaign=spring&utm_medium=email&utm_source=newsletter",
+    "?fbclid=IwAR2xQk9",
+    "?fbclid=IwAR0aBv7",
+    "?gclid=Cj0KCQjw&utm_source=google",
+    "?msclkid=5f3e&utm_source=bing",
+    "?_ga=2.1234.5678&_gl=1*abc",
+    "?b_start=20&b_size=10",
+    "?b_size=10&b_start=20",
+    "?b_size=10&utm_source=twitter&b_start=20",
+]
+SEARCH = "/++api++/@search"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def caching(auth_client):
+    # Enable caching, disable purge
+    url = "/++api++/@registry"
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": True,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+    yield "Enabled"
+    # Disable caching, disable purge
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": False,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+
+
+@pytest.fixture
+def fresh(purge_key):
+    # Every URL below belongs to the site root or /page
+    for key in ("/", "/page"):
+        purge_key(key)
+
+
+def normalized(query: str) -> str:
+    """The query string the edge hashes and sends to the backend."""
+    if "b_size" in query:
+        return "?b_size=10&b_start=20"
+    return ""
+
+
+def url_mix(count: int, seed: int = 42) -> List[str]:
+    """A reproducible mix of landing URLs, most of them tagged."""
+    rng = random.Random(seed)
+    return [rng.choice(PAGES) + rng.choice(QUERIES) for _ in range(count)]
+
+
+def replay(client, urls: List[str]) -> Counter:
+    results = Counter()
+    for url in urls:
+        response = client.get(url, headers=DEBUG)
+        assert response.status_code == 200
+        results[response.headers.get("x-cache")] += 1
+    return results
+
+
+@pytest.mark.parametrize(
+    "first,second",
+    [
+        ("/page", "/page?utm_source=newsletter&utm_medium=email"),
+        ("/page", "/page?fbclid=IwAR2xQk9"),
+        ("/++api++/page", "/++api++/page?gclid=Cj0KCQjw&_ga=2.1234.5678"),
+        ("/page?b_start=20&b_size=10", "/page?b_size=10&b_start=20"),
+        ("/page?b_size=10&b_start=20", "/page?b_start=20&utm_source=x&b_size=10"),
+    ],
+)
+def test_equivalent_urls_share_one_object(varnish_client, fresh, first, second):
+    response = varnish_client.get(first, headers=DEBUG)
+    assert response.headers.get("x-cache") == "MISS"
+
+    response = varnish_client.get(second, headers=DEBUG)
+    assert response.status_code == 200
+    assert response.headers.get("x-cache") == "HIT"
+
+
+def test_backend_sees_normalized_url(varnish_client, stack, fresh):
+    url = "/page?b_start=20&utm_source=newsletter&b_size=10&fbclid=IwAR2xQk9"
+    before = stack.backend_requests("/page?b_size=10&b_start=20")
+
+    assert varnish_client.get(url, headers=DEBUG).status_code == 200
+    assert stack.backend_requests("/page?b_size=10&b_start=20") == before + 1
+
+
+def test_other_parameters_are_kept(varnish_client, fresh):
+    first = varnish_client.get("/page?b_start=20", headers=DEBUG)
+    second = varnish_client.get("/page?b_start=40", headers=DEBUG)
+
+    assert first.headers.get("x-cache") == "MISS"
+    assert second.headers.get("x-cache") == "MISS"
+
+
+@pytest.mark.parametrize(
+    "first,second",
+    [
+        (
+            f"{SEARCH}?SearchableText=page&portal_type=Document",
+            f"{SEARCH}?portal_type=Document&SearchableText=page",
+        ),
+        (f"{SEARCH}?SearchableText=page", f"{SEARCH}?SearchableText=page&utm_source=x"),
+    ],
+)
+def test_allowlisted_paths_keep_their_query(
+    varnish_client, stack, fresh, first, second
+):
+    before = stack.backend_requests(second)
+
+    assert varnish_client.get(first, headers=DEBUG).status_code == 200
+    response = varnish_client.get(second, headers=DEBUG)
+    assert response.status_code == 200
+    assert response.headers.get("x-cache") == "MISS"
+    assert stack.backend_requests(second) == before + 1
+
+
+def test_search_results(varnish_client, fresh):
+    response = varnish_client.get(f"{SEARCH}?portal_type=Image", headers=DEBUG)
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert items
+    assert {item["@type"] for item in items} == {"Image"}
+
+
+def test_replayed_mix_hit_ratio(varnish_client, fresh):
+    urls = url_mix(200)
+
+    results = replay(varnish_client, urls)
+
+    # One miss per distinct normalized URL, where the raw URL was hashed
+    # before and every distinct raw URL missed
+    distinct = {url.partition("?")[0] + normalized(url) for url in urls}
+    assert results["MISS"] == len(distinct)
+    assert results["MISS"] < len(set(urls))
+    assert results["HIT"] / len(urls) > 0.9
+
+
+@pytest.mark.benchmark
+def test_hit_ratio(varnish_client, stack, fresh, benchmark_report, request):
+    """Hit ratio for a realistic URL mix, before and after normalization."""
+    views = request.config.getoption("benchmark_views")
+    urls = url_mix(views * len(PAGES))
+
+    results = replay(varnish_client, urls)
+
+    benchmark_report["query_string"] = {
+        "stack": stack.name,
+        "requests": len(urls),
+        # The previous VCL hashed the raw URL: one miss per distinct URL
+        "misses_before": len(set(urls)),
+        "misses": results["MISS"],
+        "hit_ratio_before": round(1 - len(set(urls)) / len(urls), 4),
+        "hit_ratio": round(results["HIT"] / len(urls), 4),
+    }
+    assert results["MISS"] < len(set(urls))
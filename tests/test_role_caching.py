@@ -0,0 +1,273 @@
+# Standard Library
+from datetime import datetime
+from typing import Dict
+
+# HTTP Library
+import httpx
+
+# pytest
+import pytest
+
+# Volto
+from tests.conftest import ACCEPT
+from tests.conftest import HOST
+from tests.helpers import is_cache_hit
+
+
+USER_CONTEXT = "/++api++/@user-context"
+
+USERS = {
+    "editor1": ["Editor"],
+    "editor2": ["Editor"],
+    "reviewer": ["Reviewer"],
+}
+
+# Reads Plone marks as depending on the roles alone
+SHARED = ["/++api++/page", "/++api++/@navigation", "/++api++/page/@search"]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def caching(auth_client):
+    # Enable caching, disable purge
+    url = "/++api++/@registry"
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": True,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+    yield "Enabled"
+    # Disable caching, disable purge
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": False,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+
+
+@pytest.fixture(scope="module")
+def users(stack, auth_root_client, varnish_client) -> Dict[str, httpx.Client]:
+    """Logged-in clients, two editors and a reviewer, with role caching on."""
+    if stack.name != "local":
+        pytest.skip("Role fingerprints are answered by the local stack's origin")
+    stack.origin.user_context = True
+    # Forget that Plone had no fingerprint endpoint
+    varnish_client.request("PURGE", USER_CONTEXT, headers={"X-Purge-Soft": "0"})
+    clients = {}
+    for username, roles in USERS.items():
+        auth_root_client.post(
+            "/++api++/@users",
+            json={"username": username, "password": "12345678", "roles": roles},
+        )
+        response = auth_root_client.post(
+            "/++api++/@login", json={"login": username, "password": "12345678"}
+        )
+        clients[username] = httpx.Client(
+            base_url=stack.base_url,
+            headers={
+                "Host": HOST,
+                "Accept": ACCEPT,
+                "x-varnish-debug": "1",
+                "Authorization": f"Bearer {response.json()['token']}",
+            },
+        )
+    yield clients
+    for client in clients.values():
+        client.close()
+    stack.origin.user_context = False
+    varnish_client.request("PURGE", USER_CONTEXT, headers={"X-Purge-Soft": "0"})
+
+
+@pytest.mark.parametrize("url", SHARED)
+def test_same_roles_share_api_reads(users, purge_url, stack, url: str):
+    purge_url(url)
+    response = users["editor1"].get(url)
+    assert response.status_code == 200
+    assert response.headers["x-varnish-reqtype"] == "role"
+    assert is_cache_hit(response.headers) is False
+    before = stack.backend_requests(url)
+
+    shared = users["editor2"].get(url)
+
+    assert shared.status_code == 200
+    assert is_cache_hit(shared.headers) is True
+    assert shared.json() == response.json()
+    assert stack.backend_requests(url) == before
+
+
+@pytest.mark.parametrize("url", SHARED)
+def test_different_roles_do_not_share(users, purge_url, stack, url: str):
+    purge_url(url)
+    users["editor1"].get(url)
+    before = stack.backend_requests(url)
+
+    response = users["reviewer"].get(url)
+
+    assert response.status_code == 200
+    assert is_cache_hit(response.headers) is False
+    assert stack.backend_requests(url) == before + 1
+    # Each role fingerprint keeps its own object
+    assert is_cache_hit(users["reviewer"].get(url).headers) is True
+    assert is_cache_hit(users["editor2"].get(url).headers) is True
+
+
+def test_refresh_purge_replaces_role_keyed_reads(
+    users, auth_root_client, varnish_client, purge_url
+):
+    url = "/++api++/page"
+    purge_url(url)
+    users["editor1"].get(url)
+    assert is_cache_hit(users["editor2"].get(url).headers) is True
+
+    # Purging is off in this module: only the refresh replaces objects
+    title = f"Role-keyed Page {datetime.utcnow()}"
+    response = auth_root_client.patch(url, json={"title": title})
+    assert response.status_code == 204
+    response = varnish_client.request("PURGE", url, headers={"X-Purge-Refresh": "1"})
+    assert response.status_code == 200
+
+    # The refresh fetched the anonymous object, the role-keyed one is gone
+    response = users["editor1"].get(url)
+    assert is_cache_hit(response.headers) is False
+    assert response.json()["title"] == title
+
+
+def test_personalized_reads_are_passed(users):
+    url = "/++api++/@actions"
+    for username in ("editor1", "editor2"):
+        for _ in range(2):
+            response = users[username].get(url)
+            assert response.status_code == 200
+            # Plone marks them private as well as not varying on the roles
+            assert (
+                response.headers["x-varnish-action"]
+                == "FETCH (pass - cache control disallows)"
+            )
+            assert is_cache_hit(response.headers) is False
+            assert response.json()["user"][0]["title"] == f"Log out {username}"
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {"Cache-Control": "max-age=0, must-revalidate, private"},
+        {"Cache-Control": "no-store"},
+        {"Cache-Control": "no-cache"},
+        {"Surrogate-Control": "no-store"},
+    ],
+)
+def test_role_keyed_reads_refused_by_plone_are_not_shared(
+    users, purge_url, stack, headers: Dict[str, str]
+):
+    # Varied on the fingerprint, yet not to be kept for anyone else
+    url = "/++api++/page"
+    stack.origin.route_headers[url] = headers
+    purge_url(url)
+    try:
+        response = users["editor1"].get(url)
+        assert response.headers["x-varnish-reqtype"] == "role"
+        assert response.headers["x-varnish-action"].startswith("FETCH (pass - ")
+        before = stack.backend_requests(url)
+
+        shared = users["editor2"].get(url)
+
+        assert shared.status_code == 200
+        assert is_cache_hit(shared.headers) is False
+        assert stack.backend_requests(url) == before + 1
+    finally:
+        del stack.origin.route_headers[url]
+        purge_url(url)
+
+
+@pytest.mark.parametrize("url", ["/++api++/@registry", "/page"])
+def test_other_reads_are_passed(users, url: str):
+    for _ in range(2):
+        response = users["editor1"].get(url)
+        assert response.status_code == 200
+        assert response.headers["x-varnish-reqtype"] == "auth"
+        assert is_cache_hit(response.headers) is False
+
+
+def test_anonymous_objects_are_kept_apart(users, anon_client, purge_url):
+    url = "/++api++/page"
+    purge_url(url)
+    users["editor1"].get(url)
+
+    response = anon_client.get(url)
+    assert response.headers["x-varnish-reqtype"] == "api"
+    assert is_cache_hit(response.headers) is False
+    assert is_cache_hit(anon_client.get(url).headers) is True
+
+    purge_url(url)
+    anon_client.get(url)
+    response = users["editor1"].get(url)
+    assert is_cache_hit(response.headers) is False
+
+
+def test_client_fingerprint_is_ignored(users, anon_client, purge_url):
+    url = "/++api++/page"
+    fingerprint = users["editor1"].get(USER_CONTEXT).headers["x-user-context-hash"]
+    purge_url(url)
+    users["editor1"].get(url)
+
+    for client in (anon_client, users["reviewer"]):
+        response = client.get(url, headers={"X-User-Context-Hash": fingerprint})
+        assert is_cache_hit(response.headers) is False
+
+
+@pytest.mark.parametrize("username", ["editor1", "reviewer"])
+def test_fingerprint_not_exposed(users, anon_client, username: str):
+    for client in (users[username], anon_client):
+        response = client.get("/++api++/page")
+        assert "x-user-context-hash" not in response.headers.get("vary", "").lower()
+        assert response.headers["vary"].lower().startswith("accept")
+
+
+def test_fingerprint_cached_per_credentials(users, stack, purge_url):
+    purge_url(USER_CONTEXT)
+    before = stack.backend_requests(USER_CONTEXT)
+
+    for _ in range(2):
+        for url in SHARED:
+            users["editor1"].get(url)
+    users["editor2"].get(SHARED[0])
+
+    assert stack.backend_requests(USER_CONTEXT) == before + 2
+
+
+def test_passed_without_fingerprint_endpoint(users, stack, purge_url):
+    stack.origin.user_context = False
+    purge_url(USER_CONTEXT)
+    try:
+        for _ in range(2):
+            response = users["editor1"].get("/++api++/page")
+            assert response.status_code == 200
+            assert response.headers["x-varnish-reqtype"] == "auth"
+            assert is_cache_hit(response.headers) is False
+    finally:
+        stack.origin.user_context = True
+        purge_url(USER_CONTEXT)
+
+
+def test_anonymous_objects_without_fingerprint_vary(
+    users, anon_client, purge_url, stack
+):
+    # A Plone that only varies role-keyed responses on the fingerprint
+    url = "/++api++/page"
+    stack.origin.route_headers[url] = {"Vary": "Accept"}
+    purge_url(url)
+    try:
+        assert anon_client.get(url).status_code == 200
+
+        response = users["editor1"].get(url)
+
+        assert response.headers["x-varnish-action"] == "FETCH (pass - personalized)"
+        assert is_cache_hit(response.headers) is False
+    finally:
+        del stack.origin.route_headers[url]
+        purge_url(url)
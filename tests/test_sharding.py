@@ -0,0 +1,217 @@
+# Standard Library
+import random
+from collections import Counter
+from typing import List
+
+# pytest
+import pytest
+
+# Volto
+from edge.vcl import Shard
+from tests.conftest import HOST
+
+
+NODES = 2
+
+URLS = [
+    ("express", "/page"),
+    ("api", "/++api++/page"),
+    ("blob", "/page/logo-260x260.png/@@images/image/icon"),
+]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def caching(auth_client):
+    # Enable caching, disable purge
+    url = "/++api++/@registry"
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": True,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+    yield "Enabled"
+    # Disable caching, disable purge
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": False,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+
+
+@pytest.fixture(scope="module")
+def cluster(stack):
+    """Two Varnish instances behind the balancer, independent for now."""
+    stack.scale(NODES)
+    yield stack
+    stack.shard(False)
+    stack.scale(1)
+
+
+@pytest.fixture
+def sharded(cluster):
+    cluster.shard(True)
+    return cluster
+
+
+def copies(stack, url: str) -> int:
+    """Nodes of the local stack holding an object for url."""
+    return sum(1 for node in stack.active_nodes if node.cache.objects.get((url, HOST)))
+
+
+def empty(stack):
+    """Start the local nodes over, purged objects only go on their next lookup."""
+    for node in stack.active_nodes:
+        node.reset()
+
+
+def site_urls(init_data) -> List[str]:
+    """Volto and API URLs of the test content, with a few listing pages each."""
+    paths = [url[len("/++api++") :] for url, *_ in init_data] + ["/page"]
+    return [
+        f"{prefix}{path}?b_start={start}"
+        for path in paths
+        for prefix in ("", "/++api++")
+        for start in range(0, 250, 10)
+    ]
+
+
+def replay(client, urls: List[str]) -> Counter:
+    results = Counter()
+    for url in urls:
+        response = client.get(url)
+        assert response.status_code == 200
+        results[response.headers.get("x-cache")] += 1
+    return results
+
+
+@pytest.mark.parametrize("reqtype,url", URLS)
+def test_each_url_is_fetched_once(
+    anon_client, sharded, purge_multiple_varnish_url, reqtype, url
+):
+    purge_multiple_varnish_url(url)
+    before = sharded.backend_requests(url)
+
+    # The balancer spreads these over both instances
+    responses = [anon_client.get(url) for _ in range(2 * NODES)]
+
+    assert all(response.status_code == 200 for response in responses)
+    assert sharded.backend_requests(url) == before + 1
+    hits = [response.headers.get("x-hits") for response in responses]
+    assert hits == [str(count) for count in range(2 * NODES)]
+
+
+@pytest.mark.parametrize("reqtype,url", URLS)
+def test_owner_holds_the_only_copy(
+    anon_client, sharded, purge_multiple_varnish_url, reqtype, url
+):
+    if sharded.name != "local":
+        pytest.skip("Needs to look into every node's cache")
+    empty(sharded)
+
+    for _ in range(2 * NODES):
+        assert anon_client.get(url).status_code == 200
+
+    assert copies(sharded, url) == 1
+
+
+def test_round_robin_caches_everywhere(
+    anon_client, cluster, purge_multiple_varnish_url
+):
+    if cluster.name != "local":
+        pytest.skip("Needs to look into every node's cache")
+    cluster.shard(False)
+    url = "/page"
+    empty(cluster)
+
+    for _ in range(2 * NODES):
+        assert anon_client.get(url).status_code == 200
+
+    assert copies(cluster, url) == NODES
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "identity"])
+def test_forwarded_responses_keep_encoding(
+    anon_client, sharded, purge_multiple_varnish_url, encoding
+):
+    url = "/++api++/page"
+    purge_multiple_varnish_url(url)
+
+    responses = [
+        anon_client.get(url, headers={"Accept-Encoding": encoding})
+        for _ in range(2 * NODES)
+    ]
+
+    gzipped = {response.headers.get("content-encoding") for response in responses}
+    assert gzipped == ({"gzip"} if encoding == "gzip" else {None})
+    assert len({response.content for response in responses}) == 1
+
+
+def test_keys_spread_over_instances():
+    shard = Shard(["varnish_1", "varnish_2"])
+    urls = [f"/page-{number}" for number in range(1000)]
+
+    owners = Counter(shard.backend(shard.key(HOST + url)) for url in urls)
+
+    assert set(owners) == {"varnish_1", "varnish_2"}
+    assert min(owners.values()) > 0.35 * len(urls)
+
+
+def test_new_instance_only_takes_keys():
+    shard = Shard(["varnish_1", "varnish_2"])
+    keys = [shard.key(f"{HOST}/page-{number}") for number in range(1000)]
+    before = {key: shard.backend(key) for key in keys}
+
+    shard.add_backend("varnish_3")
+    shard.reconfigure()
+
+    moved = [key for key in keys if shard.backend(key) != before[key]]
+    assert moved
+    assert {shard.backend(key) for key in moved} == {"varnish_3"}
+
+
+@pytest.mark.benchmark
+def test_cluster_hit_ratio(
+    anon_client,
+    cluster,
+    purge_multiple_varnish_url,
+    init_data,
+    benchmark_report,
+    request,
+):
+    """Cluster-wide hit ratio and origin fetches, round-robin against sharded."""
+    views = request.config.getoption("benchmark_views")
+    pages = site_urls(init_data)
+    rng = random.Random(42)
+    urls = [rng.choice(pages) for _ in range(views * NODES)]
+    report = {}
+    for layout in ("round_robin", "sharded"):
+        cluster.shard(layout == "sharded")
+        for url in set(urls):
+            purge_multiple_varnish_url(url)
+        if cluster.name == "local":
+            empty(cluster)
+        before = sum(cluster.backend_requests(url) for url in set(urls))
+        results = replay(anon_client, urls)
+        fetches = sum(cluster.backend_requests(url) for url in set(urls)) - before
+        report[layout] = {
+            "hit_ratio": round(results["HIT"] / len(urls), 4),
+            "origin_fetches": fetches,
+        }
+        if cluster.name == "local":
+            report[layout]["objects"] = sum(copies(cluster, url) for url in set(urls))
+    benchmark_report["sharding"] = {
+        "stack": cluster.name,
+        "instances": NODES,
+        "requests": len(urls),
+        "distinct_urls": len(set(urls)),
+        **report,
+    }
+    assert (
+        report["sharded"]["origin_fetches"] <= report["round_robin"]["origin_fetches"]
+    )
@@ -0,0 +1,124 @@
+# Standard Library
+from datetime import datetime
+
+# pytest
+import pytest
+
+# Volto
+from tests.helpers import PURGE_TIMEOUT
+from tests.helpers import is_cache_hit
+from tests.helpers import is_stale
+from tests.helpers import wait_for
+
+
+@pytest.fixture(scope="module", autouse=True)
+def caching(auth_client):
+    # Enable caching
+    url = "/++api++/@registry"
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": True,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": True,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.cachingProxies": [
+                "http://purger:80"
+            ],
+            "plone.cachepurging.interfaces.ICachePurgingSettings.domains": [],
+            "plone.cachepurging.interfaces.ICachePurgingSettings.virtualHosting": False,
+            "plone.app.caching.interfaces.IPloneCacheSettings.purgedContentTypes": [
+                "File",
+                "Folder",
+                "Image",
+                "News Item",
+                "Document",
+            ],
+        },
+    )
+    yield "Enabled"
+    # Disable caching, disable purge
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": False,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+
+
+def object_xid(headers: dict) -> str:
+    """XID of the fetch that stored the object Varnish delivered."""
+    return headers["x-varnish"].split()[-1]
+
+
+def populate(client, url: str) -> str:
+    """Cache url, waiting out any refresh left by an earlier soft purge."""
+    responses = []
+
+    def fresh_hit() -> bool:
+        responses.append(client.get(url))
+        headers = responses[-1].headers
+        return is_cache_hit(headers) and not is_stale(headers)
+
+    wait_for(fresh_hit, PURGE_TIMEOUT, f"Fresh {url}", maximum=0.02)
+    return object_xid(responses[-1].headers)
+
+
+@pytest.mark.parametrize("prefix", ["", "/++api++"])
+def test_edit_serves_stale_while_refreshing(anon_client, auth_client, prefix):
+    base_url = "/page"
+    url = f"{prefix}{base_url}"
+    old = populate(anon_client, url)
+
+    # Edit page, Plone purges it
+    title = f"Soft purged page {datetime.utcnow()}"
+    response = auth_client.patch(
+        f"/++api++{base_url}",
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={"title": title},
+    )
+    assert response.status_code == 204
+
+    # The first request after the purge gets the stale object
+    responses = []
+
+    def stale_served() -> bool:
+        responses.append(anon_client.get(url))
+        return is_stale(responses[-1].headers)
+
+    wait_for(stale_served, PURGE_TIMEOUT, f"Stale {url}", maximum=0.02)
+    stale = responses[-1].headers
+    assert is_cache_hit(stale) is True
+    assert object_xid(stale) == old
+
+    # Later requests keep hitting until one background fetch replaced it
+    def refreshed() -> bool:
+        responses.append(anon_client.get(url))
+        return object_xid(responses[-1].headers) != old
+
+    wait_for(refreshed, PURGE_TIMEOUT, f"Refresh of {url}", maximum=0.02)
+    assert all(is_cache_hit(response.headers) for response in responses)
+    assert len({object_xid(response.headers) for response in responses}) == 2
+    if prefix:
+        assert responses[-1].json()["title"] == title
+
+
+def test_soft_purge_per_request(anon_client, varnish_client):
+    # Images are hard purged unless the request asks otherwise
+    url = "/page/logo-260x260.png/@@images/image/icon"
+    populate(anon_client, url)
+    response = varnish_client.request("PURGE", url, headers={"X-Purge-Soft": "1"})
+    assert response.status_code == 200
+    headers = anon_client.get(url).headers
+    assert is_cache_hit(headers) is True
+    assert is_stale(headers) is True
+
+
+def test_hard_purge_per_request(anon_client, varnish_client):
+    # Volto pages are soft purged unless the request asks otherwise
+    url = "/page"
+    populate(anon_client, url)
+    response = varnish_client.request("PURGE", url, headers={"X-Purge-Soft": "0"})
+    assert response.status_code == 200
+    assert is_cache_hit(anon_client.get(url).headers) is False
@@ -0,0 +1,147 @@
+# pytest
+import pytest
+
+# Volto
+from tests.helpers import is_cache_hit
+
+
+URLS = ["/page", "/++api++/page"]
+
+# Response headers, then x-varnish-ttl, x-varnish-grace and
+# x-varnish-stale-if-error on the first delivery
+POLICIES = [
+    ({"Surrogate-Control": "max-age=300"}, 300, 10, 86400),
+    (
+        {"Surrogate-Control": "max-age=300, stale-while-revalidate=30"},
+        300,
+        30,
+        86400,
+    ),
+    (
+        {
+            "Surrogate-Control": (
+                "max-age=300, stale-while-revalidate=30, stale-if-error=600"
+            )
+        },
+        300,
+        30,
+        600,
+    ),
+    # Browsers revalidate, the edge keeps the response
+    (
+        {"Cache-Control": "no-cache", "Surrogate-Control": "max-age=120"},
+        120,
+        10,
+        86400,
+    ),
+    # Surrogate-Control wins over Cache-Control
+    (
+        {
+            "Cache-Control": "max-age=0, s-maxage=86400, stale-if-error=3600",
+            "Surrogate-Control": "max-age=60, stale-if-error=7200",
+        },
+        60,
+        10,
+        7200,
+    ),
+    # Without Surrogate-Control, stale-while-revalidate and stale-if-error
+    # come from Cache-Control
+    (
+        {
+            "Cache-Control": "s-maxage=60, stale-while-revalidate=20, stale-if-error=3600"
+        },
+        60,
+        20,
+        3600,
+    ),
+]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def no_caching(auth_client, varnish_client):
+    # Disable caching, only the route policies below set caching headers
+    url = "/++api++/@registry"
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": False,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+    yield "Disabled"
+    for url in URLS:
+        varnish_client.request("PURGE", url, headers={"X-Purge-Soft": "0"})
+
+
+@pytest.fixture
+def route_headers(stack, purge_url):
+    """Set the headers Volto and Plone send for a path."""
+    if stack.name != "local":
+        pytest.skip("Route policies are set on the local stack's origin")
+    paths = []
+
+    def inner(url: str, headers: dict):
+        stack.origin.route_headers[url] = headers
+        paths.append(url)
+        purge_url(url)
+
+    yield inner
+    for url in paths:
+        stack.origin.route_headers.pop(url, None)
+        purge_url(url)
+
+
+@pytest.mark.parametrize("url", URLS)
+@pytest.mark.parametrize("headers,ttl,grace,stale_if_error", POLICIES)
+def test_cache_policy(
+    anon_client, route_headers, url: str, headers, ttl, grace, stale_if_error
+):
+    route_headers(url, headers)
+
+    response = anon_client.get(url)
+    assert response.status_code == 200
+    assert response.headers["x-cache"] == "MISS"
+    assert float(response.headers["x-varnish-ttl"]) == pytest.approx(ttl, abs=1)
+    assert float(response.headers["x-varnish-grace"]) == grace
+    assert float(response.headers["x-varnish-stale-if-error"]) == stale_if_error
+    # Surrogate-Control is for the edge alone, Cache-Control for browsers
+    assert "surrogate-control" not in response.headers
+    assert response.headers.get("cache-control") == headers.get("Cache-Control")
+
+    assert is_cache_hit(anon_client.get(url).headers) is True
+
+
+@pytest.mark.parametrize(
+    "headers,action",
+    [
+        (
+            {"Surrogate-Control": "no-store", "Cache-Control": "public, max-age=300"},
+            "FETCH (pass - surrogate control disallows)",
+        ),
+        # A private response is never shared, whatever Surrogate-Control says
+        (
+            {"Surrogate-Control": "max-age=300", "Cache-Control": "private"},
+            "FETCH (pass - cache control disallows)",
+        ),
+    ],
+)
+def test_surrogate_control_not_cached(anon_client, route_headers, headers, action):
+    route_headers("/page", headers)
+
+    for _ in range(2):
+        response = anon_client.get("/page")
+        assert response.headers["x-varnish-action"] == action
+        assert is_cache_hit(response.headers) is False
+        assert "surrogate-control" not in response.headers
+
+
+def test_surrogate_control_stripped_without_debug(varnish_client, route_headers):
+    route_headers("/page", {"Surrogate-Control": "max-age=300"})
+
+    response = varnish_client.get("/page")
+
+    assert response.status_code == 200
+    assert "surrogate-control" not in response.headers
+    assert "x-stale-if-error" not in response.headers
+    assert "x-varnish-stale-if-error" not in response.headers
@@ -0,0 +1,64 @@
+# Standard Library
+import re
+import subprocess
+
+# pytest
+import pytest
+
+# Volto
+from tests.conftest import REPO_DIR
+
+
+VTC_DIR = REPO_DIR / "tests/vtc"
+BUILD = "shell {sh ${testdir}/build-vcl.sh ${s1_addr} ${s1_port} ${tmpdir}}"
+LOAD = '-cliok "vcl.load test ${tmpdir}/varnish.vcl"'
+
+
+def build(tmp_path, vcl: str = None) -> str:
+    """Run build-vcl.sh on a copy of etc/, with vcl in place of varnish.vcl."""
+    etc = REPO_DIR / "etc"
+    if vcl is not None:
+        root = tmp_path / "repo"
+        (root / "etc").mkdir(parents=True)
+        (root / "tests/vtc").mkdir(parents=True)
+        (root / "etc/varnish.vcl").write_text(vcl)
+        (root / "etc/peers.vcl").write_text((etc / "peers.vcl").read_text())
+        script = root / "tests/vtc/build-vcl.sh"
+        script.write_text((VTC_DIR / "build-vcl.sh").read_text())
+    else:
+        script = VTC_DIR / "build-vcl.sh"
+    subprocess.run(
+        ["sh", str(script), "127.0.0.1", "4242", str(tmp_path)],
+        check=True,
+        capture_output=True,
+    )
+    return (tmp_path / "varnish.vcl").read_text()
+
+
+def test_every_backend_points_at_the_server(tmp_path):
+    source = (REPO_DIR / "etc/varnish.vcl").read_text()
+    vcl = build(tmp_path)
+
+    backends = len(re.findall(r"^backend \w+ \{", source, re.M))
+    assert backends >= 2
+    assert vcl.count('.host = "127.0.0.1";') == backends
+    assert vcl.count('.port = "4242";') == backends
+    assert not re.search(r"^probe |\.probe = ", vcl, re.M)
+    assert f'include "{tmp_path}/peers.vcl";' in vcl
+    assert (tmp_path / "peers.vcl").exists()
+
+
+def test_build_fails_when_the_vcl_changed(tmp_path):
+    source = (REPO_DIR / "etc/varnish.vcl").read_text()
+    changed = source.replace('.host = "webserver";', '.host = "traefik";', 1)
+
+    with pytest.raises(subprocess.CalledProcessError):
+        build(tmp_path, changed)
+
+
+@pytest.mark.parametrize("path", sorted(VTC_DIR.glob("*.vtc")), ids=lambda p: p.name)
+def test_vtc_loads_the_built_vcl(path):
+    text = path.read_text()
+    assert BUILD in text
+    assert LOAD in text
+    assert not re.search(r"^\s*sed ", text, re.M)
@@ -0,0 +1,204 @@
+# Standard Library
+import asyncio
+from time import monotonic
+from typing import List
+
+# HTTP Library
+import httpx
+
+# pytest
+import pytest
+
+# Volto
+from benchmarks.load import SCALES
+from warmer.__main__ import main
+from warmer.__main__ import parse_args
+from warmer.crawler import RateLimiter
+from warmer.crawler import Warmer
+from warmer.crawler import seed_content
+from warmer.crawler import seed_navigation
+from warmer.crawler import seed_sitemap
+
+
+IMAGE = "/page/logo-260x260.png"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def caching(auth_client):
+    # Enable caching, disable purge
+    url = "/++api++/@registry"
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": True,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+    yield "Enabled"
+    # Disable caching, disable purge
+    auth_client.patch(
+        url,
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        json={
+            "plone.caching.interfaces.ICacheSettings.enabled": False,
+            "plone.cachepurging.interfaces.ICachePurgingSettings.enabled": False,
+        },
+    )
+
+
+def site_urls() -> List[str]:
+    """What warming content.json requests: pages, API and image scales."""
+    urls = []
+    for path in seed_content():
+        urls += [path, f"/++api++{path}".rstrip("/")]
+    return urls + [f"{IMAGE}/@@images/image/{scale}" for scale in SCALES]
+
+
+def cool(stack, clients):
+    """Every instance without the site's objects, as after a deploy."""
+    if stack.name == "local":
+        for node in stack.nodes:
+            node.reset()
+        return
+    for client in clients:
+        for url in site_urls():
+            client.request("PURGE", url, headers={"X-Purge-Soft": "0"})
+
+
+@pytest.fixture
+def cold(stack, varnish_multiple_clients):
+    cool(stack, varnish_multiple_clients)
+    return stack
+
+
+def warm(stack, **kwargs) -> dict:
+    kwargs.setdefault("rate", None)
+    warmer = Warmer(stack.varnish_urls, host=stack.host, **kwargs)
+    return asyncio.run(warmer.run(seed_content()))
+
+
+def test_every_node_is_warmed(cold, varnish_multiple_clients):
+    report = warm(cold)
+
+    assert report["urls"] == len(site_urls())
+    assert report["coverage"] == 1.0
+    for node in cold.varnish_urls:
+        stats = report["nodes"][node]
+        assert stats["fetched"] == report["urls"]
+        assert stats["errors"] == 0
+        assert stats["uncached"] == []
+    # The variants the warmer fetched, which Accept selects
+    headers = Warmer(cold.varnish_urls, host=cold.host).headers
+    for client in varnish_multiple_clients:
+        for url in ("/page", "/++api++/page", f"{IMAGE}/@@images/image/thumb"):
+            response = client.get(url, headers=headers(url))
+            assert response.headers["x-cache"] == "HIT"
+
+
+def test_second_run_finds_objects_cached(cold):
+    warm(cold, verify=False)
+
+    report = warm(cold, verify=False)
+
+    for stats in report["nodes"].values():
+        assert stats["already_cached"] == stats["requests"]
+        assert stats["fetched"] == 0
+    assert "coverage" not in report
+
+
+def test_children_are_crawled(cold):
+    warmer = Warmer(cold.varnish_urls, host=cold.host, rate=None, verify=False)
+
+    report = asyncio.run(warmer.run(["/"]))
+
+    assert "/page" in warmer.urls
+    assert f"/++api++{IMAGE}" in warmer.urls
+    assert f"{IMAGE}/@@images/image/icon" in warmer.urls
+    assert report["paths"] == 3
+
+
+def test_depth_limits_the_crawl(cold):
+    warmer = Warmer(cold.varnish_urls, host=cold.host, rate=None, depth=0)
+
+    asyncio.run(warmer.run(["/"]))
+
+    assert list(warmer.urls) == ["/", "/++api++"]
+
+
+def test_seed_navigation(stack):
+    async def seed():
+        async with httpx.AsyncClient() as client:
+            return await seed_navigation(client, stack.varnish_url, stack.host)
+
+    paths = asyncio.run(seed())
+
+    assert paths[0] == "/"
+    assert "/page" in paths
+
+
+def test_seed_sitemap(stack):
+    async def seed():
+        async with httpx.AsyncClient() as client:
+            return await seed_sitemap(client, stack.varnish_url, stack.host)
+
+    assert "/page" in asyncio.run(seed())
+
+
+def test_rate_limit():
+    async def run(rate: float, requests: int) -> float:
+        limiter = RateLimiter(rate)
+        start = monotonic()
+        await asyncio.gather(*(limiter.wait() for _ in range(requests)))
+        return monotonic() - start
+
+    assert asyncio.run(run(100.0, 11)) >= 0.1
+    assert asyncio.run(run(0, 100)) < 0.1
+
+
+def test_cli(cold):
+    args = parse_args(
+        [
+            *(arg for url in cold.varnish_urls for arg in ("--varnish", url)),
+            "--seed",
+            "navigation",
+            "--seed",
+            "content",
+            "--rate",
+            "0",
+        ]
+    )
+
+    report = asyncio.run(main(args))
+
+    assert report["seeds"] == ["navigation", "content"]
+    assert report["coverage"] == 1.0
+
+
+@pytest.mark.benchmark
+def test_warming(cold, varnish_multiple_clients, benchmark_report):
+    """Time to warm every instance and the first visit before and after."""
+
+    def first_visit() -> float:
+        start = monotonic()
+        for client in varnish_multiple_clients:
+            for url in site_urls():
+                assert client.get(url).status_code == 200
+        return (monotonic() - start) / len(site_urls()) / len(varnish_multiple_clients)
+
+    cold_visit = first_visit()
+    cool(cold, varnish_multiple_clients)
+    report = warm(cold, rate=50.0)
+    warm_visit = first_visit()
+
+    benchmark_report["warming"] = {
+        "stack": cold.name,
+        "instances": len(cold.varnish_urls),
+        "urls": report["urls"],
+        "seconds": report["seconds"],
+        "rps": report["rps"],
+        "coverage": report["coverage"],
+        "cold_visit_ms": round(cold_visit * 1000, 3),
+        "warm_visit_ms": round(warm_visit * 1000, 3),
+    }
+    assert report["coverage"] == 1.0
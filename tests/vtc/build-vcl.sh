@@ -0,0 +1,31 @@
+#!/bin/sh
+# etc/varnish.vcl as the VTCs load it: build-vcl.sh ADDR PORT TMPDIR
+#
+# Every backend points at the test server ADDR:PORT, probes are dropped (the
+# server blocks would have to answer their polls, use backend.set_health
+# instead), the purge ACL's "backend" host no longer needs to resolve and
+# peers.vcl is included from TMPDIR. Fails when etc/varnish.vcl no longer
+# has the lines it rewrites.
+set -e
+
+addr=$1
+port=$2
+tmpdir=$3
+etc="$(dirname "$0")/../../etc"
+
+sed -e "s/\"webserver\"/\"$addr\"/" \
+    -e "s/\\.port = \"80\"/.port = \"$port\"/" \
+    -e 's/"backend";/("backend");/' \
+    -e "s|include \"peers.vcl\";|include \"$tmpdir/peers.vcl\";|" \
+    -e '/^probe [A-Za-z0-9_]* {/,/^}/d' -e '/\.probe = /d' \
+    "$etc/varnish.vcl" > "$tmpdir/varnish.vcl"
+cp "$etc/peers.vcl" "$tmpdir/peers.vcl"
+
+backends=$(grep -c '^backend ' "$tmpdir/varnish.vcl")
+if [ "$(grep -c "\.host = \"$addr\";" "$tmpdir/varnish.vcl")" != "$backends" ] ||
+        [ "$(grep -c "\.port = \"$port\";" "$tmpdir/varnish.vcl")" != "$backends" ] ||
+        grep -q -e '^probe ' -e '\.probe' -e 'include "peers.vcl"' \
+            "$tmpdir/varnish.vcl"; then
+    echo "build-vcl.sh: etc/varnish.vcl changed, update the rewrites" >&2
+    exit 1
+fi
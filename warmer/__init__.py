@@ -0,0 +1,14 @@
+"""Cache warmer for every Varnish instance.
+
+After a deploy or a full BAN every instance starts cold and the first
+visitors pay for Volto's server side rendering. ``Warmer`` crawls the site
+from ``@navigation``, the sitemap or content.json and requests each path's
+Volto page, ``/++api++`` response and image scales on every instance
+directly, rate limited, then reports coverage and the time it took.
+"""
+
+# Volto
+from warmer.crawler import Warmer  # noqa: F401
+from warmer.crawler import seed_content  # noqa: F401
+from warmer.crawler import seed_navigation  # noqa: F401
+from warmer.crawler import seed_sitemap  # noqa: F401
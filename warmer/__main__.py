@@ -0,0 +1,99 @@
+# Standard Library
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+
+# HTTP Library
+import httpx
+
+# Volto
+from purger.service import DnsDiscovery
+from warmer.crawler import CONTENT
+from warmer.crawler import SITEMAP
+from warmer.crawler import Warmer
+from warmer.crawler import seed_content
+from warmer.crawler import seed_navigation
+from warmer.crawler import seed_sitemap
+
+
+SEEDS = ("navigation", "sitemap", "content")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m warmer",
+        description="Fill every Varnish instance after a deploy or a full BAN.",
+    )
+    parser.add_argument(
+        "--varnish",
+        action="append",
+        default=[],
+        help="Varnish base URL, repeat for every instance",
+    )
+    parser.add_argument(
+        "--service",
+        help="Name resolving to every instance, as the purger finds them",
+    )
+    parser.add_argument("--port", type=int, default=80, help="Port with --service")
+    parser.add_argument("--host", default="plone.localhost", help="Host header")
+    parser.add_argument(
+        "--seed", action="append", choices=SEEDS, help="Where paths come from"
+    )
+    parser.add_argument("--sitemap", default=SITEMAP, help="Sitemap path")
+    parser.add_argument("--content", type=Path, default=CONTENT)
+    parser.add_argument("--rate", type=float, default=50.0, help="Requests/second")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--depth", type=int, default=2, help="Levels to crawl")
+    parser.add_argument(
+        "--no-verify", action="store_true", help="Skip the coverage check"
+    )
+    parser.add_argument("--output", type=Path, help="Write the report as JSON")
+    args = parser.parse_args(argv)
+    if not args.varnish and not args.service:
+        parser.error("Give --varnish or --service")
+    args.seed = args.seed or ["navigation"]
+    return args
+
+
+async def main(args: argparse.Namespace) -> dict:
+    nodes = list(args.varnish)
+    if args.service:
+        nodes += await DnsDiscovery(args.service, args.port)()
+    if not nodes:
+        raise SystemExit("No Varnish instance to warm")
+    paths = []
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        for seed in args.seed:
+            if seed == "navigation":
+                paths += await seed_navigation(client, nodes[0], args.host)
+            elif seed == "sitemap":
+                paths += await seed_sitemap(client, nodes[0], args.host, args.sitemap)
+            else:
+                paths += seed_content(args.content)
+    warmer = Warmer(
+        nodes,
+        host=args.host,
+        rate=args.rate or None,
+        concurrency=args.concurrency,
+        depth=args.depth,
+        verify=not args.no_verify,
+    )
+    report = await warmer.run(paths)
+    report["seeds"] = args.seed
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level="INFO", format="%(asctime)s %(levelname)s %(name)s %(message)s"
+    )
+    args = parse_args()
+    report = asyncio.run(main(args))
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(report, fp, indent=2)
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
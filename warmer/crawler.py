@@ -0,0 +1,330 @@
+# Standard Library
+import asyncio
+import gzip
+import logging
+import xml.etree.ElementTree as ElementTree
+from collections import Counter
+from dataclasses import dataclass
+from dataclasses import field
+from time import monotonic
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+from urllib.parse import urlsplit
+
+# HTTP Library
+import httpx
+
+# Volto
+from benchmarks.load import ACCEPT
+from benchmarks.load import ACCEPT_JSON
+from benchmarks.load import CONTENT
+from benchmarks.load import SCALES
+from benchmarks.load import load_content
+
+
+logger = logging.getLogger("warmer")
+
+# Volto renders every path, Plone answers it below ++api++
+PREFIXES = ("", "/++api++")
+
+# What browsers send for <img>, Varnish normalizes it to image/*
+ACCEPT_IMAGE = "image/avif,image/webp,*/*;q=0.8"
+
+NAVIGATION = "/++api++/@navigation?expand.navigation.depth={depth}"
+SITEMAP = "/sitemap.xml.gz"
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+def content_path(url: str) -> str:
+    """The content path of an absolute URL, API URLs included."""
+    path = urlsplit(url).path
+    if path.startswith("/++api++"):
+        path = path[len("/++api++") :]
+    return path.rstrip("/") or "/"
+
+
+def seed_content(path=CONTENT) -> List[str]:
+    """The site root and every item of content.json."""
+    return ["/"] + [f"/{item['path'].strip('/')}" for item in load_content(path)]
+
+
+async def seed_navigation(
+    client: httpx.AsyncClient, base_url: str, host: str, depth: int = 3
+) -> List[str]:
+    """Paths in the navigation tree, as Volto's menus link them."""
+    response = await client.get(
+        base_url + NAVIGATION.format(depth=depth),
+        headers={"Host": host, "Accept": ACCEPT_JSON},
+    )
+    response.raise_for_status()
+    paths = ["/"]
+    stack = list(response.json().get("items", []))
+    while stack:
+        item = stack.pop(0)
+        paths.append(content_path(item["@id"]))
+        stack.extend(item.get("items") or [])
+    return paths
+
+
+async def seed_sitemap(
+    client: httpx.AsyncClient, base_url: str, host: str, url: str = SITEMAP
+) -> List[str]:
+    """Paths in a sitemap, following sitemap indexes, gzipped or not."""
+    paths, pending, seen = [], [url], set()
+    while pending:
+        url = pending.pop(0)
+        if url in seen:
+            continue
+        seen.add(url)
+        location = urlsplit(url)
+        response = await client.get(
+            base_url + (location.path or "/"), headers={"Host": host}
+        )
+        response.raise_for_status()
+        body = response.content
+        if body[:2] == b"\x1f\x8b":
+            body = gzip.decompress(body)
+        root = ElementTree.fromstring(body)
+        for loc in root.iter(f"{SITEMAP_NS}loc"):
+            text = (loc.text or "").strip()
+            if root.tag == f"{SITEMAP_NS}sitemapindex":
+                pending.append(text)
+            else:
+                paths.append(content_path(text))
+    return paths
+
+
+def image_paths(path: str, data: dict) -> List[str]:
+    """The standard scales of the image an API response describes."""
+    if not isinstance(data.get("image"), dict):
+        return []
+    prefix = "" if path == "/" else path
+    return [f"{prefix}/@@images/image/{scale}" for scale in SCALES]
+
+
+class RateLimiter:
+    """Spread requests evenly, at most ``rate`` per second."""
+
+    def __init__(self, rate: Optional[float]):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = monotonic()
+            delay = self._next - now
+            self._next = max(self._next, now) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+@dataclass
+class NodeStats:
+    """Warming requests sent to one Varnish instance."""
+
+    requests: int = 0
+    fetched: int = 0
+    already_cached: int = 0
+    errors: int = 0
+    cached: int = 0
+    statuses: Counter = field(default_factory=Counter)
+    uncached: List[str] = field(default_factory=list)
+
+    def summary(self, urls: int, verified: bool) -> dict:
+        result = {
+            "requests": self.requests,
+            "fetched": self.fetched,
+            "already_cached": self.already_cached,
+            "errors": self.errors,
+            "statuses": dict(sorted(self.statuses.items())),
+        }
+        if verified:
+            result["cached"] = self.cached
+            result["coverage"] = round(self.cached / urls, 4) if urls else 0.0
+            result["uncached"] = sorted(self.uncached)
+        return result
+
+
+class Warmer:
+    """Request every page, API response and image scale on every Varnish.
+
+    Seed paths are crawled breadth first: the API response of a path lists
+    its children, followed ``depth`` levels down, and describes its image,
+    whose standard scales are requested too. Each URL goes to every node
+    directly, bypassing the load balancer, at most ``rate`` requests per
+    second overall and ``concurrency`` at a time. With ``verify`` every URL
+    is requested again and coverage is the share that is then a HIT.
+    """
+
+    def __init__(
+        self,
+        nodes: List[str],
+        host: str = "plone.localhost",
+        rate: Optional[float] = 50.0,
+        concurrency: int = 8,
+        depth: int = 2,
+        verify: bool = True,
+        timeout: float = 60.0,
+    ):
+        self.nodes = [node.rstrip("/") for node in nodes]
+        self.host = host
+        self.limiter = RateLimiter(rate)
+        self.concurrency = concurrency
+        self.depth = depth
+        self.verify = verify
+        self.timeout = timeout
+        self.stats: Dict[str, NodeStats] = {node: NodeStats() for node in self.nodes}
+        # Warmed URLs in order, a dict as an ordered set
+        self.urls: Dict[str, None] = {}
+        self._seen: Set[str] = set()
+        self._queue: "asyncio.Queue[Tuple[str, int]]" = None
+        self._client = None
+
+    def headers(self, url: str) -> dict:
+        if url.startswith("/++api++"):
+            accept = ACCEPT_JSON
+        elif "/@@images/" in url:
+            accept = ACCEPT_IMAGE
+        else:
+            accept = ACCEPT
+        return {
+            "Host": self.host,
+            "Accept": accept,
+            "Accept-Encoding": "gzip",
+            "x-varnish-debug": "1",
+        }
+
+    async def get(self, node: str, url: str) -> Optional[httpx.Response]:
+        stats = self.stats[node]
+        stats.requests += 1
+        try:
+            response = await self._client.get(node + url, headers=self.headers(url))
+        except httpx.HTTPError as exc:
+            logger.info("GET %s%s failed: %s", node, url, exc)
+            stats.errors += 1
+            stats.statuses["error"] += 1
+            return None
+        stats.statuses[str(response.status_code)] += 1
+        if response.status_code >= 400:
+            stats.errors += 1
+        elif response.headers.get("x-cache") == "HIT":
+            stats.already_cached += 1
+        else:
+            stats.fetched += 1
+        return response
+
+    async def warm(self, url: str) -> Optional[httpx.Response]:
+        """Warm url on every node, return the first node's response."""
+        self.urls[url] = None
+        first = None
+        for node in self.nodes:
+            await self.limiter.wait()
+            response = await self.get(node, url)
+            if first is None:
+                first = response
+        return first
+
+    async def crawl(self, path: str, level: int):
+        responses = {}
+        for prefix in PREFIXES:
+            responses[prefix] = await self.warm(f"{prefix}{path}".rstrip("/") or "/")
+        response = responses["/++api++"]
+        if response is None or response.status_code != 200:
+            return
+        try:
+            data = response.json()
+        except ValueError:
+            return
+        for url in image_paths(path, data):
+            await self.warm(url)
+        if level >= self.depth:
+            return
+        for child in data.get("items") or []:
+            if isinstance(child, dict) and child.get("@id"):
+                self.enqueue(content_path(child["@id"]), level + 1)
+
+    def enqueue(self, path: str, level: int = 0):
+        path = path.rstrip("/") or "/"
+        if path not in self._seen:
+            self._seen.add(path)
+            self._queue.put_nowait((path, level))
+
+    async def worker(self):
+        while True:
+            path, level = await self._queue.get()
+            try:
+                await self.crawl(path, level)
+            except Exception:
+                logger.exception("Warming %s failed", path)
+            finally:
+                self._queue.task_done()
+
+    async def check(self, semaphore: asyncio.Semaphore, node: str, url: str):
+        async with semaphore:
+            try:
+                response = await self._client.get(node + url, headers=self.headers(url))
+            except httpx.HTTPError:
+                response = None
+        stats = self.stats[node]
+        if response is not None and response.headers.get("x-cache") == "HIT":
+            stats.cached += 1
+        else:
+            stats.uncached.append(url)
+
+    async def run(self, paths: Iterable[str]) -> dict:
+        self._queue = asyncio.Queue()
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.concurrency * len(self.nodes)),
+        )
+        try:
+            start = monotonic()
+            for path in paths:
+                self.enqueue(path)
+            workers = [
+                asyncio.create_task(self.worker()) for _ in range(self.concurrency)
+            ]
+            try:
+                await self._queue.join()
+            finally:
+                for task in workers:
+                    task.cancel()
+            elapsed = monotonic() - start
+            if self.verify:
+                semaphore = asyncio.Semaphore(self.concurrency)
+                await asyncio.gather(
+                    *(
+                        self.check(semaphore, node, url)
+                        for node in self.nodes
+                        for url in self.urls
+                    )
+                )
+        finally:
+            await self._client.aclose()
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> dict:
+        urls = len(self.urls)
+        requests = sum(stats.requests for stats in self.stats.values())
+        result = {
+            "paths": len(self._seen),
+            "urls": urls,
+            "nodes": {
+                node: stats.summary(urls, self.verify)
+                for node, stats in self.stats.items()
+            },
+            "seconds": round(elapsed, 3),
+            "rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        }
+        if self.verify:
+            cached = sum(stats.cached for stats in self.stats.values())
+            total = urls * len(self.nodes)
+            result["coverage"] = round(cached / total, 4) if total else 0.0
+        return result